@@ -9,6 +9,9 @@ import os
 # Get the project root directory (parent of scripts/)
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 db_path = os.path.join(project_root, 'rankings.db')
+sys.path.insert(0, project_root)
+
+from src.storage import list_weeks, read_week
 
 #Connect to Database
 conn = sqlite3.connect(db_path)
@@ -38,10 +41,8 @@ def helpMenu():
 
 #Define Table Gathering function
 def getTables() :
-    #Get Tables for dates
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-    tables = [row[0] for row in cur.fetchall()]
-    return tables
+    #Get the ranking weeks (week tables or the compact store, never the fact/aggregate tables), oldest first
+    return sorted(list_weeks(conn))
 
 #Define Data Gathering Function
 #FIX ACCURACY FOR MISSING WEEKS
@@ -52,12 +53,12 @@ def playerCareerDataFind (playerName: str, index: int, specialChar: str):
     data = []
     #Gather Specified Data
     for a in tables:
-        cur.execute(f"SELECT * FROM '{a}';")
-        data.append(cur.fetchall())
-    for b in data:
+        data.append(read_week(conn, a))
+    #Index by position: filler weeks hold the same rows as the week before them
+    for i, b in enumerate(data):
         for c in b:
             if playerName == c[1]:
-                x.append(tables[data.index(b)])
+                x.append(tables[i])
                 dataPoint = c[index].replace(specialChar, "")
                 try:
                     y.append(int(dataPoint))
@@ -133,10 +134,12 @@ if sys.argv[1] == "-n":
     tables = getTables()
     rank1 = []
     for a in tables:
-        cur.execute(f'SELECT * FROM "{a}" WHERE "rank" = "1";')
-        rank1.append(cur.fetchall())
+        rank1.append([row for row in read_week(conn, a) if row[0] == "1"])
     data = []
     for b in rank1:
+        #Skip weeks without a number 1 (e.g. empty weeks)
+        if not b:
+            continue
         row = b[0]
         data.append(row[1])
     
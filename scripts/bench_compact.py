@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Report the size reduction of the compact week store against today's layout.
+
+Copies the database to a temporary directory, measures it vacuumed with one
+table per week, then compacts the week tables (``storage.compact_weeks``),
+vacuums again and compares file sizes. Also checks that every week reads
+back identically and times ``read_week`` in both layouts. The database
+itself is not modified.
+
+With ``--simulate``, a database of simulated ATP-style weeks is used instead:
+each week some players' points change (results added, last year's dropped),
+the top 100 is re-sorted so the others shift in rank, and some weeks are
+filler copies. A keyframe interval of 1 stores every week in full.
+
+Usage: python scripts/bench_compact.py [db_path | --simulate] [keyframe_interval]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.storage import KEYFRAME_INTERVAL, compact_weeks, list_weeks, read_week, replace_weeks
+
+
+PLAYERS_PER_WEEK = 100
+SIMULATED_WEEKS = 2600
+# Share of the field whose points change in a week, and of filler weeks
+CHANGED_SHARE = 0.4
+FILLER_SHARE = 0.08
+
+
+def simulated_weeks(count, seed=1973):
+    """Return ``count`` simulated weeks of raw ``(rank, name, points)`` rows, oldest first."""
+    rng = random.Random(seed)
+    points = {f"Player {i}": rng.randint(200, 6000) for i in range(PLAYERS_PER_WEEK * 3)}
+    first = date(1973, 8, 27)
+    weeks = []
+    rows = []
+    for i in range(count):
+        week = (first + timedelta(weeks=i)).isoformat()
+        if not rows or rng.random() >= FILLER_SHARE:
+            for name in points:
+                if rng.random() < CHANGED_SHARE:
+                    points[name] = max(0, points[name] + rng.randint(-400, 500))
+            field = sorted(points.items(), key=lambda item: (-item[1], item[0]))[:PLAYERS_PER_WEEK]
+            rows = []
+            for pos, (name, value) in enumerate(field):
+                tied = pos > 0 and field[pos - 1][1] == value or pos + 1 < len(field) and field[pos + 1][1] == value
+                first_pos = next(p for p in range(pos + 1) if field[p][1] == value)
+                rows.append((f"T{first_pos + 1}" if tied else str(pos + 1), name, f"{value:,}"))
+        weeks.append((week, rows))
+    return weeks
+
+
+def vacuumed_size(conn, path):
+    conn.execute("VACUUM;")
+    return os.path.getsize(path)
+
+
+def time_reads(conn, weeks):
+    start = time.perf_counter()
+    for week in weeks:
+        read_week(conn, week)
+    return (time.perf_counter() - start) / len(weeks) * 1000
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, "rankings.db")
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else KEYFRAME_INTERVAL
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rankings.db")
+        if source == "--simulate":
+            conn = sqlite3.connect(path)
+            replace_weeks(conn, simulated_weeks(SIMULATED_WEEKS))
+        else:
+            shutil.copyfile(source, path)
+            conn = sqlite3.connect(path)
+        weeks = list_weeks(conn)
+        expected = {week: [tuple(row) for row in read_week(conn, week)] for week in weeks}
+        before = vacuumed_size(conn, path)
+        table_ms = time_reads(conn, weeks)
+
+        start = time.perf_counter()
+        counts = compact_weeks(conn, keyframe_interval=interval)
+        elapsed = time.perf_counter() - start
+        after = vacuumed_size(conn, path)
+        compact_ms = time_reads(conn, weeks)
+
+        mismatched = [week for week in weeks if read_week(conn, week) != expected[week]]
+        conn.close()
+
+    print(f"{len(weeks)} weeks: {counts['key']} keyframes (every {interval} weeks at most), "
+          f"{counts['delta']} deltas, {counts['alias']} aliases; compacted in {elapsed:.1f}s")
+    print(f"Weeks reconstructed identically: {len(weeks) - len(mismatched)}/{len(weeks)}")
+    print()
+    print(f"{'Layout':<20}{'MB':>10}{'read_week ms':>16}")
+    print(f"{'week tables':<20}{before / 1e6:>10.1f}{table_ms:>16.3f}")
+    print(f"{'compact store':<20}{after / 1e6:>10.1f}{compact_ms:>16.3f}")
+    print(f"Size reduction: {(before - after) / 1e6:.1f} MB ({(before - after) / before:.0%})")
+    if mismatched:
+        sys.exit(f"Mismatched weeks: {', '.join(mismatched[:10])}")
+
+
+if __name__ == "__main__":
+    main()
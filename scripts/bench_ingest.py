@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark writing scraped weeks into a fresh database, in rows per second.
+
+Compares the old per-row path (one formatted INSERT and one commit per row,
+fact table loaded week by week) with ``storage.replace_weeks`` batches, with
+and without WAL journaling (``storage.bulk_load``), and times a full
+``rebuild_fact_table`` of the result. Uses synthetic weeks of 100 players in
+a temporary directory; rankings.db is not touched.
+
+Usage: python scripts/bench_ingest.py [weeks] [batch_size]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.storage import bulk_load, load_week, rebuild_fact_table, replace_weeks
+
+PLAYERS_PER_WEEK = 100
+
+
+def synthetic_weeks(count):
+    """Return ``count`` weeks of raw ``(rank, name, points)`` rows, oldest first."""
+    first = date(1990, 1, 1)
+    weeks = []
+    for i in range(count):
+        week = (first + timedelta(weeks=i)).isoformat()
+        # Rotate the field a little each week so aggregates change
+        rows = [
+            (str(rank + 1), f"Player {(rank + i) % 300}", f"{10000 - rank * 90:,}")
+            for rank in range(PLAYERS_PER_WEEK)
+        ]
+        weeks.append((week, rows))
+    return weeks
+
+
+def per_row(conn, weeks):
+    # The pre-batching generate.py path
+    for week, rows in weeks:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS `{week}`(rank, name, points)")
+        for row in rows:
+            conn.execute(f"INSERT INTO `{week}` VALUES {tuple(row)}")
+            conn.commit()
+        load_week(conn, week)
+        conn.commit()
+
+
+def batched(batch_size):
+    def write(conn, weeks):
+        for i in range(0, len(weeks), batch_size):
+            replace_weeks(conn, weeks[i:i + batch_size])
+    return write
+
+
+def with_wal(write):
+    def write_wal(conn, weeks):
+        with bulk_load(conn):
+            write(conn, weeks)
+    return write_wal
+
+
+def run(name, write, weeks, directory):
+    path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    write(conn, weeks)
+    elapsed = time.perf_counter() - start
+    rows = len(weeks) * PLAYERS_PER_WEEK
+    print(f"{name:<32}{elapsed:>10.2f}{rows / elapsed:>14,.0f}")
+    return conn
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    weeks = synthetic_weeks(count)
+    print(f"{count} weeks x {PLAYERS_PER_WEEK} rows, batches of {batch_size} weeks")
+    print()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'Writer':<32}{'seconds':>10}{'rows/s':>14}")
+        run("per-row commits", per_row, weeks, directory).close()
+        run("replace_weeks", batched(batch_size), weeks, directory).close()
+        conn = run("replace_weeks + WAL", with_wal(batched(batch_size)), weeks, directory)
+
+        start = time.perf_counter()
+        rebuild_fact_table(conn)
+        elapsed = time.perf_counter() - start
+        print(f"{'rebuild_fact_table':<32}{elapsed:>10.2f}{count * PLAYERS_PER_WEEK / elapsed:>14,.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
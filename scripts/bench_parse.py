@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the rankings page parsers, in pages per second.
+
+Parses a corpus of saved rankings pages (every ``*.html`` file in the given
+directory) with each available backend in ``src.scraper.PARSERS``, checks
+that all of them return identical rows for every page, and reports
+throughput. Without a directory, a synthetic corpus of 100-row pages in the
+atptour.com markup is used.
+
+Usage: python scripts/bench_parse.py [pages_dir] [repeat]
+"""
+import glob
+import os
+import sys
+import time
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.scraper import NAME_CLASS, PARSERS, POINTS_CLASS, RANK_CLASS, get_parser
+
+SYNTHETIC_PAGES = 20
+PLAYERS_PER_PAGE = 100
+
+
+def synthetic_page(i):
+    """A rankings page with surrounding markup roughly the size of the real one."""
+    rows = "".join(
+        f'<tr class="lower-row"><td class="{RANK_CLASS}"> {rank + 1} </td>'
+        f'<td class="player bold heavy large-cell"><img src="/flags/x.svg" alt="flag"></td>'
+        f'<td class="{NAME_CLASS}"><span><a href="/players/p{rank}">Player {(rank + i) % 300}</a></span></td>'
+        f'<td class="age small-cell">{20 + rank % 15}</td>'
+        f'<td class="{POINTS_CLASS}"><a href="/breakdown">{10000 - rank * 90:,}</a></td>'
+        f'<td class="tourns small-cell">{18 + rank % 8}</td></tr>'
+        for rank in range(PLAYERS_PER_PAGE)
+    )
+    navigation = "".join(f'<li class="nav-item"><a href="/section/{n}">Section {n}</a></li>' for n in range(200))
+    return (
+        f'<!DOCTYPE html><html><head><title>Rankings</title><script>var x = "<td>";</script></head>'
+        f'<body><nav><ul>{navigation}</ul></nav><table class="mega-table"><tbody>{rows}</tbody></table>'
+        f'<footer><!-- footer --></footer></body></html>'
+    ).encode()
+
+
+def load_corpus(directory):
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+    if not paths:
+        sys.exit(f"No .html pages in {directory}")
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = load_corpus(sys.argv[1])
+        source = sys.argv[1]
+    else:
+        pages = [synthetic_page(i) for i in range(SYNTHETIC_PAGES)]
+        source = "synthetic pages"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size = sum(len(page) for page in pages)
+    print(f"{len(pages)} {source} ({size / len(pages) / 1024:.0f} KiB each), {repeat} passes")
+    print(f"Default parser: {get_parser().__name__}")
+    print()
+
+    # Every backend must return exactly the rows of the html.parser baseline
+    expected = [PARSERS["html.parser"](page) for page in pages]
+    for name, parse in PARSERS.items():
+        for i, page in enumerate(pages):
+            if parse(page) != expected[i]:
+                sys.exit(f"{name} disagrees with html.parser on page {i}")
+    print(f"Output identical across {', '.join(PARSERS)}")
+    print()
+
+    print(f"{'Parser':<16}{'seconds':>10}{'pages/s':>12}{'speedup':>10}")
+    baseline = None
+    for name, parse in PARSERS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                parse(page)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:<16}{elapsed:>10.2f}{len(pages) * repeat / elapsed:>12,.1f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark serialization time and bytes on the wire for large API responses.
+
+Compares FastAPI's default JSON path (jsonable_encoder + json.dumps), orjson
+(if installed) and the pre-serialized response cache, with and without gzip.
+
+Also compares the full, compact and MessagePack career formats.
+
+Usage: python scripts/bench_responses.py ["Player Name"]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from fastapi.encoders import jsonable_encoder
+
+from src import services
+from src.encoding import compact_career, msgpack, pack_career
+from src.responses import SerializedCache, dumps
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def timeit(func, repeat=200):
+    """Return the mean time of func() in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def default_dumps(content):
+    # What FastAPI does for a plain dict returned from a handler
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main():
+    if len(sys.argv) > 1:
+        player = sys.argv[1]
+    else:
+        # Default to the player with the longest career
+        conn = services.get_db_connection()
+        player = conn.execute(
+            "SELECT player FROM player_stats ORDER BY weeks_top_100 DESC LIMIT 1"
+        ).fetchone()[0]
+
+    career = services.get_player_career(player)
+    body = default_dumps(career)
+    print(f"Player: {player} ({len(career['ranking_dates'])} ranking weeks)")
+    print()
+
+    cache = SerializedCache(1024 * 1024)
+    cache.put(player, body)
+
+    print(f"{'Serializer':<28}{'ms/response':>12}")
+    print(f"{'FastAPI default':<28}{timeit(lambda: default_dumps(career)):>12.3f}")
+    if orjson is not None:
+        assert orjson.dumps(career) == body
+        print(f"{'orjson (ATP_FAST_JSON=1)':<28}{timeit(lambda: orjson.dumps(career)):>12.3f}")
+    else:
+        print(f"{'orjson (ATP_FAST_JSON=1)':<28}{'not installed':>12}")
+    print(f"{'pre-serialized cache hit':<28}{timeit(lambda: cache.get(player)):>12.3f}")
+    print()
+
+    compressed = gzip.compress(body, compresslevel=9)
+    print(f"{'Encoding':<28}{'bytes':>12}")
+    print(f"{'identity':<28}{len(body):>12,}")
+    print(f"{'gzip':<28}{len(compressed):>12,}  ({len(compressed) / len(body):.0%})")
+    print(f"{'gzip time (ms)':<28}{timeit(lambda: gzip.compress(body, compresslevel=9), repeat=50):>12.3f}")
+    print()
+
+    print(f"{'Career format':<28}{'bytes':>12}{'gzip':>12}")
+    formats = [("full", body), ("compact", dumps(compact_career(career)))]
+    if msgpack is not None:
+        formats.append(("msgpack", pack_career(career)))
+    for name, encoded in formats:
+        print(f"{name:<28}{len(encoded):>12,}{len(gzip.compress(encoded, compresslevel=9)):>12,}")
+
+
+if __name__ == "__main__":
+    main()
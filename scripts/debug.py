@@ -1,22 +1,24 @@
 #Find tables with only one row (may cause some issues)
 import sqlite3
+import sys
 import os
 
 # Get the project root directory (parent of scripts/)
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 db_path = os.path.join(project_root, 'rankings.db')
+sys.path.insert(0, project_root)
+
+from src.storage import list_weeks, read_week
 
 conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
 
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'temp_%'")
-tables = [row[0] for row in cursor.fetchall()]
+#Only the ranking weeks (week tables or the compact store), not the fact/aggregate tables
+tables = list_weeks(conn)
 
 single_row_tables = []
 
 for table in tables:
-    cursor.execute(f"SELECT COUNT(*) FROM '{table}'")
-    count = cursor.fetchone()[0]
+    count = len(read_week(conn, table))
     if count == 1:
         single_row_tables.append(table)
 
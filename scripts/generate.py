@@ -1,98 +1,129 @@
-import requests
-from bs4 import BeautifulSoup as bs
+#!/usr/bin/env python3
+"""
+Scrape every ranking week from atptour.com into rankings.db.
+
+Weeks are fetched concurrently through ``src.scraper`` (shared session,
+token-bucket rate limit, retries with backoff) and written as they arrive,
+a batch of weeks per transaction with WAL journaling during the load.
+Progress is journaled per week (fetched, parsed, written, failed) in the
+database, and each run only plans the weeks the journal does not show as
+finished, so an interrupted run resumes where it stopped when started again.
+
+Every fetched page is kept in a compressed archive (``archive/`` by default)
+and later runs only download pages whose ETag/Last-Modified changed.
+``--replay`` rebuilds every archived week from the archive alone, without
+the network, e.g. to re-parse after a schema change, then fills and freezes
+the remaining Mondays as ``filler.py`` does, from the archived week list.
+
+Options:
+    --workers N   Concurrent requests (default 4)
+    --rate R      Requests started per second (default 2)
+    --retries N   Retries per week (default 3)
+    --batch N     Weeks written per transaction (default 25)
+    --all         Re-scrape weeks that are already finished
+    --archive DIR Page archive directory (default archive/)
+    --no-archive  Do not read or write the page archive
+    --replay      Rebuild all archived weeks (and filler weeks) from the archive, offline
+
+Usage: python scripts/generate.py [--workers N] [--rate R] [--retries N] [--batch N] [--all]
+                                  [--archive DIR | --no-archive] [--replay]
+"""
+import argparse
 import sqlite3
 import time
 import os
+import sys
 
 # Get the project root directory (parent of scripts/)
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 db_path = os.path.join(project_root, 'rankings.db')
+archive_path = os.path.join(project_root, 'archive')
+sys.path.insert(0, project_root)
+
+from src.archive import PageArchive
+from src.scraper import RANKINGS_URL, fetch, make_session, parse_week, parse_weeks, scrape_weeks, week_url
+from src.storage import bulk_load, mark_weeks, plan_weeks, replace_weeks
+from src.updater import update_database
+
+# Shared by collectData so callers such as filler.py reuse pooled connections
+session = make_session()
+
+
+def collectData(week, connection, archive=None):
+    """Scrape a single week and store it (used by filler.py)."""
+    replace_weeks(connection, [(week, parse_week(fetch(session, week_url(week), archive=archive)))])
 
-conn = sqlite3.connect(db_path)
-
-def extract_text(soup, element_class):
-    tags = soup.find_all(class_=element_class)
-    texts = [tag.get_text(strip=True) for tag in tags if tag.get_text(strip=True)]
-    return texts if texts else ["N/A"]
-
-def collectData (week, connection):
-    #Use headers to make connection more legit
-    headers = {"User-Agent": "Mozilla/5.0"}
-    sigma = requests.Session()
-    Rankings = sigma.get(
-        url=f"https://www.atptour.com/en/rankings/singles?dateWeek={week}&rankRange=0-100",
-        headers=headers,
-        timeout=5
-    )
-    ##PARSE DATA
-    soup = bs(Rankings.content, "html.parser")
-    #Debug: print(Rankings.content)
-
-    #Define Sets
-    global names
-    global points
-    global allPlayer
-    global ranks
-    names = []
-    points = []
-    ranks = []
-    allPlayer = []
-
-    #Name
-    names = extract_text(soup, "name center")
-    #Ranking Points
-    points = extract_text(soup, "points center bold extrabold small-cell")
-    #Ranks
-    ranks = extract_text(soup, "rank bold heavy tiny-cell")
-
-    #Arrange Data in a Nice and Neat Way
-    print("Arranging Data...")
-    count = 0
-    while count < len(names):
-        tempSet = []
-        tempSet.append(ranks[count])
-        tempSet.append(names[count])
-        tempSet.append(points[count])
-        allPlayer.append(tempSet)
-        count+=1
-    cur = connection.cursor()
-    cur.execute(f"CREATE TABLE IF NOT EXISTS `{week}`(rank, name, points)")
-    for x in allPlayer:
-        x = tuple(x)
-        cur.execute(f"INSERT INTO `{week}` VALUES {x}")
-        connection.commit()
 
 #Dates
 def extract_weeks(soup):
-    select = soup.find(id="dateWeek-filter")
-    if not select:
-        return ["N/A"]
-    options = select.find_all("option")
-    weeks = []
-    for opt in options:
-        val = opt.get("value")
-        label = opt.get_text(strip=True)
-
-        if val == "Current Week":
-            # Convert label like "2025.03.31" → "2025-03-31"
-            formatted_label = label.replace(".", "-")
-            weeks.append(formatted_label)
-        elif val and val.count("-") == 2:
-            weeks.append(val)
-    return weeks
-
-#Done so that above functions can be reused in update.py
-if __name__ == '__main__':
+    return parse_weeks(str(soup))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the ATP ranking weeks into rankings.db")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=25)
+    parser.add_argument("--all", action="store_true")
+    parser.add_argument("--archive", default=archive_path)
+    parser.add_argument("--no-archive", action="store_true")
+    parser.add_argument("--replay", action="store_true")
+    args = parser.parse_args()
+    if args.replay and args.no_archive:
+        parser.error("--replay reads from the archive; drop --no-archive")
+
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    archive = None if args.no_archive else PageArchive(args.archive)
+    scrape_session = None if args.replay else make_session(args.workers)
+
     #Request Dates
-    singles = requests.Session()
-    weeks = singles.get(url="https://www.atptour.com/en/rankings/singles", timeout=5)
-    soup = bs(weeks.content, "html.parser")
-
-    #Extract Rankings for dates
-    dates = extract_weeks(soup)
-    start_date = "1996-03-11" #Adjust in case collect.py stops due to some error midway through (expect this to happen after 10 years of data)
-    start_index = dates.index(start_date) if start_date in dates else 0 # Start from this date
-    for x in dates[start_index:]:
-        collectData(x, conn)
-        print(f"Collected data for {x}")
-        time.sleep(1)
\ No newline at end of file
+    if args.replay:
+        if RANKINGS_URL not in archive:
+            sys.exit(f"No archived rankings page in {args.archive}; run without --replay first")
+        landing = archive.get(RANKINGS_URL)
+    else:
+        landing = fetch(scrape_session, RANKINGS_URL, retries=args.retries, archive=archive)
+    dates = [week for week in parse_weeks(landing) if week != "N/A"]
+    if args.replay:
+        # Rebuild every week the archive holds
+        dates = [week for week in dates if week_url(week) in archive]
+    elif not args.all:
+        dates = plan_weeks(conn, dates, listed=dates)
+    if args.replay:
+        print(f"Replaying {len(dates)} weeks from {args.archive}")
+    else:
+        print(f"Scraping {len(dates)} weeks with {args.workers} workers at {args.rate} requests/s")
+
+    def write(batch):
+        replace_weeks(conn, batch)
+        print(f"Collected data for {', '.join(week for week, _ in batch)}")
+
+    def journal(week, status):
+        mark_weeks(conn, [week], status)
+        conn.commit()
+
+    with bulk_load(conn):
+        failures = scrape_weeks(
+            dates, write, session=scrape_session, workers=args.workers, rate=args.rate,
+            retries=args.retries, batch_size=args.batch, archive=archive, replay=args.replay,
+            on_status=journal
+        )
+    for week, error in failures.items():
+        mark_weeks(conn, [week], "failed", str(error))
+    conn.commit()
+    if args.replay:
+        # Filler and freeze weeks as the online filler.py run made them
+        summary = update_database(conn, archive=archive, replay=True, log=print)
+        print(", ".join(f"{count} {name}" for name, count in summary.items()))
+    conn.close()
+    for week, error in sorted(failures.items()):
+        print(f"Failed {week}: {error}")
+    print(f"Done in {time.time() - start:.1f}s ({len(dates) - len(failures)} weeks, {len(failures)} failed)")
+    sys.exit(1 if failures else 0)
+
+
+#Done so that above functions can be reused in filler.py
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Build the consolidated ``rankings`` fact table from the per-week tables.
+
+By default only weeks missing from the fact table are loaded (and weeks whose
+table was dropped are removed), updating the ``player_stats`` and
+``no1_leaderboard`` aggregates of the affected players.
+
+Options:
+    --rebuild     Recreate the fact table and aggregates from scratch
+    --stats       Recompute only the aggregates from the fact table
+    --check       Compare the stored aggregates with a full recomputation
+    --compact     Fold the week tables into the delta-encoded week store
+    --expand      Recreate the week tables from the week store
+
+Usage: python scripts/migrate.py [--rebuild | --stats | --check | --compact | --expand]
+"""
+import sqlite3
+import sys
+import os
+import time
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+db_path = os.path.join(project_root, 'rankings.db')
+sys.path.insert(0, project_root)
+
+from src.storage import (
+    check_player_stats, compact_weeks, expand_weeks, rebuild_fact_table, rebuild_player_stats, sync_fact_table,
+)
+
+
+def main():
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    if "--check" in sys.argv:
+        problems = check_player_stats(conn)
+        for problem in problems:
+            print(problem)
+        conn.close()
+        print(f"{len(problems)} inconsistencies found")
+        sys.exit(1 if problems else 0)
+    elif "--rebuild" in sys.argv:
+        weeks = rebuild_fact_table(conn)
+        print(f"Rebuilt fact table from {weeks} weeks")
+    elif "--compact" in sys.argv or "--expand" in sys.argv:
+        size = os.path.getsize(db_path)
+        if "--compact" in sys.argv:
+            counts = compact_weeks(conn)
+            print(f"Stored {counts['key']} keyframes, {counts['delta']} deltas and {counts['alias']} aliases")
+        else:
+            print(f"Recreated {expand_weeks(conn)} week tables")
+        conn.execute("VACUUM;")
+        print(f"Database size: {size / 1e6:.1f} MB -> {os.path.getsize(db_path) / 1e6:.1f} MB")
+    elif "--stats" in sys.argv:
+        players = rebuild_player_stats(conn)
+        conn.commit()
+        print(f"Rebuilt aggregates for {players} players")
+    else:
+        added, removed = sync_fact_table(conn)
+        print(f"Fact table synced: {added} weeks added, {removed} weeks removed")
+    conn.close()
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
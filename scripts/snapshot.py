@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Export the NumPy engine's arrays to a memory-mappable snapshot file.
+
+With ``ATP_ENGINE=numpy``, every uvicorn worker maps this file read-only
+instead of loading the rankings fact table into its own arrays, so N workers
+share one page-cached copy and start almost instantly. The snapshot records
+the database file it was exported from, and the service layer ignores it once
+rankings.db is changed or replaced; re-run this after updating rankings.db
+(the web app's background updates re-export it themselves).
+
+Usage: python scripts/snapshot.py [output_path]   (default rankings.snapshot)
+"""
+import os
+import sqlite3
+import sys
+import time
+
+# Get the project root directory (parent of scripts/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+db_path = os.path.join(project_root, 'rankings.db')
+sys.path.insert(0, project_root)
+
+from src.db import file_fingerprint
+from src.engine import RankingsMatrix
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, "rankings.snapshot")
+    source = file_fingerprint(db_path)
+    conn = sqlite3.connect(db_path)
+    start = time.perf_counter()
+    matrix = RankingsMatrix.from_connection(conn)
+    built = time.perf_counter() - start
+    conn.close()
+
+    size = matrix.save_snapshot(path, source=source)
+    start = time.perf_counter()
+    RankingsMatrix.from_snapshot(path)
+    mapped = time.perf_counter() - start
+    print(f"Wrote {path}: {len(matrix.weeks)} weeks, {len(matrix.players)} players, "
+          f"{len(matrix.rank)} rows, {size / 1e6:.1f} MB")
+    print(f"Engine startup: {built * 1000:.0f} ms from the database, {mapped * 1000:.1f} ms from the snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+On-disk archive of fetched rankings pages.
+
+Page bodies are stored gzip-compressed and content-addressed by their SHA-256
+(``objects/ab/cdef….html.gz``), so a page that did not change between runs is
+stored once. ``index.json`` maps each URL to its current body and the ETag /
+Last-Modified the server sent with it, which ``scraper.fetch`` sends back as
+``If-None-Match`` / ``If-Modified-Since`` to refetch only pages that changed.
+
+Every file is written to a temporary name and renamed into place, so an
+interrupted run never leaves a truncated page or index behind. ``put`` only
+updates the in-memory index (it is called from scraper threads); ``save``
+persists it.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+INDEX_VERSION = 1
+
+
+class PageArchive:
+    """A content-addressed archive of pages under ``root``, indexed by URL."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pages: Dict[str, Dict[str, Optional[str]]] = {}
+        path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != INDEX_VERSION:
+                raise ValueError(f"Unsupported archive index version {index.get('version')} in {path}")
+            self._pages = index["pages"]
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._pages
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pages)
+
+    def urls(self) -> List[str]:
+        with self._lock:
+            return sorted(self._pages)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], f"{digest[2:]}.html.gz")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def put(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        """Store ``body`` as the current page for ``url``; return its SHA-256."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            # mtime=0 keeps the compressed bytes a function of the content only
+            self._write_atomic(path, gzip.compress(body, mtime=0))
+        entry = {
+            "sha256": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self._pages[url] = entry
+            self._dirty = True
+        return digest
+
+    def get(self, url: str) -> bytes:
+        """Return the archived body of ``url``; ``KeyError`` if it was never archived."""
+        with self._lock:
+            digest = self._pages[url]["sha256"]
+        with open(self._object_path(digest), "rb") as f:
+            body = gzip.decompress(f.read())
+        if hashlib.sha256(body).hexdigest() != digest:
+            raise ValueError(f"Archived page for {url} is corrupt")
+        return body
+
+    def fetched(self, url: str) -> datetime:
+        """When the archived copy of ``url`` was fetched; ``KeyError`` if it was never archived."""
+        with self._lock:
+            return datetime.fromisoformat(self._pages[url]["fetched"])
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Request headers that revalidate the archived copy of ``url``, if any."""
+        with self._lock:
+            entry = self._pages.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(self) -> None:
+        """Write the index if it changed since it was loaded or last saved."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"version": INDEX_VERSION, "pages": self._pages}, indent=1, sort_keys=True)
+            self._dirty = False
+        self._write_atomic(os.path.join(self.root, INDEX_FILE), data.encode())
@@ -0,0 +1,52 @@
+"""
+Cached catalog of the ranking weeks available in the database.
+
+Built once per database version so pages and services can list weeks,
+group them by year, check existence and find neighbouring weeks without
+querying ``sqlite_master`` on every request.
+"""
+from bisect import bisect_left
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def week_desc(week: str) -> Tuple[int, ...]:
+    """Sort key putting later ``YYYY-MM-DD`` weeks first."""
+    return tuple(-int(part) for part in week.split("-"))
+
+
+class WeekCatalog:
+    """Immutable, sorted view of the available ``YYYY-MM-DD`` weeks."""
+
+    def __init__(self, weeks: Iterable[str], version: Hashable = None):
+        self.version = version
+        self._ascending = sorted(set(weeks))
+        self._weeks = frozenset(self._ascending)
+        # Most recent first, matching the order of get_all_weeks()
+        self.weeks: List[str] = self._ascending[::-1]
+
+        self.by_year: Dict[str, List[str]] = {}
+        for week in self.weeks:
+            self.by_year.setdefault(week[:4], []).append(week)
+
+    def __contains__(self, week: str) -> bool:
+        return week in self._weeks
+
+    def __len__(self) -> int:
+        return len(self._ascending)
+
+    @property
+    def latest(self) -> Optional[str]:
+        """The most recent week, or None if the catalog is empty."""
+        return self._ascending[-1] if self._ascending else None
+
+    def previous(self, week: str) -> Optional[str]:
+        """The week before ``week`` (which need not exist itself), or None."""
+        index = bisect_left(self._ascending, week)
+        return self._ascending[index - 1] if index > 0 else None
+
+    def next(self, week: str) -> Optional[str]:
+        """The week after ``week`` (which need not exist itself), or None."""
+        index = bisect_left(self._ascending, week)
+        if index < len(self._ascending) and self._ascending[index] == week:
+            index += 1
+        return self._ascending[index] if index < len(self._ascending) else None
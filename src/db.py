@@ -0,0 +1,119 @@
+"""
+Pooled read-only SQLite connections for the service layer.
+
+Each thread keeps one connection per database path, opened read-only with
+tuned pragmas and a prepared-statement cache, and reuses it across requests.
+A connection is reopened automatically when the database file is replaced
+(e.g. after a rebuild swaps in a new ``rankings.db``).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+# Number of compiled statements kept per connection
+CACHED_STATEMENTS = 256
+# Memory-map up to 256 MiB of the database file
+MMAP_SIZE = 256 * 1024 * 1024
+# Page cache per connection, in KiB (negative values are KiB for SQLite)
+CACHE_SIZE_KIB = 64 * 1024
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Identify the contents of the database file at ``path`` (and its WAL).
+
+    Combines the inode, size and modification time with SQLite's file change
+    counter, so rewriting a file in place or swapping in another one gives a
+    different fingerprint. A missing or empty WAL counts as no WAL.
+    """
+    parts = []
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            f.seek(24)
+            counter = int.from_bytes(f.read(4), "big")
+        parts.append((stat.st_ino, stat.st_size, stat.st_mtime_ns, counter))
+    except FileNotFoundError:
+        parts.append(None)
+    try:
+        stat = os.stat(path + "-wal")
+        parts.append((stat.st_size, stat.st_mtime_ns) if stat.st_size else None)
+    except FileNotFoundError:
+        parts.append(None)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def open_readonly(path: str) -> sqlite3.Connection:
+    """Open a read-only connection to ``path`` with the service-layer pragmas."""
+    uri = f"file:{os.path.abspath(path)}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, cached_statements=CACHED_STATEMENTS)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    return conn
+
+
+class ConnectionPool:
+    """Hands out one reusable read-only connection per thread and database path."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reopens = 0
+
+    def _connections(self) -> Dict[str, Tuple[sqlite3.Connection, Optional[Tuple[int, int]]]]:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        return connections
+
+    def get(self, path: str) -> sqlite3.Connection:
+        """Return this thread's connection to ``path``, opening or reopening it as needed."""
+        connections = self._connections()
+        identity = _file_identity(path)
+        entry = connections.get(path)
+
+        if entry is not None and entry[1] == identity:
+            with self._lock:
+                self.hits += 1
+            return entry[0]
+
+        if entry is not None:
+            # The file was replaced since this connection was opened
+            entry[0].close()
+            del connections[path]
+            with self._lock:
+                self.reopens += 1
+        else:
+            with self._lock:
+                self.misses += 1
+
+        conn = open_readonly(path)
+        connections[path] = (conn, identity)
+        return conn
+
+    def close(self) -> None:
+        """Close the calling thread's connections."""
+        connections = self._connections()
+        for conn, _ in connections.values():
+            conn.close()
+        connections.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool counters: hits (reused), misses (opened) and reopens (file replaced)."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "reopens": self.reopens}
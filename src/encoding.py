@@ -0,0 +1,118 @@
+"""
+Compact columnar encoding of player careers.
+
+Career dates are almost all regular 7-day steps, so instead of repeating
+full ISO strings they are sent as a start date plus run-length encoded day
+offsets. The MessagePack variant (optional ``msgpack`` dependency) also packs
+rankings and points as little-endian int16/int32 arrays.
+"""
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+CAREER_FORMATS = ("full", "compact", "msgpack")
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def encode_dates(dates: List[str]) -> Dict[str, Any]:
+    """
+    Encode ``YYYY-MM-DD`` dates as ``{"start": first, "runs": [[step_days, count], ...]}``.
+
+    Each run means ``count`` consecutive steps of ``step_days`` (negative when
+    the dates are most recent first), e.g. a weekly career is a single run.
+    """
+    if not dates:
+        return {"start": None, "runs": []}
+    runs: List[List[int]] = []
+    previous = date.fromisoformat(dates[0])
+    for value in dates[1:]:
+        current = date.fromisoformat(value)
+        step = (current - previous).days
+        if runs and runs[-1][0] == step:
+            runs[-1][1] += 1
+        else:
+            runs.append([step, 1])
+        previous = current
+    return {"start": dates[0], "runs": runs}
+
+
+def decode_dates(encoded: Dict[str, Any]) -> List[str]:
+    """Inverse of :func:`encode_dates`."""
+    start: Optional[str] = encoded["start"]
+    if start is None:
+        return []
+    current = date.fromisoformat(start)
+    dates = [start]
+    for step, count in encoded["runs"]:
+        for _ in range(count):
+            current += timedelta(days=step)
+            dates.append(current.isoformat())
+    return dates
+
+
+def compact_career(career: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a ``get_player_career`` result to the compact format."""
+    return {
+        "player": career["player"],
+        "format": "compact",
+        "ranking_dates": encode_dates(career["ranking_dates"]),
+        "rankings": career["rankings"],
+        "points_dates": encode_dates(career["points_dates"]),
+        "points": career["points"]
+    }
+
+
+def expand_career(compact: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a compact career back to the ``get_player_career`` format."""
+    return {
+        "player": compact["player"],
+        "ranking_dates": decode_dates(compact["ranking_dates"]),
+        "rankings": list(compact["rankings"]),
+        "points_dates": decode_dates(compact["points_dates"]),
+        "points": list(compact["points"])
+    }
+
+
+def _pack_ints(values: List[int], typecode: str) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_ints(data: bytes, typecode: str) -> List[int]:
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder != "little":
+        unpacked.byteswap()
+    return unpacked.tolist()
+
+
+def pack_career(career: Dict[str, Any]) -> bytes:
+    """
+    Serialize a career as MessagePack: the compact format with ``rankings``
+    as little-endian int16 bytes and ``points`` as little-endian int32 bytes.
+    """
+    if msgpack is None:
+        raise RuntimeError("MessagePack output requires the msgpack package")
+    compact = compact_career(career)
+    compact["format"] = "msgpack"
+    compact["rankings"] = _pack_ints(career["rankings"], "h")
+    compact["points"] = _pack_ints(career["points"], "i")
+    return msgpack.packb(compact, use_bin_type=True)
+
+
+def unpack_career(data: bytes) -> Dict[str, Any]:
+    """Inverse of :func:`pack_career`, returning the ``get_player_career`` format."""
+    if msgpack is None:
+        raise RuntimeError("MessagePack input requires the msgpack package")
+    compact = msgpack.unpackb(data, raw=False)
+    compact["rankings"] = _unpack_ints(compact["rankings"], "h")
+    compact["points"] = _unpack_ints(compact["points"], "i")
+    return expand_career(compact)
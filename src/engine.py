@@ -0,0 +1,308 @@
+"""
+In-memory NumPy engine for ATP Rankings data.
+
+Loads the ``rankings`` fact table once into compact column arrays and answers
+the player and weeks-at-#1 queries with array slices and reductions instead
+of SQLite round trips. Enabled with ``ATP_ENGINE=numpy``; the service layer
+falls back to SQLite when NumPy is missing or loading fails.
+
+The arrays can also be saved to a snapshot file and memory-mapped read-only
+(``save_snapshot`` / ``from_snapshot``): every worker process then shares the
+same page-cached copy instead of building its own from the database.
+"""
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .leaderboard import rank_players
+from .storage import FACT_TABLE
+
+# Sentinels for values that could not be parsed from the scraped strings
+NO_RANK = 0
+NO_POINTS = -1
+
+# Snapshot layout: magic, header length (little-endian u64), JSON header with
+# the source database's fingerprint (db.file_fingerprint), the week and player
+# dictionaries and each array's dtype/offset/length, then
+# the arrays, each starting on an ALIGN boundary relative to the data section
+SNAPSHOT_MAGIC = b"ATPSNAP1"
+SNAPSHOT_ALIGN = 64
+SNAPSHOT_ARRAYS = (
+    "week_idx", "player_id", "rank", "points", "no1_players", "offsets",
+    "cum_top_100", "cum_top_10", "cum_at_1",
+)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+
+class RankingsMatrix:
+    """Column arrays for every (week, player) row, grouped by player."""
+
+    def __init__(self, weeks: List[str], players: List[str], week_idx: np.ndarray,
+                 player_id: np.ndarray, rank: np.ndarray, points: np.ndarray,
+                 no1_players: np.ndarray, derived: Optional[Dict[str, np.ndarray]] = None):
+        # weeks are sorted most recent first, so a smaller index is a later week
+        self.weeks = np.array(weeks, dtype=object)
+        self.players = players
+        self.player_index = {name: i for i, name in enumerate(players)}
+        self.week_idx = week_idx
+        self.player_id = player_id
+        self.rank = rank
+        self.points = points
+        # player id of the #1 of every week (most recent first), -1 if none
+        self.no1_players = no1_players
+        # Fingerprint of the database a snapshot was exported from, if known
+        self.source: Optional[str] = None
+        # Oldest first, for locating window bounds with searchsorted
+        self._weeks_ascending = np.array(weeks[::-1], dtype=str)
+        if derived is not None:
+            # Mapped from a snapshot rather than recomputed per process
+            self.offsets = derived["offsets"]
+            self._cum_top_100, self._cum_top_10, self._cum_at_1 = (
+                derived["cum_top_100"], derived["cum_top_10"], derived["cum_at_1"]
+            )
+            return
+        self.offsets = np.searchsorted(player_id, np.arange(len(players) + 1))
+        # Running counts over the rows, so a count over rows [a, b) is cum[b] - cum[a]
+        self._cum_top_100 = self._cumulative(rank != NO_RANK)
+        self._cum_top_10 = self._cumulative((rank != NO_RANK) & (rank <= 10))
+        self._cum_at_1 = self._cumulative(rank == 1)
+
+    @staticmethod
+    def _cumulative(mask: np.ndarray) -> np.ndarray:
+        return np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "RankingsMatrix":
+        """Build the matrix from the fact table of an open connection."""
+        rows = conn.execute(
+            f"SELECT week, rank, player, points FROM {FACT_TABLE} ORDER BY week DESC, rowid"
+        ).fetchall()
+
+        weeks = sorted({row[0] for row in rows}, reverse=True)
+        players = sorted({row[2] for row in rows})
+        week_lookup = {week: i for i, week in enumerate(weeks)}
+        player_lookup = {name: i for i, name in enumerate(players)}
+
+        week_idx = np.fromiter((week_lookup[row[0]] for row in rows), dtype=np.int32, count=len(rows))
+        player_id = np.fromiter((player_lookup[row[2]] for row in rows), dtype=np.int32, count=len(rows))
+        rank = np.fromiter(
+            (NO_RANK if row[1] is None else row[1] for row in rows), dtype=np.int16, count=len(rows)
+        )
+        points = np.fromiter(
+            (NO_POINTS if row[3] is None else row[3] for row in rows), dtype=np.int32, count=len(rows)
+        )
+
+        # The #1 of a week is its first rank-1 row, as in the SQLite path
+        no1_players = np.full(len(weeks), -1, dtype=np.int32)
+        no1_rows = np.flatnonzero(rank == 1)
+        no1_weeks, first = np.unique(week_idx[no1_rows], return_index=True)
+        no1_players[no1_weeks] = player_id[no1_rows[first]]
+
+        # Group rows by player, keeping the most-recent-first order within a player
+        order = np.argsort(player_id, kind="stable")
+        week_idx, player_id, rank, points = week_idx[order], player_id[order], rank[order], points[order]
+
+        # Keep only the first entry if a week lists the player twice
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (player_id[1:] != player_id[:-1]) | (week_idx[1:] != week_idx[:-1])
+
+        return cls(weeks, players, week_idx[keep], player_id[keep], rank[keep], points[keep], no1_players)
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "week_idx": self.week_idx, "player_id": self.player_id, "rank": self.rank, "points": self.points,
+            "no1_players": self.no1_players, "offsets": self.offsets,
+            "cum_top_100": self._cum_top_100, "cum_top_10": self._cum_top_10, "cum_at_1": self._cum_at_1,
+        }
+
+    def save_snapshot(self, path: str, source: Optional[str] = None) -> int:
+        """
+        Write the arrays to a snapshot file for ``from_snapshot``. Returns its size.
+
+        ``source`` identifies the database the arrays were built from (see
+        ``db.file_fingerprint``), so readers can reject a snapshot of other data.
+
+        The file is written under a temporary name and renamed into place, so
+        processes that already mapped the previous snapshot keep a valid copy.
+        """
+        arrays = {name: np.ascontiguousarray(array) for name, array in self._snapshot_arrays().items()}
+        layout, offset = {}, 0
+        for name in SNAPSHOT_ARRAYS:
+            layout[name] = [arrays[name].dtype.str, offset, len(arrays[name])]
+            offset += _aligned(arrays[name].nbytes)
+        header = json.dumps({
+            "source": source, "weeks": self.weeks.tolist(), "players": list(self.players), "arrays": layout
+        }).encode()
+        prefix = SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(prefix.ljust(_aligned(len(prefix)), b"\0"))
+                for name in SNAPSHOT_ARRAYS:
+                    data = arrays[name].tobytes()
+                    f.write(data.ljust(_aligned(len(data)), b"\0"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return os.path.getsize(path)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "RankingsMatrix":
+        """
+        Map a snapshot written by ``save_snapshot`` read-only.
+
+        The arrays are views into the mapping, so nothing is copied and every
+        process mapping the same file shares its pages through the OS cache.
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a rankings snapshot")
+        start = len(SNAPSHOT_MAGIC) + 8
+        (header_size,) = struct.unpack("<Q", mapped[len(SNAPSHOT_MAGIC):start])
+        header = json.loads(mapped[start:start + header_size])
+        data = _aligned(start + header_size)
+        arrays = {
+            name: np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=data + offset)
+            for name, (dtype, offset, count) in header["arrays"].items()
+        }
+        matrix = cls(
+            header["weeks"], header["players"], arrays["week_idx"], arrays["player_id"], arrays["rank"],
+            arrays["points"], arrays["no1_players"], derived=arrays,
+        )
+        matrix.source = header.get("source")
+        return matrix
+
+    def _week_range(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        """Return the ``[first, last)`` week indices (most recent first) within the window."""
+        n = len(self._weeks_ascending)
+        lo = 0 if start is None else int(np.searchsorted(self._weeks_ascending, start, side="left"))
+        hi = n if end is None else int(np.searchsorted(self._weeks_ascending, end, side="right"))
+        return n - hi, n - lo
+
+    def _player_slice(self, player: str, start: Optional[str] = None, end: Optional[str] = None) -> slice:
+        pid = self.player_index.get(player)
+        if pid is None:
+            return slice(0, 0)
+        first, last = self.offsets[pid], self.offsets[pid + 1]
+        if start is not None or end is not None:
+            # A player's rows are most recent first, so week indices ascend
+            week_lo, week_hi = self._week_range(start, end)
+            player_weeks = self.week_idx[first:last]
+            first, last = (
+                first + np.searchsorted(player_weeks, week_lo, side="left"),
+                first + np.searchsorted(player_weeks, week_hi, side="left"),
+            )
+        return slice(int(first), int(last))
+
+    @staticmethod
+    def _not_found(player: str, start: Optional[str], end: Optional[str]) -> ValueError:
+        if start is None and end is None:
+            return ValueError(f"Player {player} not found")
+        return ValueError(f"Player {player} not found between {start or 'the start'} and {end or 'the latest week'}")
+
+    def player_factfile(self, player: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """Vectorized equivalent of ``services.get_player_factfile``."""
+        rows = self._player_slice(player, start, end)
+        week_idx, rank, points = self.week_idx[rows], self.rank[rows], self.points[rows]
+
+        weeks_top_100 = int(self._cum_top_100[rows.stop] - self._cum_top_100[rows.start])
+        if weeks_top_100 == 0:
+            raise self._not_found(player, start, end)
+        ranked = rank != NO_RANK
+        rankings = rank[ranked]
+        ranking_weeks = week_idx[ranked]
+
+        career_high = int(rankings.min())
+        career_high_date = self.weeks[ranking_weeks[np.argmax(rankings == career_high)]]
+
+        valid_points = points[points != NO_POINTS]
+        points_weeks = week_idx[points != NO_POINTS]
+        max_points = int(valid_points.max()) if valid_points.size else 0
+        max_points_date = "No Points System"
+        if max_points > 0:
+            max_points_date = self.weeks[points_weeks[np.argmax(valid_points == max_points)]]
+
+        return {
+            "player": player,
+            "career_high_rank": career_high,
+            "career_high_date": career_high_date,
+            "max_points": f"{max_points:,}" if max_points > 0 else "-",
+            "max_points_date": max_points_date,
+            "weeks_top_100": weeks_top_100,
+            "weeks_top_10": int(self._cum_top_10[rows.stop] - self._cum_top_10[rows.start]),
+            "weeks_at_1": int(self._cum_at_1[rows.stop] - self._cum_at_1[rows.start])
+        }
+
+    def player_career(self, player: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """Vectorized equivalent of ``services.get_player_career``."""
+        rows = self._player_slice(player, start, end)
+        week_idx, rank, points = self.week_idx[rows], self.rank[rows], self.points[rows]
+
+        ranked = rank != NO_RANK
+        scored = points > 0
+        if not ranked.any() and not scored.any():
+            raise self._not_found(player, start, end)
+
+        return {
+            "player": player,
+            "ranking_dates": self.weeks[week_idx[ranked]].tolist(),
+            "rankings": rank[ranked].tolist(),
+            "points_dates": self.weeks[week_idx[scored]].tolist(),
+            "points": points[scored].tolist()
+        }
+
+    def weeks_at_no1(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Vectorized equivalent of ``services.get_weeks_at_no1``."""
+        week_lo, week_hi = self._week_range(start, end)
+        no1_players = self.no1_players[week_lo:week_hi]
+        holders = no1_players[no1_players >= 0]
+        if holders.size == 0:
+            return []
+        ids, first_seen, counts = np.unique(holders, return_index=True, return_counts=True)
+        # Most weeks first; ties keep the order players were first seen (most recent first)
+        order = np.lexsort((first_seen, -counts))
+        return [
+            {"player": self.players[ids[i]], "weeks": int(counts[i])}
+            for i in order
+        ]
+
+    def leaderboard(self, max_rank: int, start: Optional[str] = None, end: Optional[str] = None,
+                    metric: str = "weeks", limit: int = 50) -> List[Dict[str, Any]]:
+        """Vectorized equivalent of ``services.get_leaderboard``."""
+        week_lo, week_hi = self._week_range(start, end)
+        inside = (
+            (self.rank != NO_RANK) & (self.rank <= max_rank)
+            & (self.week_idx >= week_lo) & (self.week_idx < week_hi)
+        )
+        ids = self.player_id[inside]
+        n = len(self.players)
+
+        weeks = np.bincount(ids, minlength=n)
+        rank_sum = np.bincount(ids, weights=self.rank[inside], minlength=n)
+        max_points = np.zeros(n, dtype=np.int64)
+        np.maximum.at(max_points, ids, self.points[inside])
+        # Smaller week index is a later week
+        latest = np.full(n, len(self.weeks), dtype=np.int64)
+        np.minimum.at(latest, ids, self.week_idx[inside])
+
+        return rank_players(
+            (
+                (self.players[i], int(weeks[i]), int(rank_sum[i]), int(max_points[i]), self.weeks[latest[i]])
+                for i in np.flatnonzero(weeks)
+            ),
+            metric,
+            limit,
+        )
@@ -0,0 +1,131 @@
+"""
+HTTP conditional caching for the JSON API.
+
+GET/HEAD responses under ``/api/`` and ``/mcp/tools/`` carry an ETag and
+Last-Modified derived from the dataset version, so clients can revalidate
+with ``If-None-Match`` / ``If-Modified-Since`` and get a 304 without the
+response being recomputed. A past week's tag is a digest of its rows, so it
+survives unrelated updates but not a rewrite of the week (a re-scraped
+filler week, ``generate.py --all``); only weeks journaled as scraped are
+marked immutable, filler copies and unjournaled weeks must revalidate.
+
+The ETag is weak: the same tag covers the gzip and identity encodings of a
+response (GZipMiddleware compresses after the validators are set), which are
+equivalent but not byte-identical as a strong validator would promise.
+"""
+import hashlib
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import services
+
+CACHEABLE_PREFIXES = ("/api/", "/mcp/tools/")
+PAST_WEEK_PATH = re.compile(r"^/api/week/(\d{4}-\d{2}-\d{2})$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+# Journal statuses of weeks scraped from atptour.com (see storage.JOURNAL_STATUSES)
+SCRAPED_STATUSES = ("written",)
+
+
+def is_cacheable(request: Request) -> bool:
+    """Whether conditional caching applies to this request."""
+    return request.method in ("GET", "HEAD") and request.url.path.startswith(CACHEABLE_PREFIXES)
+
+
+def cache_validators(path: str, query: str = "") -> Dict[str, str]:
+    """
+    Compute the ETag, Last-Modified and Cache-Control headers for a resource.
+
+    Blocking (may rebuild the week catalog); call through ``run_service``.
+    """
+    catalog = services.get_week_catalog()
+    match = PAST_WEEK_PATH.match(path)
+    if match and match.group(1) in catalog and match.group(1) != catalog.latest:
+        # Unchanged by other weeks being added; a filler copy is replaced once the real week is scraped
+        digest, status = services.get_week_validator(match.group(1))
+        key = f"{path}|{digest}"
+        cache_control = IMMUTABLE if status in SCRAPED_STATUSES else REVALIDATE
+    else:
+        key = f"{path}?{query}|{services.get_dataset_version()}"
+        cache_control = REVALIDATE
+
+    etag = 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(os.path.getmtime(services.DB_PATH), usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified(request: Request, validators: Dict[str, str]) -> Optional[Response]:
+    """Return a 304 response if the request's validators are still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, validators["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, validators["Last-Modified"])
+    return Response(status_code=304, headers=validators) if fresh else None
+
+
+class ConditionalCacheMiddleware:
+    """
+    Adds validators to cacheable responses and answers revalidations with 304.
+
+    Plain ASGI middleware so response bodies pass through untouched (keeping
+    Content-Length for the compression size threshold).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        if not is_cacheable(request):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            validators = await services.run_service(cache_validators, request.url.path, request.url.query)
+        except Exception:
+            # Without a readable database there is nothing to validate against
+            await self.app(scope, receive, send)
+            return
+
+        cached = not_modified(request, validators)
+        if cached is not None:
+            await cached(scope, receive, send)
+            return
+
+        async def send_with_validators(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                MutableHeaders(scope=message).update(validators)
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
@@ -0,0 +1,56 @@
+"""
+Generalized leaderboards over a rank threshold and date window.
+
+Both query engines reduce the weeks a player spent ranked inside the top
+``max_rank`` to one ``(player, weeks, rank_sum, max_points, latest_week)``
+aggregate per player; this module validates the parameters and turns those
+aggregates into the ordered leaderboard, so the two engines agree exactly.
+"""
+import heapq
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .catalog import week_desc
+
+METRICS = ("weeks", "points", "avg_rank")
+
+# Largest rank threshold and result size accepted by the leaderboard
+MAX_RANK = 100
+MAX_LEADERBOARD_SIZE = 500
+
+# (player, weeks inside the threshold, sum of those ranks, peak points, latest such week)
+Aggregate = Tuple[str, int, int, int, str]
+
+
+def check_leaderboard(max_rank: int, metric: str, limit: int) -> None:
+    """Validate leaderboard parameters; raises ValueError."""
+    if not 1 <= max_rank <= MAX_RANK:
+        raise ValueError(f"max_rank must be between 1 and {MAX_RANK}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}; expected one of {', '.join(METRICS)}")
+    if not 1 <= limit <= MAX_LEADERBOARD_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_LEADERBOARD_SIZE}")
+
+
+def rank_players(aggregates: Iterable[Aggregate], metric: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Order per-player aggregates by ``metric`` and return the top ``limit``.
+
+    "weeks" and "points" (peak points while inside the threshold) rank the
+    highest first, "avg_rank" the lowest first. Ties go to more weeks, then
+    to the player inside the threshold most recently, then by name.
+    """
+    entries = [
+        (player, weeks, round(rank_sum / weeks, 2), max_points, latest_week)
+        for player, weeks, rank_sum, max_points, latest_week in aggregates
+        if weeks
+    ]
+
+    def order(entry: Tuple[str, int, float, int, str]) -> Tuple:
+        player, weeks, avg_rank, max_points, latest_week = entry
+        primary = {"weeks": -weeks, "points": -max_points, "avg_rank": avg_rank}[metric]
+        return primary, -weeks, week_desc(latest_week), player
+
+    return [
+        {"player": player, "weeks": weeks, "points": max_points, "avg_rank": avg_rank}
+        for player, weeks, avg_rank, max_points, _ in heapq.nsmallest(limit, entries, key=order)
+    ]
@@ -1,28 +1,126 @@
 """FastAPI application for ATP Rankings data visualization."""
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
+import logging
+import os
 import sqlite3
-from typing import List, Dict, Any
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import partial
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
 # Import service layer and MCP router
 from .services import (
     get_all_weeks,
+    get_week_catalog,
     get_week_data,
     search_players as service_search_players,
     get_player_factfile as service_get_player_factfile,
     get_player_career as service_get_player_career,
-    get_weeks_at_no1 as service_get_weeks_at_no1
+    get_weeks_at_no1 as service_get_weeks_at_no1,
+    get_players_batch as service_get_players_batch,
+    get_leaderboard as service_get_leaderboard,
+    get_week_diff as service_get_week_diff,
+    bump_dataset_version,
+    check_window,
+    run_service,
+    warm_up
 )
+from . import services, updater
 from .mcp_router import router as mcp_router
+from .http_cache import ConditionalCacheMiddleware
+from .responses import FastJSONResponse, cached_json_response, cached_response, dumps
+from .encoding import CAREER_FORMATS, MSGPACK_MEDIA_TYPE, compact_career, msgpack, pack_career
 
-app = FastAPI(title="ATP Rankings Database")
+# Responses smaller than this many bytes are sent uncompressed
+GZIP_MIN_SIZE = int(os.environ.get("ATP_GZIP_MIN_SIZE", "1000"))
+
+# Scrape new weeks in the background after boot instead of before it; the
+# existing database is served meanwhile and the update swapped in when done
+UPDATE_ON_START = os.environ.get("ATP_UPDATE_ON_START", "0") == "1"
+
+# Recurring updates while running, e.g. "mon 06:00" (UTC; see updater.Schedule)
+UPDATE_SCHEDULE = os.environ.get("ATP_UPDATE_SCHEDULE", "")
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_caches(app: FastAPI) -> None:
+    """Build in-memory indexes (engine only when ATP_ENGINE=numpy); readiness follows the outcome."""
+    try:
+        await run_service(warm_up)
+        app.state.ready = True
+    except Exception as e:
+        # No usable database yet (e.g. first boot): serve, but report not ready
+        logger.warning("Cache warm-up failed: %s", e)
+        app.state.ready = False
+
+
+async def update_in_background(app: FastAPI) -> None:
+    """
+    Update a copy of the database off the event loop, swap it in and warm the
+    caches again. Cancelling the task does not stop the executor thread, so
+    shutdown sets ``app.state.update_stop``, which the update checks between
+    batches.
+    """
+    loop = asyncio.get_running_loop()
+    archive_dir = str(Path(services.DB_PATH).resolve().parent / "archive")
+    # Re-export the engine snapshot with the new database, so workers keep sharing one copy
+    snapshot_path = services.SNAPSHOT_PATH if services.ENGINE == "numpy" else None
+    swapped = await loop.run_in_executor(
+        None, updater.run_background_update, services.DB_PATH, archive_dir, bump_dataset_version,
+        partial(updater.update_database, stop=app.state.update_stop), snapshot_path
+    )
+    if swapped:
+        await warm_caches(app)
+
+
+async def run_schedule(app: FastAPI, schedule: "updater.Schedule") -> None:
+    """Run ``update_in_background`` at every scheduled time until cancelled."""
+    while True:
+        now = datetime.now(timezone.utc)
+        next_run = schedule.next_run(now)
+        logger.info("Next database update at %s", next_run.isoformat(timespec="minutes"))
+        await asyncio.sleep((next_run - now).total_seconds())
+        await update_in_background(app)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.update_stop = threading.Event()
+    # Staging copies of a worker killed mid-update would otherwise pile up next to the database
+    updater.remove_stale_staging(services.DB_PATH)
+    # A database from before the fact table gets it now, not after the first background update
+    snapshot_path = services.SNAPSHOT_PATH if services.ENGINE == "numpy" else None
+    try:
+        await run_service(updater.migrate_schema, services.DB_PATH, snapshot_path)
+    except Exception as e:
+        logger.warning("Schema migration failed: %s", e)
+    await warm_caches(app)
+    tasks = []
+    if UPDATE_ON_START:
+        tasks.append(asyncio.create_task(update_in_background(app)))
+    if UPDATE_SCHEDULE:
+        tasks.append(asyncio.create_task(run_schedule(app, updater.Schedule(UPDATE_SCHEDULE))))
+    yield
+    app.state.update_stop.set()
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(title="ATP Rankings Database", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.routing import Match
 
 # Smart HEAD handler
 @app.api_route("/{path:path}", methods=["HEAD"])
@@ -30,10 +128,13 @@ async def smart_head_handler(request: Request, path: str):
     # Normalize path (no leading slash)
     request_path = "/" + path
 
-    # Check if any GET route matches this path
+    # Check if any GET route matches this path (including path parameters);
+    # ConditionalCacheMiddleware adds the same validators a GET would get
+    scope = {"type": "http", "path": request_path, "root_path": "", "method": "GET"}
     for route in app.routes:
         if "GET" in getattr(route, "methods", []):
-            if hasattr(route, "path") and route.path == request_path:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
                 return Response(status_code=200)
 
     # If no GET route exists for this path → behave normally
@@ -48,6 +149,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag/Last-Modified validators and 304 handling for /api and /mcp/tools
+app.add_middleware(ConditionalCacheMiddleware)
+
+# Compress large responses (added last so it wraps the other middleware)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 # Include MCP router
 app.include_router(mcp_router)
 
@@ -59,12 +166,17 @@ templates = Jinja2Templates(directory=str(PROJECT_ROOT / "templates"))
 app.mount("/static", StaticFiles(directory=str(PROJECT_ROOT / "static")), name="static")
 
 # Database path (kept for compatibility)
-DB_PATH = "rankings.db"
+DB_PATH = services.DB_PATH
 
 
 def get_db_connection():
-    """Create and return a database connection."""
-    conn = sqlite3.connect(DB_PATH)
+    """
+    Create and return a new database connection, which the caller closes.
+
+    Kept for compatibility: the routes use the service layer's pooled
+    read-only connections instead.
+    """
+    conn = sqlite3.connect(services.DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -72,23 +184,16 @@ def get_db_connection():
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Render the home page with all available weeks."""
-    weeks = get_all_weeks()
-    
-    # Group weeks by year for better organization
-    weeks_by_year = {}
-    for week in weeks:
-        year = week.split("-")[0]
-        if year not in weeks_by_year:
-            weeks_by_year[year] = []
-        weeks_by_year[year].append(week)
+    catalog = await run_service(get_week_catalog)
     
     return templates.TemplateResponse(
         request=request,
         name="index.html",
         context={
             "request": request,
-            "weeks_by_year": weeks_by_year,
-            "total_weeks": len(weeks)
+            # Weeks grouped by year for better organization
+            "weeks_by_year": catalog.by_year,
+            "total_weeks": len(catalog)
         },
     )
 
@@ -107,13 +212,12 @@ async def api_documentation(request: Request):
 async def week_page(request: Request, week_date: str):
     """Render a specific week's rankings page."""
     try:
-        rankings = get_week_data(week_date)
-        all_weeks = get_all_weeks()
+        rankings = await run_service(get_week_data, week_date)
+        catalog = await run_service(get_week_catalog)
         
         # Find previous and next weeks for navigation
-        current_index = all_weeks.index(week_date)
-        prev_week = all_weeks[current_index + 1] if current_index + 1 < len(all_weeks) else None
-        next_week = all_weeks[current_index - 1] if current_index - 1 >= 0 else None
+        prev_week = catalog.previous(week_date)
+        next_week = catalog.next(week_date)
         
         return templates.TemplateResponse(
             request=request,
@@ -132,18 +236,46 @@ async def week_page(request: Request, week_date: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _weeks_payload() -> Dict[str, Any]:
+    return {"weeks": get_all_weeks()}
+
+
+def _week_payload(week_date: str) -> Dict[str, Any]:
+    return {"week": week_date, "rankings": get_week_data(week_date)}
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and answering requests."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 200 once the caches are warm and the database has weeks, 503 until then."""
+    content = {"status": "starting", "update": updater.status.as_dict()}
+    if getattr(app.state, "ready", False):
+        try:
+            catalog = await run_service(get_week_catalog)
+        except Exception as e:
+            content["error"] = str(e)
+        else:
+            if len(catalog):
+                content.update(status="ready", weeks=len(catalog), latest_week=catalog.latest)
+    return FastJSONResponse(content, status_code=200 if content["status"] == "ready" else 503)
+
+
 @app.get("/api/weeks")
 async def api_weeks():
     """API endpoint to get all available weeks."""
-    return {"weeks": get_all_weeks()}
+    return await cached_json_response(_weeks_payload)
 
 
 @app.get("/api/week/{week_date}")
 async def api_week_data(week_date: str):
     """API endpoint to get ranking data for a specific week."""
     try:
-        rankings = get_week_data(week_date)
-        return {"week": week_date, "rankings": rankings}
+        return await cached_json_response(_week_payload, week_date)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -171,33 +303,73 @@ async def weeks_at_no1_page(request: Request):
 
 
 @app.get("/api/players/search")
-async def search_players_endpoint(q: str, limit: int = 10):
+async def search_players_endpoint(q: str, limit: int = 10, sort: str = "rank"):
     """Search for players in the database."""
     try:
-        players = service_search_players(q, limit)
+        players = await run_service(service_search_players, q, limit, sort)
         return {"players": players}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _validate_window(start: Optional[str], end: Optional[str]) -> None:
+    try:
+        check_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/player/factfile")
-async def get_player_factfile_endpoint(player: str):
-    """Get player factfile/statistics."""
+async def get_player_factfile_endpoint(
+    player: str,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
+    """Get player factfile/statistics, optionally limited to a from/to date window."""
+    _validate_window(start, end)
     try:
-        factfile = service_get_player_factfile(player)
-        return factfile
+        return await cached_json_response(service_get_player_factfile, player, start, end)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _dumps_compact_career(career: Dict[str, Any]) -> bytes:
+    return dumps(compact_career(career))
+
+
+# format -> (encoder, media type) for /api/player/career
+CAREER_ENCODERS = {
+    "full": (dumps, "application/json"),
+    "compact": (_dumps_compact_career, "application/json"),
+    "msgpack": (pack_career, MSGPACK_MEDIA_TYPE),
+}
+
+
 @app.get("/api/player/career")
-async def get_player_career_endpoint(player: str):
+async def get_player_career_endpoint(
+    player: str,
+    format: str = "full",
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
     """Get player career data for charting (rankings and points over time)."""
+    _validate_window(start, end)
+    if format not in CAREER_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{format}'. Use one of: {', '.join(CAREER_FORMATS)}"
+        )
+    if format == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=406, detail="MessagePack output is not available on this server")
+    encode, media_type = CAREER_ENCODERS[format]
     try:
-        career = service_get_player_career(player)
-        return career
+        return await cached_response(
+            service_get_player_career, player, start, end, encode=encode, media_type=media_type
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -205,12 +377,57 @@ async def get_player_career_endpoint(player: str):
 
 
 
+@app.get("/api/players/batch")
+async def get_players_batch_endpoint(players: List[str] = Query(...)):
+    """Get factfiles and careers for several players (repeat ?players=) in one request."""
+    try:
+        return await cached_json_response(service_get_players_batch, tuple(players))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/weeks-at-no1")
-async def api_weeks_at_no1():
-    """API endpoint to get all players and their weeks at number 1."""
+async def api_weeks_at_no1(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
+    """API endpoint to get all players and their weeks at number 1, optionally within a from/to window."""
+    _validate_window(start, end)
+    try:
+        return await cached_json_response(service_get_weeks_at_no1, start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/leaderboard")
+async def api_leaderboard(
+    max_rank: int = 10,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    metric: str = "weeks",
+    limit: int = 50
+):
+    """Rank players by weeks inside the top max_rank (or peak points / average rank) within a from/to window."""
+    try:
+        return await cached_json_response(service_get_leaderboard, max_rank, start, end, metric, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/diff")
+async def api_week_diff(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to")
+):
+    """Rank and points changes between two weeks, with entries into and exits from the rankings."""
     try:
-        result = service_get_weeks_at_no1()
-        return result
+        return await cached_json_response(service_get_week_diff, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2,10 +2,11 @@
 Model Context Protocol (MCP) router for ATP Rankings API.
 Provides MCP-compliant endpoints that wrap the existing service layer.
 """
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import Optional, Any, Dict
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Optional, Any, Dict, List
+import asyncio
 import json
 from pathlib import Path
 
@@ -13,10 +14,18 @@ from .services import (
     search_players,
     get_player_factfile,
     get_player_career,
+    get_players_batch,
     get_weeks_at_no1,
+    get_leaderboard,
+    get_week_diff,
     get_all_weeks,
-    get_week_data
+    get_week_data,
+    get_pool_stats,
+    get_result_cache_stats,
+    check_window,
+    run_service
 )
+from .encoding import compact_career
 
 router = APIRouter(prefix="/mcp", tags=["MCP"])
 
@@ -32,25 +41,82 @@ class MCPResponse(BaseModel):
 class SearchPlayersRequest(BaseModel):
     query: str = Field(..., description="Search query for player name")
     limit: int = Field(10, description="Maximum number of results")
+    sort: str = Field("rank", description="Result order: rank (best peak rank), recent or name")
 
 
-class PlayerRequest(BaseModel):
+class DateWindow(BaseModel):
+    """Optional inclusive date window, sent as "from"/"to"."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    start: Optional[str] = Field(None, alias="from", description="First week to include (YYYY-MM-DD)")
+    end: Optional[str] = Field(None, alias="to", description="Last week to include (YYYY-MM-DD)")
+
+
+class PlayerRequest(DateWindow):
     player: str = Field(..., description="Exact player name")
 
 
-class WeeksAtNo1Request(BaseModel):
+class CareerRequest(PlayerRequest):
+    format: str = Field("full", description="full (date strings) or compact (start date plus run-length encoded week offsets)")
+
+
+class PlayersBatchRequest(BaseModel):
+    players: List[str] = Field(..., description="Exact player names (at most 20)")
+
+
+class WeeksAtNo1Request(DateWindow):
     min_weeks: int = Field(1, description="Minimum weeks at #1 to include")
     top_n: Optional[int] = Field(None, description="Limit to top N players")
 
 
+class LeaderboardRequest(DateWindow):
+    max_rank: int = Field(10, description="Count weeks ranked at or above this rank (1-100)")
+    metric: str = Field("weeks", description="Order by: weeks, points (peak) or avg_rank")
+    limit: int = Field(50, description="Maximum number of players to return")
+
+
 class WeekRequest(BaseModel):
     week: str = Field(..., description="Week date in YYYY-MM-DD format")
 
 
+class WeekDiffRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    start: str = Field(..., alias="from", description="Earlier week in YYYY-MM-DD format")
+    end: str = Field(..., alias="to", description="Later week in YYYY-MM-DD format")
+
+
+class BatchCall(BaseModel):
+    id: Optional[Any] = Field(None, description="Caller-chosen id echoed in the result")
+    method: str = Field(..., description="Tool name, e.g. get_player_factfile")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Tool arguments")
+
+
+# Upper bound on the number of calls in one /mcp/batch request
+MAX_BATCH_CALLS = 50
+
+
+def _window_error(window: DateWindow) -> Optional[JSONResponse]:
+    """Return a 400 response if the request's date window is invalid."""
+    try:
+        check_window(window.start, window.end)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+    return None
+
+
 @router.get("/health")
 async def mcp_health():
     """MCP health check endpoint."""
-    return {"status": "ok", "service": "atp-rankings-mcp"}
+    return {
+        "status": "ok",
+        "service": "atp-rankings-mcp",
+        "db_pool": get_pool_stats(),
+        "result_cache": get_result_cache_stats()
+    }
 
 
 @router.get("/manifest")
@@ -66,8 +132,13 @@ async def mcp_manifest():
 async def mcp_search_players(request: SearchPlayersRequest):
     """MCP tool: Search for players by name."""
     try:
-        players = search_players(request.query, request.limit)
+        players = await run_service(search_players, request.query, request.limit, request.sort)
         return MCPResponse(ok=True, result={"players": players})
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -78,8 +149,11 @@ async def mcp_search_players(request: SearchPlayersRequest):
 @router.post("/tools/get_player_factfile")
 async def mcp_get_player_factfile(request: PlayerRequest):
     """MCP tool: Get player factfile/statistics."""
+    error = _window_error(request)
+    if error is not None:
+        return error
     try:
-        factfile = get_player_factfile(request.player)
+        factfile = await run_service(get_player_factfile, request.player, request.start, request.end)
         return MCPResponse(ok=True, result=factfile)
     except ValueError as e:
         return JSONResponse(
@@ -94,10 +168,20 @@ async def mcp_get_player_factfile(request: PlayerRequest):
 
 
 @router.post("/tools/get_player_career")
-async def mcp_get_player_career(request: PlayerRequest):
+async def mcp_get_player_career(request: CareerRequest):
     """MCP tool: Get player career time-series data."""
+    if request.format not in ("full", "compact"):
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=f"Unknown format '{request.format}'. Use full or compact").dict()
+        )
+    error = _window_error(request)
+    if error is not None:
+        return error
     try:
-        career = get_player_career(request.player)
+        career = await run_service(get_player_career, request.player, request.start, request.end)
+        if request.format == "compact":
+            career = compact_career(career)
         return MCPResponse(ok=True, result=career)
     except ValueError as e:
         return JSONResponse(
@@ -111,14 +195,34 @@ async def mcp_get_player_career(request: PlayerRequest):
         )
 
 
+@router.post("/tools/get_players_batch")
+async def mcp_get_players_batch(request: PlayersBatchRequest):
+    """MCP tool: Get factfiles and careers for several players at once."""
+    try:
+        batch = await run_service(get_players_batch, request.players)
+        return MCPResponse(ok=True, result=batch)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+
+
 @router.post("/tools/get_weeks_at_no1")
 async def mcp_get_weeks_at_no1(request: Optional[WeeksAtNo1Request] = None):
     """MCP tool: Get weeks at number 1 for all players."""
+    if request is None:
+        request = WeeksAtNo1Request()
+    error = _window_error(request)
+    if error is not None:
+        return error
     try:
-        if request is None:
-            request = WeeksAtNo1Request()
-        
-        data = get_weeks_at_no1()
+        data = await run_service(get_weeks_at_no1, request.start, request.end)
         
         # Apply filters
         if request.min_weeks > 1:
@@ -135,11 +239,33 @@ async def mcp_get_weeks_at_no1(request: Optional[WeeksAtNo1Request] = None):
         )
 
 
+@router.post("/tools/get_leaderboard")
+async def mcp_get_leaderboard(request: Optional[LeaderboardRequest] = None):
+    """MCP tool: Rank players by weeks inside a rank threshold over a date window."""
+    if request is None:
+        request = LeaderboardRequest()
+    try:
+        leaderboard = await run_service(
+            get_leaderboard, request.max_rank, request.start, request.end, request.metric, request.limit
+        )
+        return MCPResponse(ok=True, result=leaderboard)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+
+
 @router.get("/tools/get_all_weeks")
 async def mcp_get_all_weeks():
     """MCP tool: Get all available weeks."""
     try:
-        weeks = get_all_weeks()
+        weeks = await run_service(get_all_weeks)
         return MCPResponse(ok=True, result={"weeks": weeks, "total": len(weeks)})
     except Exception as e:
         return JSONResponse(
@@ -152,7 +278,7 @@ async def mcp_get_all_weeks():
 async def mcp_get_week_rankings(request: WeekRequest):
     """MCP tool: Get rankings for a specific week."""
     try:
-        rankings = get_week_data(request.week)
+        rankings = await run_service(get_week_data, request.week)
         return MCPResponse(ok=True, result={"week": request.week, "rankings": rankings})
     except ValueError as e:
         return JSONResponse(
@@ -166,14 +292,112 @@ async def mcp_get_week_rankings(request: WeekRequest):
         )
 
 
+@router.post("/tools/get_week_diff")
+async def mcp_get_week_diff(request: WeekDiffRequest):
+    """MCP tool: Get ranking movers, entries and exits between two weeks."""
+    try:
+        diff = await run_service(get_week_diff, request.start, request.end)
+        return MCPResponse(ok=True, result=diff)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=404,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content=MCPResponse(ok=False, error=str(e)).dict()
+        )
+
+
 # Convenience GET endpoints for simpler access
 @router.get("/tools/search_players")
-async def mcp_search_players_get(q: str, limit: int = 10):
+async def mcp_search_players_get(q: str, limit: int = 10, sort: str = "rank"):
     """MCP tool: Search for players (GET version)."""
-    return await mcp_search_players(SearchPlayersRequest(query=q, limit=limit))
+    return await mcp_search_players(SearchPlayersRequest(query=q, limit=limit, sort=sort))
 
 
 @router.get("/tools/get_weeks_at_no1")
-async def mcp_get_weeks_at_no1_get(min_weeks: int = 1, top_n: Optional[int] = None):
+async def mcp_get_weeks_at_no1_get(
+    min_weeks: int = 1,
+    top_n: Optional[int] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
     """MCP tool: Get weeks at #1 (GET version)."""
-    return await mcp_get_weeks_at_no1(WeeksAtNo1Request(min_weeks=min_weeks, top_n=top_n))
+    return await mcp_get_weeks_at_no1(WeeksAtNo1Request(min_weeks=min_weeks, top_n=top_n, start=start, end=end))
+
+
+
+@router.get("/tools/get_leaderboard")
+async def mcp_get_leaderboard_get(
+    max_rank: int = 10,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    metric: str = "weeks",
+    limit: int = 50
+):
+    """MCP tool: Get a leaderboard (GET version)."""
+    return await mcp_get_leaderboard(
+        LeaderboardRequest(max_rank=max_rank, start=start, end=end, metric=metric, limit=limit)
+    )
+
+
+
+@router.get("/tools/get_week_diff")
+async def mcp_get_week_diff_get(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to")
+):
+    """MCP tool: Get a week-to-week diff (GET version)."""
+    return await mcp_get_week_diff(WeekDiffRequest(start=start, end=end))
+
+
+# Tool name -> (request model or None, handler) for /mcp/batch
+BATCH_TOOLS = {
+    "search_players": (SearchPlayersRequest, mcp_search_players),
+    "get_player_factfile": (PlayerRequest, mcp_get_player_factfile),
+    "get_player_career": (CareerRequest, mcp_get_player_career),
+    "get_players_batch": (PlayersBatchRequest, mcp_get_players_batch),
+    "get_weeks_at_no1": (WeeksAtNo1Request, mcp_get_weeks_at_no1),
+    "get_leaderboard": (LeaderboardRequest, mcp_get_leaderboard),
+    "get_all_weeks": (None, mcp_get_all_weeks),
+    "get_week_rankings": (WeekRequest, mcp_get_week_rankings),
+    "get_week_diff": (WeekDiffRequest, mcp_get_week_diff),
+}
+
+
+async def _run_batch_call(call: BatchCall) -> Dict[str, Any]:
+    """Run one batched tool call and return its result entry."""
+    entry: Dict[str, Any] = {"id": call.id}
+    if call.method not in BATCH_TOOLS:
+        return {**entry, "ok": False, "status": 404, "error": f"Unknown tool '{call.method}'"}
+
+    model, handler = BATCH_TOOLS[call.method]
+    try:
+        response = await (handler(model(**call.params)) if model else handler())
+    except ValidationError as e:
+        return {**entry, "ok": False, "status": 422, "error": str(e)}
+
+    if isinstance(response, JSONResponse):
+        # The tool's own error response
+        body = json.loads(response.body)
+        return {**entry, "ok": False, "status": response.status_code, "error": body["error"]}
+    return {**entry, "ok": True, "status": 200, "result": response.result}
+
+
+@router.post("/batch")
+async def mcp_batch(calls: List[BatchCall]):
+    """
+    Run several tool calls in one request.
+
+    Calls are independent and run concurrently on the shared service pool;
+    results come back in request order, each with its own ok/error.
+    """
+    if len(calls) > MAX_BATCH_CALLS:
+        return JSONResponse(
+            status_code=400,
+            content=MCPResponse(ok=False, error=f"At most {MAX_BATCH_CALLS} calls per batch").dict()
+        )
+    results = await asyncio.gather(*(_run_batch_call(call) for call in calls))
+    return MCPResponse(ok=True, result=list(results))
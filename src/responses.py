@@ -0,0 +1,127 @@
+"""
+JSON response helpers for large API payloads.
+
+Provides an opt-in fast encoder (orjson, enabled with ``ATP_FAST_JSON=1``
+when installed) and a byte-size bounded LRU of pre-serialized response
+bodies keyed on the dataset version, so hot responses such as long player
+careers skip both the service call and serialization. Concurrent requests
+for the same uncached response render it once.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.responses import JSONResponse, Response
+
+from . import services
+from .singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Opt-in fast encoder; falls back to the standard library if orjson is missing
+FAST_JSON = os.environ.get("ATP_FAST_JSON", "0") == "1" and orjson is not None
+# Upper bound on the memory held by pre-serialized responses
+RESPONSE_CACHE_BYTES = int(os.environ.get("ATP_RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, byte-identical to FastAPI's default output."""
+    if FAST_JSON:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder when it is enabled."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class SerializedCache:
+    """Thread-safe LRU of serialized bodies, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = SerializedCache(RESPONSE_CACHE_BYTES)
+_renders = SingleFlight()
+
+
+def _render(func: Callable[..., Any], args: Tuple, encode: Callable[[Any], bytes]) -> bytes:
+    key = (func, encode, args, services.get_dataset_version())
+    body = response_cache.get(key)
+    if body is None:
+        body = encode(func(*args))
+        response_cache.put(key, body)
+    return body
+
+
+async def cached_response(
+    func: Callable[..., Any],
+    *args: Hashable,
+    encode: Callable[[Any], bytes] = dumps,
+    media_type: str = "application/json"
+) -> Response:
+    """
+    Respond with ``encode(func(*args))``, reusing the serialized bytes from
+    earlier calls with the same arguments and encoder on the same dataset version.
+
+    The service call and serialization run on the service thread pool, once
+    for concurrent identical requests. Exceptions raised by ``func``
+    propagate (and are not cached).
+    """
+    key = (func, encode, args, services.get_db_version())
+    body = await _renders.run(key, partial(services.run_service, _render, func, args, encode))
+    return Response(content=body, media_type=media_type)
+
+
+async def cached_json_response(func: Callable[..., Any], *args: Hashable) -> Response:
+    """Respond with ``func(*args)`` as JSON via the pre-serialized response cache."""
+    return await cached_response(func, *args)
@@ -0,0 +1,279 @@
+"""
+Concurrent, rate-limited scraper for the atptour.com weekly rankings.
+
+Weeks are fetched on a small thread pool sharing one pooled
+``requests.Session``. Every request (retries included) first takes a token
+from a shared token bucket, so the pool never exceeds the configured request
+rate, and failed requests are retried with exponential backoff. Parsing and
+writing happen on the calling thread as pages arrive, in batches of weeks
+(one transaction each with ``storage.replace_weeks``), so the SQLite
+connection is only used from one thread and at most a bounded number of
+fetched pages wait in memory.
+
+Pages are parsed with lxml in a single pass when it is installed (optional
+dependency), falling back to BeautifulSoup's ``html.parser``; both return
+identical rows. ``ATP_HTML_PARSER`` forces one of them.
+
+With a ``PageArchive``, fetched pages are kept on disk and revalidated with
+conditional requests, and ``scrape_weeks(replay=True)`` re-parses archived
+pages without touching the network.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup as bs
+from requests.adapters import HTTPAdapter
+
+from .archive import PageArchive
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # optional dependency
+    lxml = None
+
+RANKINGS_URL = "https://www.atptour.com/en/rankings/singles"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = 5
+
+# Responses worth retrying; anything else is returned or raised immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Class attributes of the rank, name and points cells of a rankings row
+RANK_CLASS = "rank bold heavy tiny-cell"
+NAME_CLASS = "name center"
+POINTS_CLASS = "points center bold extrabold small-cell"
+
+# Rankings page parser: "lxml", "html.parser" or "auto" (lxml when installed)
+HTML_PARSER = os.environ.get("ATP_HTML_PARSER", "auto").lower()
+
+Row = Tuple[str, str, str]
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, waiting until one is available."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            self._sleep(wait_for)
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """Return a session whose connection pool is shared by ``pool_size`` threads."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def week_url(week: str, base_url: str = RANKINGS_URL) -> str:
+    return f"{base_url}?dateWeek={week}&rankRange=0-100"
+
+
+def fetch(session: requests.Session, url: str, limiter: Optional[TokenBucket] = None,
+          retries: int = 3, backoff: float = 1.0, sleep: Callable[[float], None] = time.sleep,
+          archive: Optional[PageArchive] = None) -> bytes:
+    """
+    GET ``url`` and return the body, retrying connection errors, timeouts and
+    429/5xx responses up to ``retries`` times (waiting ``backoff * 2**attempt``).
+
+    With an ``archive``, a page already in it is revalidated with its ETag /
+    Last-Modified and read back from the archive on 304; fetched pages are
+    added to it (call ``archive.save()`` to persist the index).
+    """
+    headers = archive.conditional_headers(url) if archive is not None else {}
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.get(url, timeout=TIMEOUT, headers=headers)
+            if response.status_code == 304 and headers:
+                return archive.get(url)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                if archive is not None:
+                    archive.put(url, response.content, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"))
+                return response.content
+            error: Exception = requests.HTTPError(f"{response.status_code} for {url}", response=response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt < retries:
+            sleep(backoff * 2 ** attempt)
+    raise error
+
+
+def _rows(ranks: List[str], names: List[str], points: List[str]) -> List[Row]:
+    # A column with no cells reads as a single "N/A", as in the original scraper
+    ranks, names, points = (column or ["N/A"] for column in (ranks, names, points))
+    return [(ranks[i], names[i], points[i]) for i in range(len(names))]
+
+
+def parse_week_soup(html: bytes) -> List[Row]:
+    """Parse a rankings page with BeautifulSoup's ``html.parser`` (always available)."""
+    soup = bs(html, "html.parser")
+    return _rows(*(
+        [text for text in (tag.get_text(strip=True) for tag in soup.find_all(class_=cls)) if text]
+        for cls in (RANK_CLASS, NAME_CLASS, POINTS_CLASS)
+    ))
+
+
+def parse_week_lxml(html: bytes) -> List[Row]:
+    """Parse a rankings page with lxml, collecting all three columns in one pass over the tree."""
+    columns: Dict[str, List[str]] = {RANK_CLASS: [], NAME_CLASS: [], POINTS_CLASS: []}
+    for element in lxml.html.document_fromstring(html).iter(etree.Element):
+        cls = element.get("class")
+        if cls is None:
+            continue
+        column = columns.get(" ".join(cls.split()))
+        if column is not None:
+            # Same text as get_text(strip=True): stripped fragments, empty ones dropped
+            text = "".join(fragment.strip() for fragment in element.itertext())
+            if text:
+                column.append(text)
+    return _rows(columns[RANK_CLASS], columns[NAME_CLASS], columns[POINTS_CLASS])
+
+
+PARSERS: Dict[str, Callable[[bytes], List[Row]]] = {"html.parser": parse_week_soup}
+if lxml is not None:
+    PARSERS["lxml"] = parse_week_lxml
+
+
+def get_parser(name: str = HTML_PARSER) -> Callable[[bytes], List[Row]]:
+    """Return the rankings page parser ``name``; "auto" picks lxml when it is installed."""
+    if name == "auto":
+        name = "lxml" if "lxml" in PARSERS else "html.parser"
+    if name not in PARSERS:
+        raise ValueError(f"HTML parser {name} is not available; expected one of {', '.join(PARSERS)}")
+    return PARSERS[name]
+
+
+def parse_week(html: bytes) -> List[Row]:
+    """Parse a rankings page into raw ``(rank, name, points)`` rows with the configured parser."""
+    return get_parser()(html)
+
+
+def parse_weeks(html: bytes) -> List[str]:
+    """Parse the week selector of a rankings page into ``YYYY-MM-DD`` weeks, most recent first."""
+    select = bs(html, "html.parser").find(id="dateWeek-filter")
+    if not select:
+        return ["N/A"]
+    weeks = []
+    for opt in select.find_all("option"):
+        val = opt.get("value")
+        label = opt.get_text(strip=True)
+
+        if val == "Current Week":
+            # Convert label like "2025.03.31" → "2025-03-31"
+            weeks.append(label.replace(".", "-"))
+        elif val and val.count("-") == 2:
+            weeks.append(val)
+    return weeks
+
+
+def scrape_weeks(weeks: Iterable[str], write: Callable[[List[Tuple[str, List[Row]]]], None],
+                 session: Optional[requests.Session] = None, workers: int = 4, rate: float = 2.0,
+                 retries: int = 3, backoff: float = 1.0, batch_size: int = 25,
+                 base_url: str = RANKINGS_URL, archive: Optional[PageArchive] = None,
+                 replay: bool = False,
+                 on_status: Optional[Callable[[str, str], None]] = None,
+                 stop: Optional[threading.Event] = None) -> Dict[str, Exception]:
+    """
+    Fetch ``weeks`` concurrently and pass the parsed rows to ``write`` in
+    batches of up to ``batch_size`` ``(week, rows)`` pairs.
+
+    At most ``workers`` requests are in flight and at most ``rate`` are
+    started per second. ``write`` is called on the calling thread, in
+    completion order. A week that still fails after its retries, fails to
+    parse or belongs to a batch whose write failed does not stop the others;
+    failures are returned as ``{week: exception}``.
+
+    Fetched pages are kept in ``archive`` (its index is saved after every
+    batch). With ``replay``, pages are read from ``archive`` instead and the
+    network is never used; weeks missing from it fail with ``KeyError``.
+
+    ``on_status(week, status)`` is called on the calling thread as each week
+    is "fetched" and "parsed", e.g. to journal progress.
+
+    Once ``stop`` is set, no further weeks are started: the ones in flight
+    are finished and written, and the rest are left out of the result.
+    """
+    if replay and archive is None:
+        raise ValueError("replay needs an archive")
+    session = session or (None if replay else make_session(workers))
+    limiter = TokenBucket(rate)
+    failures: Dict[str, Exception] = {}
+    report = on_status or (lambda week, status: None)
+    pending: Dict[Future, str] = {}
+    batch: List[Tuple[str, List[Row]]] = []
+    queue = iter(weeks)
+
+    def flush() -> None:
+        try:
+            write(batch)
+        except Exception as e:
+            failures.update((week, e) for week, _ in batch)
+        batch.clear()
+        if archive is not None and not replay:
+            archive.save()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="atp-scraper") as executor:
+        def submit_next() -> None:
+            if stop is not None and stop.is_set():
+                return
+            week = next(queue, None)
+            if week is not None:
+                url = week_url(week, base_url)
+                if replay:
+                    pending[executor.submit(archive.get, url)] = week
+                else:
+                    pending[executor.submit(fetch, session, url, limiter, retries, backoff, archive=archive)] = week
+
+        # Keep a couple of fetches queued per worker without reading ahead of the writer
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                week = pending.pop(future)
+                try:
+                    page = future.result()
+                    report(week, "fetched")
+                    rows = parse_week(page)
+                    report(week, "parsed")
+                    batch.append((week, rows))
+                except Exception as e:
+                    failures[week] = e
+                if len(batch) >= batch_size:
+                    flush()
+                submit_next()
+    if batch:
+        flush()
+    elif archive is not None and not replay:
+        archive.save()
+    return failures
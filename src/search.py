@@ -0,0 +1,108 @@
+"""
+In-memory player name index for search and autocomplete.
+
+Covers every player who was ever ranked, not just recent weeks. Names are
+case- and accent-folded, queries of three or more characters are answered
+from a trigram posting index, and results are ranked with name-prefix
+matches first and then by peak rank, recency or name.
+"""
+import heapq
+import sqlite3
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .catalog import week_desc
+from .storage import FACT_TABLE
+
+SORT_ORDERS = ("rank", "recent", "name")
+
+# Letters that NFKD does not split into a base letter plus an accent
+_FOLD = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "æ": "ae", "œ": "oe", "ı": "i"})
+
+
+def normalize(text: str) -> str:
+    """Fold a name for matching: lowercase, strip accents (``"Björn"`` -> ``"bjorn"``)."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.translate(_FOLD)
+
+
+def trigrams(text: str) -> set:
+    """Return the set of three-character substrings of a normalized string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PlayerSearchIndex:
+    """Immutable trigram index over player names; safe to share between threads."""
+
+    def __init__(self, players: Sequence[Tuple[str, Optional[int], str]]):
+        # players: (name, peak rank, latest week)
+        self.names = [name for name, _, _ in players]
+        self.keys = [normalize(name) for name in self.names]
+
+        postings: Dict[str, set] = {}
+        for i, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, set()).add(i)
+        self.postings: Dict[str, FrozenSet[int]] = {g: frozenset(ids) for g, ids in postings.items()}
+
+        # Position of every player in each sort order, so ranking is an int compare
+        peaks = [peak if peak is not None else float("inf") for _, peak, _ in players]
+        latest = [week for _, _, week in players]
+        orders = {
+            "rank": sorted(range(len(players)), key=lambda i: (peaks[i], week_desc(latest[i]), self.keys[i])),
+            "recent": sorted(range(len(players)), key=lambda i: (week_desc(latest[i]), peaks[i], self.keys[i])),
+            "name": sorted(range(len(players)), key=lambda i: (self.keys[i], self.names[i])),
+        }
+        self.positions: Dict[str, List[int]] = {}
+        for sort, order in orders.items():
+            positions = [0] * len(order)
+            for position, i in enumerate(order):
+                positions[i] = position
+            self.positions[sort] = positions
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "PlayerSearchIndex":
+        """Build the index from every ranked player in the fact table."""
+        rows = conn.execute(
+            f"SELECT player, MIN(rank), MAX(week) FROM {FACT_TABLE} GROUP BY player HAVING MIN(rank) IS NOT NULL;"
+        ).fetchall()
+        return cls([(row[0], row[1], row[2]) for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _candidates(self, query: str) -> List[int]:
+        if len(query) < 3:
+            # Too short for trigrams; a linear scan of the folded names is cheap
+            return [i for i, key in enumerate(self.keys) if query in key]
+        grams = sorted((self.postings.get(g, frozenset()) for g in trigrams(query)), key=len)
+        ids = grams[0].intersection(*grams[1:])
+        return [i for i in ids if query in self.keys[i]]
+
+    def search(self, query: str, limit: int = 10, sort: str = "rank") -> List[str]:
+        """
+        Return up to ``limit`` names containing ``query`` (accent-insensitive).
+
+        Names starting with the query come first, then names with a word
+        starting with it, then other substring matches; each group is ordered
+        by ``sort`` ("rank": best peak rank, "recent": latest ranking week,
+        "name": alphabetical).
+        """
+        if sort not in self.positions:
+            raise ValueError(f"Unknown sort order {sort}; expected one of {', '.join(SORT_ORDERS)}")
+        query = normalize(query).strip()
+        positions = self.positions[sort]
+
+        def relevance(i: int) -> Tuple[int, int]:
+            key = self.keys[i]
+            if key.startswith(query):
+                match = 0
+            elif f" {query}" in key:
+                match = 1
+            else:
+                match = 2
+            return match, positions[i]
+
+        ids = self._candidates(query) if query else range(len(self.names))
+        return [self.names[i] for i in heapq.nsmallest(max(limit, 0), ids, key=relevance)]
@@ -2,256 +2,676 @@
 Service layer for ATP Rankings data access.
 Contains reusable business logic for both REST API and MCP endpoints.
 """
+import asyncio
+import hashlib
+import logging
+import os
 import sqlite3
-from typing import List, Dict, Any, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache, partial, wraps
+from inspect import signature
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Any, Hashable, Optional, Sequence, Tuple, Callable, TypeVar
 from pathlib import Path
 
+from .catalog import WeekCatalog
+from .db import ConnectionPool, file_fingerprint
+from .leaderboard import check_leaderboard, rank_players
+from .search import PlayerSearchIndex
+from .singleflight import CoalescingCache
+from .storage import (
+    FACT_TABLE, NO1_TABLE, PREFIX_TABLE, STATS_TABLE, first_per_week, list_weeks, read_week,
+    week_status,
+)
+
+logger = logging.getLogger(__name__)
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DB_PATH = str(PROJECT_ROOT / "rankings.db")
 
+# Query engine: "sqlite" (default) or "numpy" for the in-memory engine
+ENGINE = os.environ.get("ATP_ENGINE", "sqlite").lower()
+
+# Snapshot of the numpy engine (scripts/snapshot.py). When it is current, each
+# worker process maps it instead of loading the database into its own arrays
+SNAPSHOT_PATH = os.environ.get("ATP_SNAPSHOT", str(PROJECT_ROOT / "rankings.snapshot"))
+
+# Size of the thread pool that async handlers run blocking service calls on
+SERVICE_WORKERS = int(os.environ.get("ATP_SERVICE_WORKERS", "8"))
+
+# Upper bound on the number of players in one get_players_batch call
+MAX_BATCH_PLAYERS = 20
+
+# Number of consecutive-week diffs kept in memory
+DIFF_CACHE_SIZE = int(os.environ.get("ATP_DIFF_CACHE_SIZE", "256"))
+
+# Number of player factfile/career results kept in memory (0 only coalesces)
+RESULT_CACHE_SIZE = int(os.environ.get("ATP_RESULT_CACHE_SIZE", "512"))
+
+T = TypeVar("T")
+
+_pool = ConnectionPool()
+_executor = ThreadPoolExecutor(max_workers=SERVICE_WORKERS, thread_name_prefix="atp-service")
+
+# (database version, engine) and (database version, index), rebuilt when the version changes
+_engine = None
+_engine_lock = threading.Lock()
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+# Bumped when an update swaps in a new database, on top of the file identity
+_generation = 0
+
+_results = CoalescingCache(RESULT_CACHE_SIZE)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Return this thread's pooled read-only database connection.
+
+    Connections are reused across calls and must not be closed by callers.
+    """
+    return _pool.get(DB_PATH)
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Return connection pool counters (hits, misses, reopens)."""
+    return _pool.stats()
+
+
+def get_result_cache_stats() -> Dict[str, int]:
+    """Return result cache counters (entries, hits, misses, coalesced)."""
+    return _results.stats()
+
+
+def coalesced(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Cache the results of ``func`` per database version (see ``CoalescingCache``).
+
+    ``run_service`` also shares one call between concurrent identical calls:
+    the others await it on the event loop instead of each taking a service
+    thread. Results are shared between callers, so they must not be modified.
+    """
+    sig = signature(func)
+
+    def result_key(*args: Any, **kwargs: Any) -> Tuple[Hashable, Tuple[Any, ...]]:
+        # Same key however the arguments are passed; stat() only, so cheap on the event loop
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return (func.__name__, bound.args, get_db_version()), bound.args
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        key, bound_args = result_key(*args, **kwargs)
+        return _results.call(key, func, *bound_args)
+
+    wrapper.result_key = result_key
+    return wrapper
+
+
+async def run_service(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking service function on the bounded service thread pool.
+
+    Async route handlers await this instead of calling service functions
+    directly, so slow SQLite work never blocks the event loop and concurrent
+    requests overlap (up to SERVICE_WORKERS at a time). Concurrent identical
+    calls of a ``coalesced`` function run once.
+    """
+    loop = asyncio.get_running_loop()
+    result_key = getattr(func, "result_key", None)
+    if result_key is None:
+        return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+    key, bound_args = result_key(*args, **kwargs)
+    return await _results.call_async(
+        key, partial(loop.run_in_executor, _executor, partial(func.__wrapped__, *bound_args))
+    )
+
+
+def get_engine():
+    """
+    Return the in-memory engine when ``ATP_ENGINE=numpy``, loading it on first
+    use and again whenever the database version changes (e.g. another process
+    swapped in a new file).
+
+    Returns None when the SQLite path should be used instead, including when
+    NumPy is not installed or the database could not be loaded.
+    """
+    global _engine
+    if ENGINE != "numpy":
+        return None
+    version = get_db_version()
+    entry = _engine
+    if entry is None or entry[0] != version:
+        with _engine_lock:
+            entry = _engine
+            if entry is None or entry[0] != version:
+                try:
+                    from .engine import RankingsMatrix
+                    engine = _load_snapshot() or RankingsMatrix.from_connection(get_db_connection())
+                except Exception as e:
+                    logger.warning("In-memory engine unavailable, using SQLite: %s", e)
+                    engine = False
+                entry = _engine = (version, engine)
+    return entry[1] or None
+
+
+def warm_up() -> None:
+    """Build the week catalog, search index and (when configured) engine before they are needed."""
+    get_week_catalog()
+    get_engine()
+    get_search_index()
+
+
+def bump_dataset_version() -> None:
+    """
+    Invalidate every cache built from the previous database after an update
+    swapped in a new one.
+
+    The dataset version changes, which invalidates the week catalog, engine,
+    search index, week diffs and the result and response caches keyed on it
+    (they also follow the file when another process swaps it). The engine
+    and search index are dropped right away to free their memory. Requests
+    already running keep the objects and pooled connection they hold, which
+    stay valid for the old file until they finish.
+    """
+    global _engine, _search_index, _generation
+    with _engine_lock:
+        _engine = None
+    with _search_index_lock:
+        _search_index = None
+    with _catalog_lock:
+        _generation += 1
+    # Entries for the old version would never be hit again
+    _results.clear()
+
 
-def get_db_connection():
-    """Create and return a database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def reset_caches() -> None:
+    """
+    Drop every cache built from the database, counters included, e.g. after
+    pointing ``DB_PATH`` or ``ENGINE`` at something else (as the tests do).
+    """
+    global _engine, _search_index, _catalog, _results
+    from .responses import response_cache
+    with _engine_lock:
+        _engine = None
+    with _search_index_lock:
+        _search_index = None
+    with _catalog_lock:
+        _catalog = None
+    _results = CoalescingCache(RESULT_CACHE_SIZE)
+    _consecutive_diff.cache_clear()
+    response_cache.clear()
+
+
+def _load_snapshot():
+    """Map the engine snapshot if there is one exported from the current database file, else None."""
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    from .engine import RankingsMatrix
+    try:
+        engine = RankingsMatrix.from_snapshot(SNAPSHOT_PATH)
+    except Exception as e:
+        logger.warning("Engine snapshot %s unreadable, loading the database: %s", SNAPSHOT_PATH, e)
+        return None
+    if engine.source != file_fingerprint(DB_PATH):
+        logger.warning("Engine snapshot %s is out of date, loading the database", SNAPSHOT_PATH)
+        return None
+    return engine
+
+
+def get_db_version() -> Tuple[int, ...]:
+    """
+    Identify the current state of the database file.
+
+    Changes whenever the file (or its write-ahead log) is modified or replaced,
+    or ``bump_dataset_version`` is called, so caches keyed on it are rebuilt
+    only when the data actually changes.
+    """
+    version = [_generation]
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            stat = os.stat(path)
+            version.extend((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.extend((0, 0, 0))
+    return tuple(version)
+
+
+def get_week_catalog() -> WeekCatalog:
+    """Return the catalog of available weeks, rebuilding it if the database changed."""
+    global _catalog
+    version = get_db_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = WeekCatalog(list_weeks(get_db_connection()), version)
+            catalog = _catalog
+    return catalog
+
+
+def get_dataset_version() -> str:
+    """
+    Short token identifying the data being served: the latest week plus a
+    digest of the database file state. Changes whenever the database does.
+    """
+    catalog = get_week_catalog()
+    digest = hashlib.sha1(repr(catalog.version).encode()).hexdigest()[:12]
+    return f"{catalog.latest or 'empty'}-{digest}"
 
 
 def get_all_weeks() -> List[str]:
     """Get all available weeks (table names) from the database."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name DESC;")
-    tables = [row[0] for row in cur.fetchall()]
-    conn.close()
-    return tables
+    return list(get_week_catalog().weeks)
 
 
 def get_week_data(week: str) -> List[Dict[str, Any]]:
     """Get ranking data for a specific week."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # Verify table exists
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (week,))
-    if not cur.fetchone():
-        conn.close()
+    if week not in get_week_catalog():
         raise ValueError(f"Week {week} not found")
     
-    # Get data from the week table
-    cur.execute(f'SELECT * FROM "{week}";')
-    rows = cur.fetchall()
-    conn.close()
+    conn = get_db_connection()
+    
+    # Get data from the week table (or the compact store)
+    rows = read_week(conn, week)
     
     data = []
-    for row in rows:
+    for rank, name, points in rows:
         data.append({
-            "rank": row["rank"],
-            "name": row["name"],
-            "points": row["points"]
+            "rank": rank,
+            "name": name,
+            "points": points
         })
     
     return data
 
 
-def search_players(query: str, limit: int = 10) -> List[str]:
-    """Search for players in the database."""
+@coalesced
+def get_week_validator(week: str) -> Tuple[str, Optional[str]]:
+    """
+    Return a digest of a week's stored rows and its ingestion journal status
+    (None if not journaled), for HTTP validators. Cached per database version.
+    """
+    if week not in get_week_catalog():
+        raise ValueError(f"Week {week} not found")
     conn = get_db_connection()
-    cur = conn.cursor()
-    
-    tables = get_all_weeks()
-    players = set()
-    search_query = query.lower()
-    
-    for table in tables[:100]:  # Search through recent tables for performance
-        try:
-            cur.execute(f'SELECT DISTINCT name FROM "{table}" WHERE LOWER(name) LIKE ?', (f'%{search_query}%',))
-            rows = cur.fetchall()
-            for row in rows:
-                players.add(row[0])
-                if len(players) >= limit * 2:
-                    break
-        except:
-            continue
-        
-        if len(players) >= limit * 2:
-            break
-    
-    conn.close()
-    
-    # Sort and limit results
-    sorted_players = sorted(list(players))[:limit]
-    return sorted_players
+    digest = hashlib.sha1(repr([tuple(row) for row in read_week(conn, week)]).encode()).hexdigest()
+    return digest, week_status(conn, week)
 
 
-def get_player_factfile(player: str) -> Dict[str, Any]:
-    """Get player factfile/statistics."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    tables = get_all_weeks()
+def get_search_index() -> PlayerSearchIndex:
+    """Return the player name index, building it on first use and when the database version changes."""
+    global _search_index
+    version = get_db_version()
+    entry = _search_index
+    if entry is None or entry[0] != version:
+        with _search_index_lock:
+            entry = _search_index
+            if entry is None or entry[0] != version:
+                entry = _search_index = (version, PlayerSearchIndex.from_connection(get_db_connection()))
+    return entry[1]
+
+
+def search_players(query: str, limit: int = 10, sort: str = "rank") -> List[str]:
+    """Search all players in the database (prefix, substring and accent-insensitive)."""
+    return get_search_index().search(query, limit, sort)
+
+
+def check_window(start: Optional[str] = None, end: Optional[str] = None) -> None:
+    """Validate optional ``from``/``to`` dates (YYYY-MM-DD, inclusive); raises ValueError."""
+    for name, value in (("from", start), ("to", end)):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid '{name}' date '{value}', expected YYYY-MM-DD")
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"'from' ({start}) is after 'to' ({end})")
+
+
+def _window_bounds(start: Optional[str], end: Optional[str]) -> Tuple[str, str]:
+    # Week names are ISO dates, so string comparison is date comparison
+    return start or "0000-00-00", end or "9999-99-99"
+
+
+def _not_found(player: str, start: Optional[str], end: Optional[str]) -> ValueError:
+    if start is None and end is None:
+        return ValueError(f"Player {player} not found")
+    return ValueError(f"Player {player} not found between {start or 'the start'} and {end or 'the latest week'}")
+
+
+def _get_player_rows(cur: sqlite3.Cursor, player: str,
+                     start: Optional[str] = None, end: Optional[str] = None) -> List[sqlite3.Row]:
+    """Get one (week, rank, points) row per week for a player, most recent first."""
+    cur.execute(
+        f'SELECT week, rank, points FROM {FACT_TABLE} WHERE player = ? AND week BETWEEN ? AND ? '
+        f'ORDER BY week DESC, rowid',
+        (player, *_window_bounds(start, end))
+    )
+    return first_per_week(cur.fetchall())
+
+
+def _prefix_counts(cur: sqlite3.Cursor, player: str, start: Optional[str], end: Optional[str]) -> Dict[str, int]:
+    """Count a player's weeks in the window as the difference of two prefix-sum lookups."""
+    low, high = _window_bounds(start, end)
+    columns = "weeks_top_100, weeks_top_10, weeks_at_1, weeks_no1"
+    counts = []
+    for op, week in (("<=", high), ("<", low)):
+        cur.execute(
+            f'SELECT {columns} FROM {PREFIX_TABLE} WHERE player = ? AND week {op} ? ORDER BY week DESC LIMIT 1',
+            (player, week)
+        )
+        row = cur.fetchone()
+        counts.append(tuple(row) if row else (0, 0, 0, 0))
+    upper, lower = counts
+    return dict(zip(columns.split(", "), (u - l for u, l in zip(upper, lower))))
+
+
+def _format_factfile(stats: sqlite3.Row) -> Dict[str, Any]:
+    """Build a factfile from a ``player_stats`` row."""
+    max_points = stats["max_points"]
     
+    return {
+        "player": stats["player"],
+        "career_high_rank": stats["career_high_rank"],
+        "career_high_date": stats["career_high_date"],
+        "max_points": f"{max_points:,}" if max_points > 0 else "-",
+        "max_points_date": stats["max_points_date"] or "No Points System",
+        "weeks_top_100": stats["weeks_top_100"],
+        "weeks_top_10": stats["weeks_top_10"],
+        "weeks_at_1": stats["weeks_at_1"]
+    }
+
+
+def _format_career(player: str, rows: Sequence[sqlite3.Row]) -> Dict[str, Any]:
+    """Build a career from a player's ``(week, rank, points)`` rows, most recent first."""
     # Gather ranking data
-    ranking_dates = []
-    rankings = []
+    ranking_dates = [row["week"] for row in rows if row["rank"] is not None]
+    rankings = [row["rank"] for row in rows if row["rank"] is not None]
     
-    for table in tables:
-        try:
-            cur.execute(f'SELECT rank FROM "{table}" WHERE name = ?', (player,))
-            row = cur.fetchone()
-            if row:
-                rank_str = row[0].replace('T', '')
-                try:
-                    ranking_dates.append(table)
-                    rankings.append(int(rank_str))
-                except:
-                    continue
-        except:
-            continue
+    # Gather points data (only include non-zero points)
+    points_dates = [row["week"] for row in rows if row["points"]]
+    points = [row["points"] for row in rows if row["points"]]
     
-    if not rankings:
-        conn.close()
+    if not rankings and not points:
         raise ValueError(f"Player {player} not found")
     
-    # Calculate career high
-    career_high = min(rankings)
-    career_high_idx = rankings.index(career_high)
-    career_high_date = ranking_dates[career_high_idx]
-    
-    # Gather points data
-    points_dates = []
-    points = []
-    
-    for table in tables:
-        try:
-            cur.execute(f'SELECT points FROM "{table}" WHERE name = ?', (player,))
-            row = cur.fetchone()
-            if row:
-                points_str = row[0].replace(',', '').replace('-', '0')
-                try:
-                    points_val = int(points_str)
-                    points_dates.append(table)
-                    points.append(points_val)
-                except:
-                    continue
-        except:
-            continue
-    
-    # Calculate max points
-    max_points = max(points) if points else 0
-    max_points_date = "No Points System"
-    if max_points > 0:
-        max_points_idx = points.index(max_points)
-        max_points_date = points_dates[max_points_idx]
-    
-    # Calculate stats
-    weeks_top_100 = len(rankings)
-    weeks_top_10 = sum(1 for r in rankings if r <= 10)
-    weeks_at_1 = sum(1 for r in rankings if r == 1)
-    
-    conn.close()
+    return {
+        "player": player,
+        "ranking_dates": ranking_dates,
+        "rankings": rankings,
+        "points_dates": points_dates,
+        "points": points
+    }
+
+
+def _window_stats(cur: sqlite3.Cursor, player: str, start: Optional[str], end: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Compute ``player_stats`` columns over a date window, None if the player was not ranked in it."""
+    counts = _prefix_counts(cur, player, start, end)
+    if counts["weeks_top_100"] == 0:
+        return None
+    
+    # Extremes are not prefix-summable; sort the window's rows on the (player, week) index
+    bounds = (player, *_window_bounds(start, end))
+    cur.execute(
+        f'SELECT rank, week FROM {FACT_TABLE} WHERE player = ? AND week BETWEEN ? AND ? '
+        f'AND rank IS NOT NULL ORDER BY rank, week DESC LIMIT 1',
+        bounds
+    )
+    career_high_rank, career_high_date = cur.fetchone()
+    cur.execute(
+        f'SELECT points, week FROM {FACT_TABLE} WHERE player = ? AND week BETWEEN ? AND ? '
+        f'AND points > 0 ORDER BY points DESC, week DESC LIMIT 1',
+        bounds
+    )
+    max_points, max_points_date = cur.fetchone() or (0, None)
     
     return {
         "player": player,
-        "career_high_rank": career_high,
+        "career_high_rank": career_high_rank,
         "career_high_date": career_high_date,
-        "max_points": f"{max_points:,}" if max_points > 0 else "-",
+        "max_points": max_points,
         "max_points_date": max_points_date,
-        "weeks_top_100": weeks_top_100,
-        "weeks_top_10": weeks_top_10,
-        "weeks_at_1": weeks_at_1
+        "weeks_top_100": counts["weeks_top_100"],
+        "weeks_top_10": counts["weeks_top_10"],
+        "weeks_at_1": counts["weeks_at_1"]
     }
 
 
-def get_player_career(player: str) -> Dict[str, Any]:
-    """Get player career data for charting (rankings and points over time)."""
+@coalesced
+def get_player_factfile(player: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """Get player factfile/statistics, optionally over a ``start``..``end`` window."""
+    engine = get_engine()
+    if engine is not None:
+        return engine.player_factfile(player, start, end)
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
-    tables = get_all_weeks()
+    if start is None and end is None:
+        # Aggregates are materialized in player_stats when weeks are ingested
+        cur.execute(f'SELECT * FROM {STATS_TABLE} WHERE player = ?', (player,))
+        stats = cur.fetchone()
+    else:
+        stats = _window_stats(cur, player, start, end)
     
-    # Gather ranking data
-    ranking_dates = []
-    rankings = []
-    
-    for table in tables:
-        try:
-            cur.execute(f'SELECT rank FROM "{table}" WHERE name = ?', (player,))
-            row = cur.fetchone()
-            if row:
-                rank_str = row[0].replace('T', '')
-                try:
-                    ranking_dates.append(table)
-                    rankings.append(int(rank_str))
-                except:
-                    continue
-        except:
-            continue
-    
-    # Gather points data
-    points_dates = []
-    points = []
+    if stats is None:
+        raise _not_found(player, start, end)
     
-    for table in tables:
-        try:
-            cur.execute(f'SELECT points FROM "{table}" WHERE name = ?', (player,))
-            row = cur.fetchone()
-            if row:
-                points_str = row[0].replace(',', '').replace('-', '0')
-                try:
-                    points_val = int(points_str)
-                    if points_val > 0:  # Only include non-zero points
-                        points_dates.append(table)
-                        points.append(points_val)
-                except:
-                    continue
-        except:
-            continue
-    
-    conn.close()
+    return _format_factfile(stats)
+
+
+@coalesced
+def get_player_career(player: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """Get player career data for charting (rankings and points over time)."""
+    engine = get_engine()
+    if engine is not None:
+        return engine.player_career(player, start, end)
     
-    if not rankings and not points:
-        raise ValueError(f"Player {player} not found")
+    conn = get_db_connection()
+    cur = conn.cursor()
     
-    return {
-        "player": player,
-        "ranking_dates": ranking_dates,
-        "rankings": rankings,
-        "points_dates": points_dates,
-        "points": points
-    }
+    try:
+        return _format_career(player, _get_player_rows(cur, player, start, end))
+    except ValueError:
+        raise _not_found(player, start, end)
+
+
+def get_players_batch(players: Sequence[str]) -> Dict[str, Any]:
+    """
+    Get factfiles and careers for several players at once.
+
+    Reads all players' stats and fact rows with one query each instead of two
+    requests per player. Players are returned in request order (duplicates
+    dropped); unknown names are listed in ``not_found``.
+    """
+    players = list(dict.fromkeys(players))
+    if len(players) > MAX_BATCH_PLAYERS:
+        raise ValueError(f"At most {MAX_BATCH_PLAYERS} players per batch")
+    
+    if not players:
+        return {"players": [], "not_found": []}
+    
+    engine = get_engine()
+    if engine is not None:
+        factfiles, careers = {}, {}
+        for player in players:
+            try:
+                careers[player] = engine.player_career(player)
+                factfiles[player] = engine.player_factfile(player)
+            except ValueError:
+                pass
+    else:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        placeholders = ", ".join("?" * len(players))
+        
+        cur.execute(f'SELECT * FROM {STATS_TABLE} WHERE player IN ({placeholders})', players)
+        factfiles = {row["player"]: _format_factfile(row) for row in cur.fetchall()}
+        
+        # One ordered pass over the (player, week) index for every career
+        cur.execute(
+            f'SELECT week, rank, points, player FROM {FACT_TABLE} '
+            f'WHERE player IN ({placeholders}) ORDER BY player, week DESC, rowid',
+            players
+        )
+        careers = {}
+        for player, rows in groupby(cur.fetchall(), key=itemgetter("player")):
+            try:
+                careers[player] = _format_career(player, first_per_week(rows))
+            except ValueError:
+                pass
+    
+    results, not_found = [], []
+    for player in players:
+        if player in factfiles and player in careers:
+            results.append({"player": player, "factfile": factfiles[player], "career": careers[player]})
+        else:
+            not_found.append(player)
+    
+    return {"players": results, "not_found": not_found}
 
 
-def get_weeks_at_no1() -> List[Dict[str, Any]]:
-    """Get all players and their weeks at number 1."""
+def get_weeks_at_no1(start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get all players and their weeks at number 1, optionally over a ``start``..``end`` window."""
+    engine = get_engine()
+    if engine is not None:
+        return engine.weeks_at_no1(start, end)
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
-    tables = get_all_weeks()
-    player_weeks = {}
-    
-    # Go through all weeks and count how many times each player was #1
-    for table in tables:
-        try:
-            cur.execute(f'SELECT name FROM "{table}" WHERE rank = "1" OR rank = "T1"')
-            row = cur.fetchone()
-            if row:
-                player_name = row[0]
-                if player_name not in player_weeks:
-                    player_weeks[player_name] = 0
-                player_weeks[player_name] += 1
-        except:
-            continue
+    if start is None and end is None:
+        # Leaderboard is materialized in no1_leaderboard when weeks are ingested;
+        # ties keep the player who was #1 most recently first
+        cur.execute(f'SELECT player, weeks FROM {NO1_TABLE} ORDER BY weeks DESC, latest_week DESC')
+        rows = cur.fetchall()
+        return [{"player": row["player"], "weeks": row["weeks"]} for row in rows]
+    
+    # Only players with weeks at #1 overall can have any in the window
+    leaders = []
+    for (player,) in cur.execute(f'SELECT player FROM {NO1_TABLE}').fetchall():
+        weeks = _prefix_counts(cur, player, start, end)["weeks_no1"]
+        if weeks:
+            # The latest week at #1 in the window is where the running count first reached its value at 'to'
+            upper = _prefix_counts(cur, player, None, end)["weeks_no1"]
+            cur.execute(
+                f'SELECT MIN(week) FROM {PREFIX_TABLE} WHERE player = ? AND weeks_no1 = ?',
+                (player, upper)
+            )
+            leaders.append((weeks, cur.fetchone()[0], player))
+    
+    leaders.sort(key=lambda leader: (leader[0], leader[1]), reverse=True)
+    return [{"player": player, "weeks": weeks} for weeks, _, player in leaders]
+
+
+@coalesced
+def get_leaderboard(max_rank: int = 10, start: Optional[str] = None, end: Optional[str] = None,
+                    metric: str = "weeks", limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Rank players by their weeks inside the top ``max_rank`` over a window.
+
+    ``metric`` orders by those weeks ("weeks"), the peak points reached in
+    them ("points") or their average rank ("avg_rank"). Raises ValueError
+    for invalid parameters.
+    """
+    check_window(start, end)
+    check_leaderboard(max_rank, metric, limit)
+    engine = get_engine()
+    if engine is not None:
+        return engine.leaderboard(max_rank, start, end, metric, limit)
     
-    conn.close()
+    conn = get_db_connection()
+    cur = conn.cursor()
     
-    # Convert to list of dictionaries
-    result = [
-        {"player": player, "weeks": weeks}
-        for player, weeks in player_weeks.items()
-    ]
+    # Range scan on the (week, rank) index; a player listed twice in a week counts once
+    cur.execute(
+        f"""SELECT player, COUNT(*), SUM(rank), MAX(COALESCE(points, 0)), MAX(week) FROM {FACT_TABLE} AS r
+            WHERE week BETWEEN ? AND ? AND rank <= ?
+            AND rowid = (SELECT MIN(rowid) FROM {FACT_TABLE} WHERE player = r.player AND week = r.week)
+            GROUP BY player""",
+        (*_window_bounds(start, end), max_rank)
+    )
+    return rank_players(cur.fetchall(), metric, limit)
+
+
+def _week_ranks(cur: sqlite3.Cursor, week: str) -> Dict[str, Tuple[int, Optional[int]]]:
+    """Return ``{player: (rank, points)}`` for the ranked players of a week."""
+    cur.execute(f'SELECT player, rank, points FROM {FACT_TABLE} WHERE week = ? ORDER BY rowid', (week,))
+    ranks = {}
+    for row in cur.fetchall():
+        # The first row counts if a week lists a player twice
+        ranks.setdefault(row["player"], (row["rank"], row["points"]))
+    return {player: entry for player, entry in ranks.items() if entry[0] is not None}
+
+
+def _diff_weeks(start: str, end: str) -> Dict[str, Any]:
+    """Compare the rankings of two existing weeks."""
+    conn = get_db_connection()
+    cur = conn.cursor()
     
-    # Sort by weeks descending
-    result.sort(key=lambda x: x["weeks"], reverse=True)
+    # Two seeks on the (week, rank) index, joined on player in memory
+    before, after = _week_ranks(cur, start), _week_ranks(cur, end)
+    
+    movers = []
+    for player, (rank, points) in after.items():
+        if player in before:
+            from_rank, from_points = before[player]
+            movers.append({
+                "player": player,
+                "from_rank": from_rank,
+                "to_rank": rank,
+                "rank_change": from_rank - rank,
+                "from_points": from_points,
+                "to_points": points,
+                "points_change": None if points is None or from_points is None else points - from_points
+            })
+    movers.sort(key=itemgetter("to_rank"))
+    
+    def listing(ranks: Dict[str, Tuple[int, Optional[int]]], players: set) -> List[Dict[str, Any]]:
+        return sorted(
+            ({"player": player, "rank": ranks[player][0], "points": ranks[player][1]} for player in players),
+            key=itemgetter("rank")
+        )
     
-    return result
+    return {
+        "from": start,
+        "to": end,
+        "movers": movers,
+        "entries": listing(after, after.keys() - before.keys()),
+        "exits": listing(before, before.keys() - after.keys())
+    }
+
+
+@lru_cache(maxsize=DIFF_CACHE_SIZE)
+def _consecutive_diff(start: str, end: str, version: Tuple[int, ...]) -> Dict[str, Any]:
+    # Keyed on the database version, so entries for replaced data are never hit again
+    return _diff_weeks(start, end)
+
+
+def get_week_diff(start: str, end: str) -> Dict[str, Any]:
+    """
+    Get rank and points changes between two weeks, plus the players who
+    entered or left the rankings.
+
+    ``rank_change`` is positive for players who moved up. Diffs between
+    consecutive weeks are cached per database version and shared between
+    callers, so the result must not be modified.
+    """
+    catalog = get_week_catalog()
+    for week in (start, end):
+        if week not in catalog:
+            raise ValueError(f"Week {week} not found")
+    
+    if catalog.next(start) == end:
+        return _consecutive_diff(start, end, catalog.version)
+    return _diff_weeks(start, end)
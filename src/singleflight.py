@@ -0,0 +1,140 @@
+"""
+Request coalescing ("single flight") with a bounded LRU of results.
+
+When many requests for the same expensive call (e.g. a shared player's
+career) arrive together, only the first starts it; the others await the same
+task instead of repeating the scan in parallel. Waiting happens on the event
+loop, so followers hold no service thread while the leader's call runs.
+Finished results are kept in a small LRU; callers include the database
+version in the key so that data from a replaced database is never served.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Shares one task between concurrent ``run`` calls with the same key.
+
+    The task is independent of its callers: a caller that is cancelled stops
+    waiting, but the others still get the result.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.coalesced = 0
+        # (event loop, key) -> task; tasks cannot be awaited from another loop
+        self._tasks: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                  on_result: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Await ``compute()``, or the task already computing ``key``.
+
+        ``on_result`` is called once with a successful result. Exceptions are
+        raised to every caller waiting on the same task.
+        """
+        task_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(compute())
+                self.started += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if leader:
+            def finish(done: "asyncio.Future[Any]") -> None:
+                with self._lock:
+                    self._tasks.pop(task_key, None)
+                # Retrieving the exception also keeps asyncio from logging it as unhandled
+                if not done.cancelled() and done.exception() is None and on_result is not None:
+                    on_result(done.result())
+
+            task.add_done_callback(finish)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of tasks started and of callers that joined one."""
+        with self._lock:
+            return {"started": self.started, "coalesced": self.coalesced}
+
+
+class CoalescingCache:
+    """
+    Thread-safe LRU of results, bounded by entry count, whose async misses
+    for the same key are computed only once (see ``SingleFlight``).
+
+    Counters: ``hits`` (served from the cache), ``misses`` (computed) and
+    ``coalesced`` (awaited a computation already running).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(True, result)`` if ``key`` is cached, else ``(False, None)``."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            return False, None
+
+    def put(self, key: Hashable, result: Any) -> None:
+        with self._lock:
+            if self.max_entries <= 0:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def call(self, key: Hashable, func: Callable[..., Any], *args: Any) -> Any:
+        """Return ``func(*args)``, cached under ``key`` (exceptions are not cached)."""
+        found, result = self.get(key)
+        if found:
+            return result
+        with self._lock:
+            self.misses += 1
+        result = func(*args)
+        self.put(key, result)
+        return result
+
+    async def call_async(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached result for ``key`` or await ``compute()``, sharing
+        one computation between concurrent callers.
+        """
+        found, result = self.get(key)
+        if found:
+            return result
+        return await self._flights.run(key, self._counted(compute), on_result=partial(self.put, key))
+
+    def _counted(self, compute: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        async def run() -> Any:
+            with self._lock:
+                self.misses += 1
+            return await compute()
+        return run
+
+    def clear(self) -> None:
+        """Drop the cached results (computations in progress are unaffected)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the entry count and the hit, miss and coalesced counters."""
+        with self._lock:
+            entries, hits, misses = len(self._entries), self.hits, self.misses
+        return {"entries": entries, "hits": hits, "misses": misses, "coalesced": self._flights.stats()["coalesced"]}
@@ -0,0 +1,783 @@
+"""
+Storage layout helpers for the ATP Rankings database.
+
+The scrapers write one table per ranking week (named ``YYYY-MM-DD``) holding
+the raw ``rank``/``name``/``points`` strings from atptour.com. For querying,
+the same data is mirrored into a single long-format ``rankings`` fact table
+with typed columns and composite indexes, so a player lookup is one indexed
+range scan instead of one query per week table.
+
+The week tables can also be folded into a compact delta-encoded store
+(``compact_weeks``); ``list_weeks`` and ``read_week`` read either layout.
+"""
+import sqlite3
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+FACT_TABLE = "rankings"
+
+# sqlite_master filter matching the per-week tables only
+WEEK_TABLE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+FACT_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {FACT_TABLE} (
+        week TEXT NOT NULL,
+        rank INTEGER,
+        tied INTEGER NOT NULL DEFAULT 0,
+        player TEXT NOT NULL,
+        points INTEGER
+    )""",
+    f"CREATE INDEX IF NOT EXISTS idx_{FACT_TABLE}_player_week ON {FACT_TABLE}(player, week)",
+    f"CREATE INDEX IF NOT EXISTS idx_{FACT_TABLE}_week_rank ON {FACT_TABLE}(week, rank)",
+]
+
+
+def parse_rank(raw: Optional[str]) -> Tuple[Optional[int], int]:
+    """Convert a raw rank string such as ``"T7"`` into ``(rank, tied)``."""
+    if raw is None:
+        return None, 0
+    raw = str(raw)
+    tied = 1 if "T" in raw else 0
+    try:
+        return int(raw.replace("T", "")), tied
+    except ValueError:
+        return None, tied
+
+
+def parse_points(raw: Optional[str]) -> Optional[int]:
+    """Convert a raw points string such as ``"1,234"`` or ``"-"`` into an int."""
+    if raw is None:
+        return None
+    try:
+        return int(str(raw).replace(",", "").replace("-", "0"))
+    except ValueError:
+        return None
+
+
+def list_week_tables(conn: sqlite3.Connection) -> List[str]:
+    """Return the names of all per-week tables, most recent first."""
+    cur = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name GLOB ? ORDER BY name DESC;",
+        (WEEK_TABLE_GLOB,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def list_weeks(conn: sqlite3.Connection) -> List[str]:
+    """Return every stored week, as a table or in the compact store, most recent first."""
+    return sorted(set(list_week_tables(conn)) | set(compact_weeks_stored(conn)), reverse=True)
+
+
+def read_week(conn: sqlite3.Connection, week: str) -> List[Tuple[str, str, str]]:
+    """
+    Return the raw ``(rank, name, points)`` rows of a week, from its table
+    or, if it has none, reconstructed from the compact store.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (week,)).fetchone():
+        return conn.execute(f'SELECT rank, name, points FROM "{week}";').fetchall()
+    return read_compact_week(conn, week)
+
+
+def fact_table_exists(conn: sqlite3.Connection) -> bool:
+    """Check whether the ``rankings`` fact table has been created."""
+    cur = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (FACT_TABLE,)
+    )
+    return cur.fetchone() is not None
+
+
+def create_fact_table(conn: sqlite3.Connection) -> None:
+    """Create the fact table and its indexes if they do not exist yet."""
+    for statement in FACT_SCHEMA:
+        conn.execute(statement)
+
+
+def fact_rows(week: str, rows: Iterable[Tuple[str, str, str]]) -> List[Tuple]:
+    """Convert raw ``(rank, name, points)`` rows of one week into fact rows."""
+    result = []
+    for rank_raw, name, points_raw in rows:
+        if name is None:
+            continue
+        rank, tied = parse_rank(rank_raw)
+        result.append((week, rank, tied, name, parse_points(points_raw)))
+    return result
+
+
+def load_week(conn: sqlite3.Connection, week: str, refresh_stats: bool = True) -> Set[str]:
+    """
+    (Re)load a single week table into the fact table.
+
+    Returns the players whose rows changed. Unless ``refresh_stats`` is False,
+    their ``player_stats`` and leaderboard entries are updated as well.
+    """
+    create_fact_table(conn)
+    touched = week_players(conn, week)
+    rows = fact_rows(week, read_week(conn, week))
+    conn.execute(f"DELETE FROM {FACT_TABLE} WHERE week = ?;", (week,))
+    conn.executemany(
+        f"INSERT INTO {FACT_TABLE} (week, rank, tied, player, points) VALUES (?, ?, ?, ?, ?);",
+        rows,
+    )
+    touched.update(row[3] for row in rows)
+    if refresh_stats:
+        refresh_player_stats(conn, touched)
+    return touched
+
+
+def unload_week(conn: sqlite3.Connection, week: str) -> Set[str]:
+    """Remove a week from the fact table. Returns the players whose rows changed."""
+    touched = week_players(conn, week)
+    conn.execute(f"DELETE FROM {FACT_TABLE} WHERE week = ?;", (week,))
+    return touched
+
+
+def week_players(conn: sqlite3.Connection, week: str) -> Set[str]:
+    """Return the players listed in the fact table for a week."""
+    cur = conn.execute(f"SELECT player FROM {FACT_TABLE} WHERE week = ?;", (week,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def sync_fact_table(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """
+    Bring the fact table and player aggregates in line with the per-week tables.
+
+    Loads weeks that are stored but have no fact rows and removes fact rows
+    whose week was dropped, then refreshes the aggregates of the affected
+    players (or rebuilds them if they were never built).
+    Returns ``(weeks_added, weeks_removed)``.
+    """
+    create_fact_table(conn)
+    stats_built = stats_tables_exist(conn)
+    tables = set(list_weeks(conn))
+    loaded = {row[0] for row in conn.execute(f"SELECT DISTINCT week FROM {FACT_TABLE};")}
+
+    added = sorted(tables - loaded)
+    removed = sorted(loaded - tables)
+    touched = set()
+    for week in added:
+        touched |= load_week(conn, week, refresh_stats=False)
+    for week in removed:
+        touched |= unload_week(conn, week)
+
+    if stats_built:
+        refresh_player_stats(conn, touched)
+    else:
+        rebuild_player_stats(conn)
+    conn.commit()
+    return len(added), len(removed)
+
+
+def rebuild_fact_table(conn: sqlite3.Connection) -> int:
+    """Drop and rebuild the fact table and aggregates from every stored week. Returns weeks loaded."""
+    conn.execute(f"DROP TABLE IF EXISTS {FACT_TABLE};")
+    create_fact_table(conn)
+    weeks = list_weeks(conn)
+    for week in weeks:
+        load_week(conn, week, refresh_stats=False)
+    rebuild_player_stats(conn)
+    conn.commit()
+    return len(weeks)
+
+
+def replace_weeks(conn: sqlite3.Connection, weeks: Iterable[Tuple[str, Sequence[Tuple[str, str, str]]]],
+                  status: str = "written") -> Set[str]:
+    """
+    Store scraped ``(week, [(rank, name, points), ...])`` pairs in one transaction.
+
+    Each week table is replaced (not appended to), its fact rows reloaded, the
+    aggregates of the affected players refreshed once for the batch and the
+    weeks journaled with ``status`` ("filler" for copied weeks). On any error
+    the transaction is rolled back, so a week is either stored completely or
+    not at all. Returns the players whose rows changed.
+    """
+    # DDL does not open a transaction implicitly, so start one explicitly
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        touched = set()
+        for week, rows in weeks:
+            conn.execute(f'DROP TABLE IF EXISTS "{week}";')
+            conn.execute(f'CREATE TABLE "{week}"(rank, name, points);')
+            conn.executemany(f'INSERT INTO "{week}" VALUES (?, ?, ?);', rows)
+            touched |= load_week(conn, week, refresh_stats=False)
+            mark_weeks(conn, [week], status)
+        if stats_tables_exist(conn):
+            refresh_player_stats(conn, touched)
+        else:
+            rebuild_player_stats(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return touched
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Use WAL journaling with ``synchronous=NORMAL`` while bulk loading, so a
+    commit appends to the log instead of syncing the database file.
+
+    The previous journal mode is restored afterwards (checkpointing the log
+    into the database file), leaving a single self-contained file to deploy.
+    """
+    conn.commit()
+    journal_mode = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous;").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        conn.execute(f"PRAGMA journal_mode = {journal_mode};")
+        conn.execute(f"PRAGMA synchronous = {synchronous};")
+
+
+# Per-week ingestion progress, so an interrupted or repeated update resumes
+# with the weeks that are not finished instead of re-checking every week
+JOURNAL_TABLE = "ingest_journal"
+
+JOURNAL_STATUSES = ("fetched", "parsed", "written", "filler", "frozen", "failed")
+# Weeks in these states need no more work
+DONE_STATUSES = ("written", "filler", "frozen")
+
+JOURNAL_SCHEMA = f"""CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} (
+    week TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    error TEXT
+) WITHOUT ROWID"""
+
+
+def mark_weeks(conn: sqlite3.Connection, weeks: Iterable[str], status: str, error: Optional[str] = None) -> None:
+    """Record ``status`` for each week in the ingestion journal (the caller commits)."""
+    if status not in JOURNAL_STATUSES:
+        raise ValueError(f"Unknown journal status {status}; expected one of {', '.join(JOURNAL_STATUSES)}")
+    conn.execute(JOURNAL_SCHEMA)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {JOURNAL_TABLE} (week, status, updated, error) VALUES (?, ?, datetime('now'), ?);",
+        [(week, status, error) for week in weeks],
+    )
+
+
+def sync_journal(conn: sqlite3.Connection) -> int:
+    """
+    Record week tables that have no journal entry (a database built before
+    the journal, or tables added by hand) as written. Returns weeks added.
+    """
+    conn.execute(JOURNAL_SCHEMA)
+    cur = conn.executemany(
+        f"INSERT OR IGNORE INTO {JOURNAL_TABLE} (week, status, updated) VALUES (?, 'written', datetime('now'));",
+        [(week,) for week in list_weeks(conn)],
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def journal_statuses(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Return ``{week: status}`` for every journaled week."""
+    conn.execute(JOURNAL_SCHEMA)
+    return dict(conn.execute(f"SELECT week, status FROM {JOURNAL_TABLE};"))
+
+
+def week_status(conn: sqlite3.Connection, week: str) -> Optional[str]:
+    """Return the journaled status of ``week``, or None (read-only: never creates the journal)."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (JOURNAL_TABLE,)).fetchone():
+        return None
+    row = conn.execute(f"SELECT status FROM {JOURNAL_TABLE} WHERE week = ?;", (week,)).fetchone()
+    return row[0] if row else None
+
+
+def plan_weeks(conn: sqlite3.Connection, expected: Iterable[str],
+               done: Sequence[str] = DONE_STATUSES, listed: Iterable[str] = ()) -> List[str]:
+    """
+    Return the ``expected`` weeks still to ingest, oldest first: those not
+    journaled with one of the ``done`` statuses. Weeks a previous run fetched
+    or parsed but never wrote, or that failed, are planned again.
+
+    ``listed`` are the weeks the site now publishes: filler weeks among them
+    (copied while the real week was not out yet) are planned again too.
+    """
+    sync_journal(conn)
+    listed = set(listed)
+    finished = {
+        week for week, status in conn.execute(
+            f"SELECT week, status FROM {JOURNAL_TABLE} WHERE status IN ({', '.join('?' for _ in done)});",
+            tuple(done)
+        )
+        if not (status == "filler" and week in listed)
+    }
+    return sorted(set(expected) - finished)
+
+
+# Compact week storage: the raw week tables replaced by an index and row
+# tables. A week identical to the one before it (a filler week) is an alias of
+# that week. Any other week is a delta against the previous stored week, keyed
+# by player: a player with the same points whose rank is just their position
+# is carried over, so a rank shift alone costs nothing; only the other rows
+# are stored, plus the positions of previous rows not carried. A full keyframe
+# is written every KEYFRAME_INTERVAL weeks (or when a delta would not be much
+# smaller); keyframe_interval=1 stores every week in full. A week is rebuilt
+# from its keyframe plus the deltas since, in three range queries.
+COMPACT_TABLE = "week_store"
+COMPACT_ROWS_TABLE = "week_store_rows"
+COMPACT_DROPS_TABLE = "week_store_drops"
+
+KEYFRAME_INTERVAL = 13
+
+COMPACT_SCHEMA = [
+    # keyframe: the key week a delta chain starts from (a key week's own week,
+    # an alias's target's keyframe); base: the week an alias repeats
+    f"""CREATE TABLE IF NOT EXISTS {COMPACT_TABLE} (
+        week TEXT PRIMARY KEY,
+        kind TEXT NOT NULL CHECK (kind IN ('key', 'delta', 'alias')),
+        base TEXT,
+        keyframe TEXT NOT NULL,
+        row_count INTEGER NOT NULL
+    ) WITHOUT ROWID""",
+    f"""CREATE TABLE IF NOT EXISTS {COMPACT_ROWS_TABLE} (
+        week TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        rank,
+        name,
+        points,
+        PRIMARY KEY (week, pos)
+    ) WITHOUT ROWID""",
+    # Positions of the previous stored week's rows that a delta week does not carry over
+    f"""CREATE TABLE IF NOT EXISTS {COMPACT_DROPS_TABLE} (
+        week TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        PRIMARY KEY (week, pos)
+    ) WITHOUT ROWID""",
+]
+
+
+def compact_weeks_stored(conn: sqlite3.Connection) -> List[str]:
+    """Return the weeks in the compact store, most recent first (none if it was never built)."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (COMPACT_TABLE,)).fetchone():
+        return []
+    return [row[0] for row in conn.execute(f"SELECT week FROM {COMPACT_TABLE} ORDER BY week DESC;")]
+
+
+def week_delta(base: Sequence[Tuple], rows: Sequence[Tuple]) -> Tuple[List[Tuple[int, Tuple]], List[int]]:
+    """
+    Encode ``rows`` against ``base`` by player. Returns the ``(position, row)``
+    pairs stored explicitly and the positions of ``base`` rows not carried.
+
+    A row is carried when its rank is its position and ``base`` has the same
+    player with the same points, in the same order as the other carried rows.
+    """
+    positions: Dict[Tuple, List[int]] = {}
+    for pos, (_, name, points) in enumerate(base):
+        positions.setdefault((name, points), []).append(pos)
+    explicit = []
+    carried = set()
+    last = -1
+    for pos, row in enumerate(rows):
+        rank, name, points = row
+        base_pos = next((p for p in positions.get((name, points), ()) if p > last), None)
+        if base_pos is not None and rank == str(pos + 1):
+            carried.add(base_pos)
+            last = base_pos
+        else:
+            explicit.append((pos, tuple(row)))
+    return explicit, [pos for pos in range(len(base)) if pos not in carried]
+
+
+def apply_delta(base: Sequence[Tuple], row_count: int, explicit: Sequence[Tuple[int, Tuple]],
+                dropped: Iterable[int]) -> List[Tuple]:
+    """Rebuild a week from the week before it and its ``week_delta``."""
+    dropped = set(dropped)
+    carried = iter([row for pos, row in enumerate(base) if pos not in dropped])
+    stored = dict(explicit)
+    rows = []
+    for pos in range(row_count):
+        if pos in stored:
+            rows.append(stored[pos])
+        else:
+            _, name, points = next(carried)
+            rows.append((str(pos + 1), name, points))
+    return rows
+
+
+def read_compact_week(conn: sqlite3.Connection, week: str) -> List[Tuple[str, str, str]]:
+    """Reconstruct a week from the compact store; ``ValueError`` if it is not stored."""
+    entry = None
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (COMPACT_TABLE,)).fetchone():
+        entry = conn.execute(f"SELECT kind, base, keyframe FROM {COMPACT_TABLE} WHERE week = ?;", (week,)).fetchone()
+    if entry is None:
+        raise ValueError(f"Week {week} not found")
+    kind, base, keyframe = entry
+    target = base if kind == "alias" else week
+
+    # Every non-alias week from the keyframe on is one link of the chain
+    chain = conn.execute(
+        f"SELECT week, kind, row_count FROM {COMPACT_TABLE} WHERE week BETWEEN ? AND ? AND kind != 'alias' ORDER BY week;",
+        (keyframe, target),
+    ).fetchall()
+    explicit: Dict[str, List[Tuple]] = {}
+    for chain_week, pos, rank, name, points in conn.execute(
+        f"SELECT week, pos, rank, name, points FROM {COMPACT_ROWS_TABLE} WHERE week BETWEEN ? AND ? ORDER BY week, pos;",
+        (keyframe, target),
+    ):
+        explicit.setdefault(chain_week, []).append((pos, (rank, name, points)))
+    dropped: Dict[str, List[int]] = {}
+    for chain_week, pos in conn.execute(
+        f"SELECT week, pos FROM {COMPACT_DROPS_TABLE} WHERE week BETWEEN ? AND ?;", (keyframe, target)
+    ):
+        dropped.setdefault(chain_week, []).append(pos)
+
+    rows: List[Tuple] = []
+    for chain_week, chain_kind, row_count in chain:
+        if chain_kind == "key":
+            rows = [row for _, row in explicit.get(chain_week, [])]
+        else:
+            rows = apply_delta(rows, row_count, explicit.get(chain_week, []), dropped.get(chain_week, []))
+    return rows
+
+
+def compact_weeks(conn: sqlite3.Connection, keyframe_interval: int = KEYFRAME_INTERVAL,
+                  drop_tables: bool = True) -> Dict[str, int]:
+    """
+    (Re)build the compact store from every stored week, in one transaction.
+
+    Week tables take precedence over weeks already in the store (they are
+    newer), so weeks ingested since the last run are folded in. Unless
+    ``drop_tables`` is False the week tables are then dropped; the fact
+    table and aggregates are unchanged. Returns the number of key, delta
+    and alias weeks written.
+    """
+    weeks = sorted(list_weeks(conn))
+    contents = [(week, read_week(conn, week)) for week in weeks]
+    counts = {"key": 0, "delta": 0, "alias": 0}
+
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for table in (COMPACT_TABLE, COMPACT_ROWS_TABLE, COMPACT_DROPS_TABLE):
+            conn.execute(f"DROP TABLE IF EXISTS {table};")
+        for statement in COMPACT_SCHEMA:
+            conn.execute(statement)
+
+        previous: Optional[List[Tuple]] = None
+        source = keyframe = None
+        since_keyframe = 0
+        for week, rows in contents:
+            rows = [tuple(row) for row in rows]
+            dropped: List[int] = []
+            if previous is not None and rows == previous:
+                # Repeats the previous week, itself possibly an alias of ``source``
+                entry = ("alias", source, keyframe, len(rows))
+                stored: List[Tuple[int, Tuple]] = []
+            else:
+                delta = week_delta(previous, rows) if previous is not None else None
+                since_keyframe += 1
+                if delta is None or since_keyframe >= keyframe_interval or len(delta[0]) * 2 >= len(rows):
+                    keyframe, since_keyframe = week, 0
+                    entry = ("key", None, week, len(rows))
+                    stored = list(enumerate(rows))
+                else:
+                    entry = ("delta", source, keyframe, len(rows))
+                    stored, dropped = delta
+                source = week
+            counts[entry[0]] += 1
+            conn.execute(
+                f"INSERT INTO {COMPACT_TABLE} (week, kind, base, keyframe, row_count) VALUES (?, ?, ?, ?, ?);",
+                (week, *entry),
+            )
+            conn.executemany(
+                f"INSERT INTO {COMPACT_ROWS_TABLE} (week, pos, rank, name, points) VALUES (?, ?, ?, ?, ?);",
+                [(week, pos, *row) for pos, row in stored],
+            )
+            conn.executemany(
+                f"INSERT INTO {COMPACT_DROPS_TABLE} (week, pos) VALUES (?, ?);", [(week, pos) for pos in dropped]
+            )
+            previous = rows
+
+        if drop_tables:
+            for week in list_week_tables(conn):
+                conn.execute(f'DROP TABLE "{week}";')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return counts
+
+
+def expand_weeks(conn: sqlite3.Connection) -> int:
+    """Recreate a table for every week only in the compact store and drop the store. Returns weeks written."""
+    tables = set(list_week_tables(conn))
+    missing = [week for week in compact_weeks_stored(conn) if week not in tables]
+    contents = [(week, read_compact_week(conn, week)) for week in missing]
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for week, rows in contents:
+            conn.execute(f'CREATE TABLE "{week}"(rank, name, points);')
+            conn.executemany(f'INSERT INTO "{week}" VALUES (?, ?, ?);', rows)
+        for table in (COMPACT_TABLE, COMPACT_ROWS_TABLE, COMPACT_DROPS_TABLE):
+            conn.execute(f"DROP TABLE IF EXISTS {table};")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(contents)
+
+
+# Materialized per-player aggregates and the weeks-at-#1 leaderboard, kept up
+# to date as weeks are loaded so the factfile and leaderboard are key lookups.
+STATS_TABLE = "player_stats"
+NO1_TABLE = "no1_leaderboard"
+# Running week counts per player, so a date-window count is the difference
+# of two index seeks: count(from..to) = prefix(<= to) - prefix(< from)
+PREFIX_TABLE = "player_prefix"
+
+PREFIX_COLUMNS = ["weeks_top_100", "weeks_top_10", "weeks_at_1", "weeks_no1"]
+
+STATS_COLUMNS = [
+    "player", "career_high_rank", "career_high_date", "max_points", "max_points_date",
+    "weeks_top_100", "weeks_top_10", "weeks_at_1",
+]
+
+STATS_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        player TEXT PRIMARY KEY,
+        career_high_rank INTEGER NOT NULL,
+        career_high_date TEXT NOT NULL,
+        max_points INTEGER NOT NULL,
+        max_points_date TEXT,
+        weeks_top_100 INTEGER NOT NULL,
+        weeks_top_10 INTEGER NOT NULL,
+        weeks_at_1 INTEGER NOT NULL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {NO1_TABLE} (
+        player TEXT PRIMARY KEY,
+        weeks INTEGER NOT NULL,
+        latest_week TEXT NOT NULL
+    )""",
+    # weeks_at_1 counts weeks ranked 1 (ties included), weeks_no1 the weeks
+    # the player was the week's #1 as in the leaderboard
+    f"""CREATE TABLE IF NOT EXISTS {PREFIX_TABLE} (
+        player TEXT NOT NULL,
+        week TEXT NOT NULL,
+        weeks_top_100 INTEGER NOT NULL,
+        weeks_top_10 INTEGER NOT NULL,
+        weeks_at_1 INTEGER NOT NULL,
+        weeks_no1 INTEGER NOT NULL,
+        PRIMARY KEY (player, week)
+    ) WITHOUT ROWID""",
+    # Finds the week a player's #1 count last increased (latest week at #1)
+    f"CREATE INDEX IF NOT EXISTS idx_{PREFIX_TABLE}_no1 ON {PREFIX_TABLE}(player, weeks_no1, week)",
+]
+
+
+def stats_tables_exist(conn: sqlite3.Connection) -> bool:
+    """Check whether the aggregate tables have been created."""
+    cur = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN (?, ?, ?);",
+        (STATS_TABLE, NO1_TABLE, PREFIX_TABLE),
+    )
+    return cur.fetchone()[0] == 3
+
+
+def first_per_week(rows: Iterable[Sequence]) -> List[Sequence]:
+    """Drop repeated entries of a week from rows ordered by week (first column)."""
+    result = []
+    for row in rows:
+        if result and result[-1][0] == row[0]:
+            continue
+        result.append(row)
+    return result
+
+
+def summarize_player(player: str, rows: Sequence[Sequence]) -> Optional[Dict[str, Any]]:
+    """
+    Compute the factfile aggregates from a player's ``(week, rank, points)``
+    rows, most recent first. Returns None if the player was never ranked.
+    """
+    ranked = [(week, rank) for week, rank, _ in rows if rank is not None]
+    if not ranked:
+        return None
+    scored = [(week, points) for week, _, points in rows if points is not None]
+
+    # Ties resolve to the most recent week, as rows are most recent first
+    career_high = min(rank for _, rank in ranked)
+    career_high_date = next(week for week, rank in ranked if rank == career_high)
+    max_points = max((points for _, points in scored), default=0)
+    max_points_date = None
+    if max_points > 0:
+        max_points_date = next(week for week, points in scored if points == max_points)
+
+    return {
+        "player": player,
+        "career_high_rank": career_high,
+        "career_high_date": career_high_date,
+        "max_points": max_points,
+        "max_points_date": max_points_date,
+        "weeks_top_100": len(ranked),
+        "weeks_top_10": sum(1 for _, rank in ranked if rank <= 10),
+        "weeks_at_1": sum(1 for _, rank in ranked if rank == 1),
+    }
+
+
+def compute_player_stats(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """Compute the aggregates of every player from the fact table."""
+    cur = conn.execute(
+        f"SELECT player, week, rank, points FROM {FACT_TABLE} ORDER BY player, week DESC, rowid;"
+    )
+    stats = {}
+    for player, group in groupby(cur, key=lambda row: row[0]):
+        summary = summarize_player(player, first_per_week(row[1:] for row in group))
+        if summary is not None:
+            stats[player] = summary
+    return stats
+
+
+def compute_no1_leaderboard(conn: sqlite3.Connection) -> Dict[str, Tuple[int, str]]:
+    """Count the weeks each player was #1 as ``{player: (weeks, latest_week)}``."""
+    leaderboard = {}
+    for week, player in compute_no1_holders(conn).items():
+        weeks, latest_week = leaderboard.get(player, (0, week))
+        leaderboard[player] = (weeks + 1, latest_week)
+    return leaderboard
+
+
+def compute_no1_holders(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Return ``{week: player}`` for the #1 of every week, most recent first."""
+    cur = conn.execute(f"SELECT week, player FROM {FACT_TABLE} WHERE rank = 1 ORDER BY week DESC, rowid;")
+    # The #1 of a week is its first rank-1 row
+    return dict(first_per_week(cur))
+
+
+def prefix_rows(player: str, rows: Sequence[Sequence], no1_weeks: Set[str]) -> List[Tuple]:
+    """
+    Compute a player's running counts from ``(week, rank)`` rows, oldest
+    first, as ``(player, week, top_100, top_10, at_1, no1)`` rows.
+    """
+    top_100 = top_10 = at_1 = no1 = 0
+    result = []
+    for week, rank in rows:
+        if rank is not None:
+            top_100 += 1
+            top_10 += rank <= 10
+            at_1 += rank == 1
+        no1 += week in no1_weeks
+        result.append((player, week, top_100, top_10, at_1, no1))
+    return result
+
+
+def compute_player_prefix(conn: sqlite3.Connection) -> List[Tuple]:
+    """Compute the running counts of every player from the fact table."""
+    holders = compute_no1_holders(conn)
+    no1_weeks: Dict[str, Set[str]] = {}
+    for week, player in holders.items():
+        no1_weeks.setdefault(player, set()).add(week)
+
+    cur = conn.execute(f"SELECT player, week, rank FROM {FACT_TABLE} ORDER BY player, week, rowid;")
+    result = []
+    for player, group in groupby(cur, key=lambda row: row[0]):
+        result.extend(prefix_rows(player, first_per_week(row[1:] for row in group), no1_weeks.get(player, set())))
+    return result
+
+
+def _write_player_prefix(conn: sqlite3.Connection, rows: Iterable[Tuple]) -> None:
+    conn.executemany(
+        f"INSERT INTO {PREFIX_TABLE} (player, week, {', '.join(PREFIX_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?);",
+        rows,
+    )
+
+
+def _write_player_stats(conn: sqlite3.Connection, stats: Iterable[Dict[str, Any]]) -> None:
+    placeholders = ", ".join("?" for _ in STATS_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {STATS_TABLE} ({', '.join(STATS_COLUMNS)}) VALUES ({placeholders});",
+        [tuple(summary[column] for column in STATS_COLUMNS) for summary in stats],
+    )
+
+
+def rebuild_player_stats(conn: sqlite3.Connection) -> int:
+    """Recompute every aggregate from the fact table. Returns players written."""
+    for table in (STATS_TABLE, NO1_TABLE, PREFIX_TABLE):
+        conn.execute(f"DROP TABLE IF EXISTS {table};")
+    for statement in STATS_SCHEMA:
+        conn.execute(statement)
+
+    stats = compute_player_stats(conn)
+    _write_player_stats(conn, stats.values())
+    conn.executemany(
+        f"INSERT INTO {NO1_TABLE} (player, weeks, latest_week) VALUES (?, ?, ?);",
+        [(player, weeks, latest) for player, (weeks, latest) in compute_no1_leaderboard(conn).items()],
+    )
+    _write_player_prefix(conn, compute_player_prefix(conn))
+    return len(stats)
+
+
+def refresh_player_stats(conn: sqlite3.Connection, players: Iterable[str]) -> None:
+    """Recompute the aggregates of the given players only."""
+    if not stats_tables_exist(conn):
+        rebuild_player_stats(conn)
+        return
+
+    for player in players:
+        rows = conn.execute(
+            f"SELECT week, rank, points FROM {FACT_TABLE} WHERE player = ? ORDER BY week DESC, rowid;",
+            (player,),
+        ).fetchall()
+        rows = first_per_week(rows)
+        summary = summarize_player(player, rows)
+        if summary is None:
+            conn.execute(f"DELETE FROM {STATS_TABLE} WHERE player = ?;", (player,))
+        else:
+            _write_player_stats(conn, [summary])
+
+        no1_weeks = {
+            row[0] for row in conn.execute(
+                f"""SELECT week FROM {FACT_TABLE} AS r
+                    WHERE player = ? AND rank = 1
+                    AND rowid = (SELECT MIN(rowid) FROM {FACT_TABLE} WHERE week = r.week AND rank = 1);""",
+                (player,),
+            )
+        }
+        if no1_weeks:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {NO1_TABLE} (player, weeks, latest_week) VALUES (?, ?, ?);",
+                (player, len(no1_weeks), max(no1_weeks)),
+            )
+        else:
+            conn.execute(f"DELETE FROM {NO1_TABLE} WHERE player = ?;", (player,))
+
+        conn.execute(f"DELETE FROM {PREFIX_TABLE} WHERE player = ?;", (player,))
+        _write_player_prefix(conn, prefix_rows(player, [(week, rank) for week, rank, _ in reversed(rows)], no1_weeks))
+
+
+def check_player_stats(conn: sqlite3.Connection) -> List[str]:
+    """
+    Compare the stored aggregates against a full recomputation.
+
+    Returns a description of every mismatch; an empty list means consistent.
+    """
+    problems = []
+    expected = compute_player_stats(conn)
+    stored = {
+        row[0]: dict(zip(STATS_COLUMNS, row))
+        for row in conn.execute(f"SELECT {', '.join(STATS_COLUMNS)} FROM {STATS_TABLE};")
+    }
+    for player in sorted(expected.keys() | stored.keys()):
+        if expected.get(player) != stored.get(player):
+            problems.append(f"{STATS_TABLE}: {player}: stored {stored.get(player)} != expected {expected.get(player)}")
+
+    expected_no1 = compute_no1_leaderboard(conn)
+    stored_no1 = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute(f"SELECT player, weeks, latest_week FROM {NO1_TABLE};")
+    }
+    for player in sorted(expected_no1.keys() | stored_no1.keys()):
+        if expected_no1.get(player) != stored_no1.get(player):
+            problems.append(f"{NO1_TABLE}: {player}: stored {stored_no1.get(player)} != expected {expected_no1.get(player)}")
+
+    expected_prefix = set(compute_player_prefix(conn))
+    stored_prefix = set(conn.execute(f"SELECT player, week, {', '.join(PREFIX_COLUMNS)} FROM {PREFIX_TABLE};"))
+    for row in sorted(expected_prefix ^ stored_prefix):
+        state = "missing" if row in expected_prefix else "unexpected"
+        problems.append(f"{PREFIX_TABLE}: {row[0]}: {state} row {row[1:]}")
+    return problems
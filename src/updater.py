@@ -0,0 +1,442 @@
+"""
+Incremental update of the rankings database.
+
+``update_database`` brings a database up to date: it scrapes the weeks
+atptour.com lists that the ingestion journal does not show as finished,
+fills the remaining Mondays with a copy of the week before, drops the 2020
+ranking-freeze weeks once and syncs the fact table. ``scripts/filler.py``
+runs it in place. With ``replay`` it reads every page, including the list of
+weeks, from the page archive instead, so the same database is rebuilt
+offline.
+
+The web app runs ``swap_update`` in the background instead, at startup and
+on a ``Schedule``: the update works on a staging copy of the database next
+to it, which is validated and then renamed over the original. Requests keep
+reading the old file until then (pooled connections reopen on the new one),
+and a failed or invalid update leaves it untouched.
+"""
+import glob
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .archive import PageArchive
+from .db import file_fingerprint
+from .scraper import RANKINGS_URL, fetch, make_session, parse_weeks, scrape_weeks
+from .storage import (
+    FACT_TABLE, bulk_load, check_player_stats, fact_table_exists, journal_statuses, list_weeks, mark_weeks, plan_weeks, read_week,
+    replace_weeks, stats_tables_exist, sync_fact_table,
+)
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Mondays before this date are not filled in
+FIRST_MONDAY = date(1979, 1, 1)
+# Ranking freeze (COVID pandemic means players not credited for ranking weeks)
+FREEZE_START = date(2020, 3, 23)
+FREEZE_END = date(2020, 8, 17)
+
+# Problems reported per validation check before the rest are summarized
+MAX_PROBLEMS = 5
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Staging copies are created next to the database under this prefix
+STAGING_PREFIX = ".rankings-staging-"
+
+
+class UpdateCancelled(Exception):
+    """Raised by ``update_database`` when its ``stop`` event is set."""
+
+
+def mondays(start: date, end: date) -> List[str]:
+    """Every Monday from ``start`` (or the first Monday after it) to ``end``, oldest first."""
+    current = start + timedelta(days=(7 - start.weekday()) % 7)
+    weeks = []
+    while current <= end:
+        weeks.append(current.isoformat())
+        current += timedelta(weeks=1)
+    return weeks
+
+
+def update_database(conn: sqlite3.Connection, session=None, archive: Optional[PageArchive] = None,
+                    start: date = FIRST_MONDAY, today: Optional[date] = None, workers: int = 2,
+                    rate: float = 1.0, base_url: str = RANKINGS_URL,
+                    log: Callable[[str], None] = logger.info, replay: bool = False,
+                    stop: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    Bring the database behind ``conn`` up to date with atptour.com.
+
+    With ``replay``, pages come from ``archive`` and the network is never
+    used: the week list is the archived landing page and ``today`` defaults
+    to the day it was fetched, so the result matches the online update made
+    then (weeks missing from the archive fail).
+
+    Setting ``stop`` (e.g. on shutdown) makes it raise ``UpdateCancelled``
+    at the next batch boundary; progress made so far is journaled.
+
+    Returns counts of the weeks scraped, failed, filled and frozen, and of
+    the weeks added to / removed from the fact table.
+    """
+    if replay:
+        if archive is None:
+            raise ValueError("replay needs an archive")
+        landing = archive.get(base_url)
+        today = today or archive.fetched(base_url).date()
+    else:
+        session = session or make_session(workers)
+        landing = fetch(session, base_url, archive=archive)
+        if archive is not None:
+            archive.save()
+    listed = set(parse_weeks(landing))
+    frozen = set(mondays(FREEZE_START, FREEZE_END))
+    # The first Monday has no week before it to copy
+    expected = mondays(start, today or date.today())[1:]
+    # Filler weeks that atptour.com has published since are scraped for real
+    todo = [week for week in plan_weeks(conn, expected, listed=listed) if week not in frozen]
+    to_scrape = [week for week in todo if week in listed]
+    log(f"{len(todo)} weeks to update, {len(to_scrape)} listed on atptour.com")
+
+    def write(batch):
+        replace_weeks(conn, batch)
+        log(f"Collected data for {', '.join(week for week, _ in batch)}")
+
+    def journal(week, status):
+        mark_weeks(conn, [week], status)
+        conn.commit()
+
+    # Scrape first, so filler weeks can copy a week scraped in this run
+    with bulk_load(conn):
+        failures = scrape_weeks(
+            to_scrape, write, session=session, workers=workers, rate=rate,
+            base_url=base_url, archive=archive, replay=replay, on_status=journal, stop=stop,
+        )
+    for week, error in failures.items():
+        mark_weeks(conn, [week], "failed", str(error))
+        log(f"Failed {week}: {error}")
+    conn.commit()
+    check_stop(stop)
+
+    # Drop freeze weeks only once, not on every run (before filling, so no filler copies them)
+    statuses = journal_statuses(conn)
+    newly_frozen = sorted(week for week in frozen if statuses.get(week) != "frozen")
+    for week in newly_frozen:
+        conn.execute(f'DROP TABLE IF EXISTS "{week}";')
+    mark_weeks(conn, newly_frozen, "frozen")
+    conn.commit()
+
+    filled = 0
+    for week in todo:
+        if week in listed:
+            continue
+        check_stop(stop)
+        # Copy the latest stored week before it (frozen weeks have none)
+        previous = next((stored for stored in list_weeks(conn) if stored < week), None)
+        if previous is None:
+            continue
+        # Journaled in the same transaction, so a copy is never left marked as scraped
+        replace_weeks(conn, [(week, read_week(conn, previous))], status="filler")
+        filled += 1
+        log(f"New filler week for {week}")
+
+    # Keep the rankings fact table in line with the week tables (also builds it on first run)
+    added, removed = sync_fact_table(conn)
+    log(f"Fact table synced: {added} weeks added, {removed} weeks removed")
+    return {
+        "scraped": len(to_scrape) - len(failures),
+        "failed": len(failures),
+        "filled": filled,
+        "frozen": len(newly_frozen),
+        "added": added,
+        "removed": removed,
+    }
+
+
+def check_stop(stop: Optional[threading.Event]) -> None:
+    """Raise ``UpdateCancelled`` if ``stop`` is set."""
+    if stop is not None and stop.is_set():
+        raise UpdateCancelled("Database update cancelled")
+
+
+def validate_database(conn: sqlite3.Connection, previous_weeks: Set[str] = frozenset()) -> List[str]:
+    """
+    Check a staging database before it replaces the live one.
+
+    Returns a description of every problem: a failed integrity check, no
+    weeks, weeks of ``previous_weeks`` (the live database's) missing other
+    than the ranking freeze, fact rows out of line with the stored weeks, or
+    aggregates that disagree with a full recomputation.
+    """
+    result = conn.execute("PRAGMA quick_check;").fetchone()[0]
+    if result != "ok":
+        return [f"integrity check failed: {result}"]
+    problems = []
+    weeks = set(list_weeks(conn))
+    if not weeks:
+        problems.append("no ranking weeks")
+    lost = sorted(set(previous_weeks) - weeks - set(mondays(FREEZE_START, FREEZE_END)))
+    if lost:
+        problems.append(f"{len(lost)} weeks lost: {', '.join(lost[:MAX_PROBLEMS])}")
+    loaded = {row[0] for row in conn.execute(f"SELECT DISTINCT week FROM {FACT_TABLE};")}
+    if loaded != weeks:
+        problems.append(f"fact table out of sync: {len(weeks - loaded)} weeks missing, {len(loaded - weeks)} extra")
+    stats = check_player_stats(conn)
+    problems.extend(stats[:MAX_PROBLEMS])
+    if len(stats) > MAX_PROBLEMS:
+        problems.append(f"... {len(stats) - MAX_PROBLEMS} more aggregate mismatches")
+    return problems
+
+
+def export_snapshot(db_path: str, snapshot_path: str) -> None:
+    """Write the NumPy engine snapshot of ``db_path`` to ``snapshot_path`` (see scripts/snapshot.py)."""
+    from .engine import RankingsMatrix
+    # Taken first: if the database changes while the arrays are built, readers reject the snapshot
+    source = file_fingerprint(db_path)
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        matrix = RankingsMatrix.from_connection(conn)
+    finally:
+        conn.close()
+    matrix.save_snapshot(snapshot_path, source=source)
+
+
+def swap_update(db_path: str, archive_dir: Optional[str] = None,
+                update: Callable[..., Dict[str, int]] = update_database,
+                snapshot_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Run ``update`` on a staging copy of ``db_path``, validate it and
+    atomically rename it over ``db_path``. Returns the update's counts;
+    raises ``ValueError`` (leaving ``db_path`` untouched) if validation fails.
+
+    With ``snapshot_path``, the engine snapshot is re-exported from the
+    staging copy before the swap, so workers map it as soon as they see the
+    new file (the rename keeps the fingerprint the snapshot records).
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=STAGING_PREFIX, suffix=".db")
+    os.close(fd)
+    try:
+        target = sqlite3.connect(tmp)
+        previous_weeks: Set[str] = set()
+        if os.path.exists(db_path):
+            # The backup API copies a consistent state even while the file is being read
+            source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+            previous_weeks = set(list_weeks(source))
+            source.backup(target)
+            source.close()
+        try:
+            summary = update(target, archive=PageArchive(archive_dir) if archive_dir else None)
+            problems = validate_database(target, previous_weeks)
+        finally:
+            target.close()
+        if problems:
+            raise ValueError(f"Staging database failed validation: {'; '.join(problems)}")
+        if snapshot_path is not None:
+            try:
+                export_snapshot(tmp, snapshot_path)
+            except Exception as e:
+                # Workers then build their own arrays from the database
+                logger.warning("Engine snapshot not exported: %s", e)
+        if os.path.exists(db_path):
+            shutil.copymode(db_path, tmp)
+        os.replace(tmp, db_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return summary
+
+
+class UpdateStatus:
+    """Thread-safe state of the background update, for the readiness endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {"state": "idle"}
+
+    def set(self, state: str, **details: Any) -> None:
+        with self._lock:
+            self._state = {"state": state, "at": datetime.now(timezone.utc).isoformat(timespec="seconds"), **details}
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._state)
+
+
+status = UpdateStatus()
+
+# Startup and scheduled updates never run at the same time: within a process
+# through this lock, across worker processes through a lock file (fcntl.flock)
+_update_lock = threading.Lock()
+
+
+def lock_path(db_path: str) -> str:
+    """The lock file next to ``db_path`` held while a process updates it."""
+    return os.path.abspath(db_path) + ".update.lock"
+
+
+@contextmanager
+def update_lock(db_path: str) -> Iterator[bool]:
+    """Try to become the only updater of ``db_path``; yields whether it succeeded (never waits)."""
+    if not _update_lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        if fcntl is None:
+            yield True
+            return
+        with open(lock_path(db_path), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        _update_lock.release()
+
+
+def remove_stale_staging(db_path: str) -> List[str]:
+    """
+    Delete staging copies left next to ``db_path`` by an update that was
+    killed before it could clean up. Returns the paths removed (none while
+    another thread or worker process is updating, as its copy is in use).
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    removed: List[str] = []
+    if not os.path.isdir(directory):
+        return removed
+    with update_lock(db_path) as acquired:
+        if not acquired:
+            return removed
+        # Also catches the copy's -journal/-wal files
+        for path in sorted(glob.glob(os.path.join(directory, glob.escape(STAGING_PREFIX) + "*"))):
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning("Stale staging file %s not removed: %s", path, e)
+                continue
+            removed.append(path)
+    for path in removed:
+        logger.info("Removed stale staging file %s", path)
+    return removed
+
+
+def schema_current(db_path: str) -> bool:
+    """Whether ``db_path`` has the fact table and aggregates (databases from before them do not)."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        return fact_table_exists(conn) and stats_tables_exist(conn)
+    finally:
+        conn.close()
+
+
+def _build_fact_tables(conn: sqlite3.Connection, archive: Optional[PageArchive] = None) -> Dict[str, int]:
+    added, removed = sync_fact_table(conn)
+    return {"added": added, "removed": removed}
+
+
+def migrate_schema(db_path: str, snapshot_path: Optional[str] = None, poll: float = 0.5) -> bool:
+    """
+    Build the fact table and aggregates of a database that predates them
+    (e.g. a deploy upgraded in place), on a staging copy swapped in like an
+    update, so the app can serve it before any scrape. Returns whether it
+    migrated: False if there is no database or its schema is current.
+
+    While another worker holds the update lock, waits until it has swapped
+    in a migrated copy (workers migrate before starting their updates).
+    """
+    while os.path.exists(db_path) and not schema_current(db_path):
+        with update_lock(db_path) as acquired:
+            # Checked again under the lock: another worker may have just swapped in its copy
+            if acquired and not schema_current(db_path):
+                summary = swap_update(db_path, update=_build_fact_tables, snapshot_path=snapshot_path)
+                logger.info("Built the fact table and aggregates: %s weeks loaded", summary["added"])
+                return True
+        if not acquired:
+            time.sleep(poll)
+    return False
+
+
+def run_background_update(db_path: str, archive_dir: Optional[str] = None,
+                          on_swapped: Optional[Callable[[], None]] = None,
+                          update: Callable[..., Dict[str, int]] = update_database,
+                          snapshot_path: Optional[str] = None) -> bool:
+    """
+    Run ``swap_update`` and record its outcome in ``status``; errors are
+    logged, not raised. Returns whether a new database was swapped in
+    (False as well if another thread or worker process is already updating
+    ``db_path``, so N workers on one schedule scrape and swap only once).
+    """
+    with update_lock(db_path) as acquired:
+        if not acquired:
+            logger.info("Database update already running, skipping")
+            return False
+        return _run_update(db_path, archive_dir, on_swapped, update, snapshot_path)
+
+
+def _run_update(db_path: str, archive_dir: Optional[str], on_swapped: Optional[Callable[[], None]],
+                update: Callable[..., Dict[str, int]], snapshot_path: Optional[str]) -> bool:
+    status.set("running")
+    start = time.monotonic()
+    try:
+        summary = swap_update(db_path, archive_dir, update, snapshot_path)
+        if on_swapped is not None:
+            on_swapped()
+    except UpdateCancelled:
+        logger.info("Background database update cancelled")
+        status.set("cancelled")
+        return False
+    except Exception as e:
+        logger.exception("Background database update failed")
+        status.set("failed", error=str(e))
+        return False
+    status.set("done", seconds=round(time.monotonic() - start, 1), **summary)
+    return True
+
+
+class Schedule:
+    """
+    Weekly update times in UTC, parsed from entries such as ``"mon 06:00"``
+    (comma-separated; ``daily`` for every day), e.g. ``"mon 06:00, mon 18:00"``.
+    """
+
+    def __init__(self, spec: str):
+        self.times: List[Tuple[Optional[int], int, int]] = []
+        for entry in filter(None, (part.strip().lower() for part in spec.split(","))):
+            try:
+                day, clock = entry.split()
+                hour, minute = (int(part) for part in clock.split(":"))
+                weekday = None if day == "daily" else WEEKDAYS.index(day[:3])
+                datetime(2000, 1, 1, hour, minute)
+            except ValueError:
+                raise ValueError(f"Invalid update schedule entry {entry!r}; expected e.g. 'mon 06:00' or 'daily 06:00'")
+            self.times.append((weekday, hour, minute))
+        if not self.times:
+            raise ValueError("Update schedule is empty")
+
+    def next_run(self, now: datetime) -> datetime:
+        """The first scheduled time strictly after ``now`` (an aware datetime)."""
+        now = now.astimezone(timezone.utc)
+        candidates = []
+        for weekday, hour, minute in self.times:
+            for days in range(8):
+                moment = (now + timedelta(days=days)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if moment > now and (weekday is None or moment.weekday() == weekday):
+                    candidates.append(moment)
+                    break
+        return min(candidates)
@@ -0,0 +1,44 @@
+"""
+Shared fixtures: a small rankings database the service layer points at.
+
+Modules choose its contents by overriding the ``weeks`` fixture.
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import services
+from src.storage import rebuild_fact_table
+
+
+def write_weeks(path, weeks):
+    """Create a week table for each ``week: rows`` pair in ``weeks`` and sync the fact table."""
+    conn = sqlite3.connect(path)
+    for week, rows in weeks.items():
+        conn.execute(f'CREATE TABLE "{week}"(rank, name, points)')
+        conn.executemany(f'INSERT INTO "{week}" VALUES (?, ?, ?)', rows)
+    rebuild_fact_table(conn)
+    conn.close()
+
+
+@pytest.fixture
+def weeks():
+    return {"2023-01-02": [("1", "Carlos Alcaraz", "6,820")]}
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch, weeks):
+    path = tmp_path / "rankings.db"
+    write_weeks(path, weeks)
+    monkeypatch.setattr(services, "DB_PATH", str(path))
+    monkeypatch.setattr(services, "ENGINE", "sqlite")
+    monkeypatch.setattr(services, "SNAPSHOT_PATH", str(tmp_path / "rankings.snapshot"))
+    services.reset_caches()
+    yield path
+    # Nothing built from this database outlives the test
+    services.reset_caches()
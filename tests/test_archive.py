@@ -0,0 +1,61 @@
+"""
+Tests for the content-addressed page archive.
+Run with: pytest tests/test_archive.py -v
+"""
+import gzip
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.archive import INDEX_FILE, PageArchive
+
+
+class TestPageArchive:
+    """Test storing, reading and persisting archived pages."""
+
+    def test_round_trip_persists_after_save(self, tmp_path):
+        archive = PageArchive(str(tmp_path))
+        archive.put("https://x/a", b"<html>a</html>", etag='"1"', last_modified="Mon, 02 Jan 2023 00:00:00 GMT")
+        archive.save()
+
+        reopened = PageArchive(str(tmp_path))
+        assert reopened.urls() == ["https://x/a"]
+        assert reopened.get("https://x/a") == b"<html>a</html>"
+        assert reopened.conditional_headers("https://x/a") == {
+            "If-None-Match": '"1"',
+            "If-Modified-Since": "Mon, 02 Jan 2023 00:00:00 GMT",
+        }
+
+    def test_unsaved_index_is_not_persisted(self, tmp_path):
+        PageArchive(str(tmp_path)).put("https://x/a", b"a")
+        assert not (tmp_path / INDEX_FILE).exists()
+        assert len(PageArchive(str(tmp_path))) == 0
+
+    def test_identical_pages_stored_once_compressed(self, tmp_path):
+        archive = PageArchive(str(tmp_path))
+        body = b"<td>" * 1000
+        digest = archive.put("https://x/a", body)
+        assert archive.put("https://x/b", body) == digest
+        objects = [os.path.join(d, f) for d, _, files in os.walk(tmp_path / "objects") for f in files]
+        assert len(objects) == 1
+        with open(objects[0], "rb") as f:
+            compressed = f.read()
+        assert len(compressed) < len(body)
+        assert gzip.decompress(compressed) == body
+
+    def test_missing_and_corrupt_pages(self, tmp_path):
+        archive = PageArchive(str(tmp_path))
+        assert archive.conditional_headers("https://x/a") == {}
+        with pytest.raises(KeyError):
+            archive.get("https://x/a")
+
+        digest = archive.put("https://x/a", b"a")
+        with open(archive._object_path(digest), "wb") as f:
+            f.write(gzip.compress(b"b"))
+        with pytest.raises(ValueError):
+            archive.get("https://x/a")
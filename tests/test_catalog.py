@@ -0,0 +1,62 @@
+"""
+Tests for the cached week catalog.
+Run with: pytest tests/test_catalog.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import services
+from src.catalog import WeekCatalog
+
+WEEKS = ["2019-12-30", "2020-01-06", "2020-03-16", "2020-08-24", "2021-01-04"]
+
+
+@pytest.fixture
+def catalog():
+    return WeekCatalog(reversed(WEEKS))
+
+
+class TestWeekCatalog:
+    """Test lookups on the catalog."""
+
+    def test_order_and_membership(self, catalog):
+        assert catalog.weeks == WEEKS[::-1]
+        assert len(catalog) == 5
+        assert "2020-03-16" in catalog
+        assert "2020-03-23" not in catalog
+        assert catalog.latest == "2021-01-04"
+
+    def test_by_year(self, catalog):
+        assert list(catalog.by_year) == ["2021", "2020", "2019"]
+        assert catalog.by_year["2020"] == ["2020-08-24", "2020-03-16", "2020-01-06"]
+
+    def test_neighbours(self, catalog):
+        assert catalog.previous("2020-08-24") == "2020-03-16"
+        assert catalog.next("2020-03-16") == "2020-08-24"
+        assert catalog.previous("2019-12-30") is None
+        assert catalog.next("2021-01-04") is None
+        # Weeks missing from the catalog (e.g. the 2020 ranking freeze) still have neighbours
+        assert catalog.previous("2020-05-04") == "2020-03-16"
+        assert catalog.next("2020-05-04") == "2020-08-24"
+
+
+class TestCatalogCaching:
+    """Test that the service layer rebuilds the catalog only when the database changes."""
+
+    def test_rebuilt_when_database_changes(self, db_path):
+        first = services.get_week_catalog()
+        assert services.get_week_catalog() is first
+        assert services.get_all_weeks() == ["2023-01-02"]
+
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE "2023-01-09"(rank, name, points)')
+        conn.commit()
+        conn.close()
+        assert services.get_week_catalog() is not first
+        assert services.get_all_weeks() == ["2023-01-09", "2023-01-02"]
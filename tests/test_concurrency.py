@@ -0,0 +1,63 @@
+"""
+Tests that slow service calls do not block the event loop.
+Run with: pytest tests/test_concurrency.py -v
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, mcp_router
+
+DELAY = 0.3
+REQUESTS = 4
+
+
+def slow_factfile(player, start=None, end=None):
+    # Blocking call standing in for a slow SQLite query
+    time.sleep(DELAY)
+    return {"player": player}
+
+
+async def fire(paths):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post(path, json={"player": f"Player {i}"}) if path.startswith("/mcp")
+            else client.get(path, params={"player": f"Player {i}"})
+            for i, path in enumerate(paths)
+        ))
+        return responses, time.perf_counter() - start
+
+
+class TestConcurrentRequests:
+    """Concurrent requests must overlap instead of running one after another."""
+
+    def test_api_requests_overlap(self, monkeypatch):
+        monkeypatch.setattr(main, "service_get_player_factfile", slow_factfile)
+        responses, elapsed = asyncio.run(fire(["/api/player/factfile"] * REQUESTS))
+        assert all(r.status_code == 200 for r in responses)
+        # Serialized execution would take REQUESTS * DELAY
+        assert elapsed < DELAY * REQUESTS / 2
+
+    def test_mcp_requests_overlap(self, monkeypatch):
+        monkeypatch.setattr(mcp_router, "get_player_factfile", slow_factfile)
+        responses, elapsed = asyncio.run(fire(["/mcp/tools/get_player_factfile"] * REQUESTS))
+        assert all(r.json()["ok"] for r in responses)
+        assert elapsed < DELAY * REQUESTS / 2
+
+    def test_mcp_batch_calls_overlap(self, monkeypatch):
+        monkeypatch.setattr(mcp_router, "get_player_factfile", slow_factfile)
+        calls = [{"id": i, "method": "get_player_factfile", "params": {"player": f"Player {i}"}} for i in range(REQUESTS)]
+        start = time.perf_counter()
+        response = TestClient(main.app).post("/mcp/batch", json=calls)
+        elapsed = time.perf_counter() - start
+        assert [r["result"]["player"] for r in response.json()["result"]] == [f"Player {i}" for i in range(REQUESTS)]
+        assert elapsed < DELAY * REQUESTS / 2
@@ -0,0 +1,63 @@
+"""
+Tests for the pooled read-only connections.
+Run with: pytest tests/test_db.py -v
+"""
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.db import ConnectionPool
+
+
+def make_db(path, week):
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE "{week}"(rank, name, points)')
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "rankings.db"
+    make_db(path, "2023-01-02")
+    return str(path)
+
+
+class TestConnectionPool:
+    """Test connection reuse, read-only mode and reopening."""
+
+    def test_reuses_connection_per_thread(self, db_path):
+        pool = ConnectionPool()
+        assert pool.get(db_path) is pool.get(db_path)
+        assert pool.stats() == {"hits": 1, "misses": 1, "reopens": 0}
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(pool.get(db_path)))
+        thread.start()
+        thread.join()
+        assert other[0] is not pool.get(db_path)
+
+    def test_read_only(self, db_path):
+        conn = ConnectionPool().get(db_path)
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE x(a)")
+
+    def test_reopens_when_file_replaced(self, db_path, tmp_path):
+        pool = ConnectionPool()
+        first = pool.get(db_path)
+        replacement = tmp_path / "staging.db"
+        make_db(replacement, "2023-01-09")
+        os.replace(replacement, db_path)
+
+        conn = pool.get(db_path)
+        assert conn is not first
+        assert conn.execute("SELECT name FROM sqlite_master").fetchone()[0] == "2023-01-09"
+        assert pool.stats()["reopens"] == 1
@@ -0,0 +1,90 @@
+"""
+Tests for the compact career encoding.
+Run with: pytest tests/test_encoding.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main
+from src.encoding import compact_career, decode_dates, encode_dates, expand_career
+from src.responses import response_cache
+
+client = TestClient(main.app)
+
+CAREER = {
+    "player": "Test Player",
+    "ranking_dates": ["2020-03-16", "2020-03-09", "2020-03-02", "2019-12-30", "2019-12-23"],
+    "rankings": [3, 2, 1, 1, 5],
+    "points_dates": ["2020-03-16", "2020-03-09"],
+    "points": [9000, 9100],
+}
+
+
+@pytest.fixture
+def stub_career(monkeypatch):
+    monkeypatch.setattr(main, "service_get_player_career", lambda player, start=None, end=None: dict(CAREER, player=player))
+    response_cache.clear()
+
+
+class TestDateEncoding:
+    """Test the run-length encoding of week dates."""
+
+    def test_weekly_dates_collapse_to_one_run(self):
+        encoded = encode_dates(["2020-03-16", "2020-03-09", "2020-03-02"])
+        assert encoded == {"start": "2020-03-16", "runs": [[-7, 2]]}
+
+    def test_gaps_start_new_runs(self):
+        encoded = encode_dates(CAREER["ranking_dates"])
+        assert encoded["runs"] == [[-7, 2], [-63, 1], [-7, 1]]
+        assert decode_dates(encoded) == CAREER["ranking_dates"]
+
+    def test_empty_and_single_dates(self):
+        assert decode_dates(encode_dates([])) == []
+        assert decode_dates(encode_dates(["2020-01-06"])) == ["2020-01-06"]
+
+    def test_career_round_trip(self):
+        assert expand_career(compact_career(CAREER)) == CAREER
+
+
+class TestCareerFormats:
+    """Test the format parameter on /api/player/career."""
+
+    def test_compact_format(self, stub_career):
+        response = client.get("/api/player/career", params={"player": "Test Player", "format": "compact"})
+        assert response.status_code == 200
+        assert expand_career(response.json()) == CAREER
+
+    def test_full_and_compact_cached_separately(self, stub_career):
+        full = client.get("/api/player/career", params={"player": "Test Player"})
+        compact = client.get("/api/player/career", params={"player": "Test Player", "format": "compact"})
+        assert full.json() == CAREER
+        assert compact.json()["format"] == "compact"
+
+    def test_unknown_format(self, stub_career):
+        response = client.get("/api/player/career", params={"player": "Test Player", "format": "xml"})
+        assert response.status_code == 400
+
+    def test_msgpack_format(self, stub_career):
+        pytest.importorskip("msgpack")
+        from src.encoding import unpack_career
+
+        response = client.get("/api/player/career", params={"player": "Test Player", "format": "msgpack"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        assert unpack_career(response.content) == CAREER
+
+    def test_mcp_compact_format(self, monkeypatch):
+        from src import mcp_router
+
+        monkeypatch.setattr(mcp_router, "get_player_career", lambda player, start=None, end=None: dict(CAREER, player=player))
+        response = client.post(
+            "/mcp/tools/get_player_career", json={"player": "Test Player", "format": "compact"}
+        )
+        assert response.status_code == 200
+        assert expand_career(response.json()["result"]) == CAREER
@@ -0,0 +1,175 @@
+"""
+Tests for the in-memory NumPy engine.
+Run with: pytest tests/test_engine.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("numpy")
+
+from src import services, updater
+from src.db import file_fingerprint
+from src.engine import RankingsMatrix
+from src.storage import rebuild_fact_table, replace_weeks
+
+WEEKS = {
+    "2008-08-11": [("1", "Roger Federer", "6,600"), ("2", "Rafael Nadal", "6,555"), ("3", "Novak Djokovic", "5,155")],
+    "2008-08-18": [("1", "Rafael Nadal", "6,700"), ("2", "Roger Federer", "5,690"), ("3", "Novak Djokovic", "5,205")],
+    "2008-08-25": [("1", "Rafael Nadal", "6,700"), ("T2", "Roger Federer", "5,690"), ("T2", "Novak Djokovic", "5,690")],
+    "1975-06-09": [("1", "Jimmy Connors", "-"), ("2", "Guillermo Vilas", "-"), ("N/A", "Roger Federer", "N/A")],
+}
+# (from, to) windows, including ones between weeks and outside the data
+WINDOWS = [
+    (None, "2008-08-11"),
+    ("2008-08-18", None),
+    ("2008-08-12", "2008-08-24"),
+    ("1975-01-01", "1975-12-31"),
+    ("2020-01-01", None),
+]
+PLAYERS = ["Roger Federer", "Rafael Nadal", "Novak Djokovic", "Jimmy Connors", "Guillermo Vilas"]
+
+
+@pytest.fixture
+def weeks():
+    return WEEKS
+
+
+@pytest.fixture
+def matrix(db_path):
+    conn = sqlite3.connect(db_path)
+    yield RankingsMatrix.from_connection(conn)
+    conn.close()
+
+
+class TestEngineMatchesSQLite:
+    """The engine must return exactly what the SQLite path returns."""
+
+    @pytest.mark.parametrize("player", PLAYERS)
+    def test_factfile(self, matrix, player):
+        assert matrix.player_factfile(player) == services.get_player_factfile(player)
+
+    @pytest.mark.parametrize("player", PLAYERS)
+    def test_career(self, matrix, player):
+        assert matrix.player_career(player) == services.get_player_career(player)
+
+    def test_weeks_at_no1(self, matrix):
+        assert matrix.weeks_at_no1() == services.get_weeks_at_no1()
+
+    @pytest.mark.parametrize("player", PLAYERS)
+    @pytest.mark.parametrize("start, end", WINDOWS)
+    def test_windowed_factfile(self, matrix, player, start, end):
+        try:
+            expected = services.get_player_factfile(player, start, end)
+        except ValueError:
+            with pytest.raises(ValueError):
+                matrix.player_factfile(player, start, end)
+        else:
+            assert matrix.player_factfile(player, start, end) == expected
+
+    @pytest.mark.parametrize("player", PLAYERS)
+    @pytest.mark.parametrize("start, end", WINDOWS)
+    def test_windowed_career(self, matrix, player, start, end):
+        try:
+            expected = services.get_player_career(player, start, end)
+        except ValueError:
+            with pytest.raises(ValueError):
+                matrix.player_career(player, start, end)
+        else:
+            assert matrix.player_career(player, start, end) == expected
+
+    @pytest.mark.parametrize("start, end", WINDOWS)
+    def test_windowed_weeks_at_no1(self, matrix, start, end):
+        assert matrix.weeks_at_no1(start, end) == services.get_weeks_at_no1(start, end)
+
+    def test_unknown_player(self, matrix):
+        with pytest.raises(ValueError):
+            matrix.player_factfile("Nonexistent Player")
+        with pytest.raises(ValueError):
+            matrix.player_career("Nonexistent Player")
+
+
+class TestEngineSelection:
+    """Test selecting the engine through configuration."""
+
+    def test_numpy_engine_used_when_configured(self, db_path, monkeypatch):
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        assert services.get_engine() is not None
+        assert services.get_weeks_at_no1()[0] == {"player": "Rafael Nadal", "weeks": 2}
+
+    def test_falls_back_to_sqlite_when_load_fails(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(services, "DB_PATH", str(tmp_path / "missing.db"))
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        assert services.get_engine() is None
+
+
+class TestSnapshot:
+    """Test the memory-mapped engine snapshot."""
+
+    def test_round_trip(self, matrix, tmp_path):
+        path = str(tmp_path / "engine.snapshot")
+        matrix.save_snapshot(path)
+        mapped = RankingsMatrix.from_snapshot(path)
+        # Views into a read-only mapping, not copies
+        assert not mapped.rank.flags.writeable
+        assert mapped.weeks_at_no1() == matrix.weeks_at_no1()
+        assert mapped.leaderboard(2, "2008-08-12", None) == matrix.leaderboard(2, "2008-08-12", None)
+        for player in PLAYERS:
+            assert mapped.player_factfile(player) == matrix.player_factfile(player)
+            assert mapped.player_career(player) == matrix.player_career(player)
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "rankings.db"
+        path.write_bytes(b"SQLite format 3\0" + bytes(64))
+        with pytest.raises(ValueError):
+            RankingsMatrix.from_snapshot(str(path))
+
+    def test_service_maps_current_snapshot(self, db_path, matrix, monkeypatch):
+        matrix.save_snapshot(services.SNAPSHOT_PATH, source=file_fingerprint(str(db_path)))
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        assert not services.get_engine().rank.flags.writeable
+
+    def test_service_ignores_stale_snapshot(self, db_path, matrix, monkeypatch):
+        matrix.save_snapshot(services.SNAPSHOT_PATH, source=file_fingerprint(str(db_path)))
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE "2008-09-01"(rank, name, points)')
+        conn.execute('INSERT INTO "2008-09-01" VALUES ("1", "Rafael Nadal", "6,700")')
+        rebuild_fact_table(conn)
+        conn.close()
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        engine = services.get_engine()
+        assert engine.rank.flags.writeable
+        assert engine.weeks[0] == "2008-09-01"
+
+    def test_service_ignores_snapshot_of_rewritten_week(self, db_path, matrix, monkeypatch):
+        matrix.save_snapshot(services.SNAPSHOT_PATH, source=file_fingerprint(str(db_path)))
+        conn = sqlite3.connect(db_path)
+        # Same weeks, different content
+        replace_weeks(conn, [("2008-08-25", [("1", "Novak Djokovic", "6,800"), ("2", "Rafael Nadal", "6,700")])])
+        conn.close()
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        assert {"player": "Novak Djokovic", "weeks": 1} in services.get_weeks_at_no1()
+        assert services.get_engine().rank.flags.writeable
+
+    def test_swap_update_exports_snapshot(self, db_path, monkeypatch):
+        def add_week(conn, archive):
+            replace_weeks(conn, [("2008-09-01", [("1", "Novak Djokovic", "6,800")])])
+            rebuild_fact_table(conn)
+            return {}
+
+        updater.swap_update(str(db_path), update=add_week, snapshot_path=services.SNAPSHOT_PATH)
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        services.reset_caches()
+        engine = services.get_engine()
+        assert not engine.rank.flags.writeable
+        assert engine.weeks[0] == "2008-09-01"
@@ -0,0 +1,125 @@
+"""
+Tests for ETag/Last-Modified conditional caching.
+Run with: pytest tests/test_http_cache.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import services
+from src.main import app
+from src.storage import mark_weeks, rebuild_fact_table, replace_weeks
+
+client = TestClient(app)
+
+
+def add_week(path, week):
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE "{week}"(rank, name, points)')
+    conn.execute(f'INSERT INTO "{week}" VALUES (?, ?, ?)', ("1", "Carlos Alcaraz", "6,820"))
+    rebuild_fact_table(conn)
+    conn.close()
+
+
+def journal(path, week, status):
+    conn = sqlite3.connect(path)
+    mark_weeks(conn, [week], status)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def weeks():
+    return {week: [("1", "Carlos Alcaraz", "6,820")] for week in ["2023-01-02", "2023-01-09"]}
+
+
+class TestConditionalCaching:
+    """Test validators, 304 responses and Cache-Control."""
+
+    def test_past_week_is_immutable(self, db_path):
+        journal(db_path, "2023-01-02", "written")
+        response = client.get("/api/week/2023-01-02")
+        assert response.status_code == 200
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["etag"].startswith('W/"')
+        assert "last-modified" in response.headers
+
+    @pytest.mark.parametrize("status", ["filler", None])
+    def test_filler_and_unjournaled_weeks_must_revalidate(self, db_path, status):
+        if status is not None:
+            journal(db_path, "2023-01-02", status)
+        response = client.get("/api/week/2023-01-02")
+        assert response.headers["cache-control"] == "public, no-cache"
+
+    def test_rewritten_past_week_gets_new_etag(self, db_path):
+        journal(db_path, "2023-01-02", "filler")
+        before = client.get("/api/week/2023-01-02")
+        # The filler copy is replaced by the week scraped from atptour.com
+        conn = sqlite3.connect(db_path)
+        replace_weeks(conn, [("2023-01-02", [("1", "Novak Djokovic", "7,070")])])
+        conn.close()
+        services.bump_dataset_version()
+        response = client.get("/api/week/2023-01-02", headers={"If-None-Match": before.headers["etag"]})
+        assert response.status_code == 200
+        assert response.headers["etag"] != before.headers["etag"]
+        assert response.json()["rankings"][0]["name"] == "Novak Djokovic"
+        assert "immutable" in response.headers["cache-control"]
+
+    def test_latest_week_must_revalidate(self, db_path):
+        response = client.get("/api/week/2023-01-09")
+        assert response.headers["cache-control"] == "public, no-cache"
+
+    def test_if_none_match_returns_304(self, db_path):
+        etag = client.get("/api/weeks-at-no1").headers["etag"]
+        response = client.get("/api/weeks-at-no1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self, db_path):
+        last_modified = client.get("/api/weeks").headers["last-modified"]
+        response = client.get("/api/weeks", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+    def test_etag_changes_with_dataset(self, db_path):
+        past = client.get("/api/week/2023-01-02").headers["etag"]
+        weeks = client.get("/api/weeks").headers["etag"]
+        add_week(db_path, "2023-01-16")
+        assert client.get("/api/weeks", headers={"If-None-Match": weeks}).status_code == 200
+        # Past weeks keep their validator
+        assert client.get("/api/week/2023-01-02", headers={"If-None-Match": past}).status_code == 304
+
+    def test_head_returns_same_validators(self, db_path):
+        get = client.get("/mcp/tools/get_all_weeks")
+        head = client.head("/mcp/tools/get_all_weeks")
+        assert head.status_code == 200
+        assert head.headers["etag"] == get.headers["etag"]
+        assert client.head("/api/week/2023-01-02").headers["etag"] == client.get("/api/week/2023-01-02").headers["etag"]
+        assert client.head("/mcp/tools/get_all_weeks", headers={"If-None-Match": get.headers["etag"]}).status_code == 304
+
+    def test_errors_are_not_cached(self, db_path):
+        response = client.get("/api/player/factfile", params={"player": "Nonexistent Player"})
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+
+    def test_encodings_share_weak_etag(self, db_path):
+        conn = sqlite3.connect(db_path)
+        for day in range(1, 200):
+            week = f"2000-{day // 28 + 1:02d}-{day % 28 + 1:02d}"
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{week}"(rank, name, points)')
+        conn.close()
+        gzipped = client.get("/api/weeks", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/api/weeks", headers={"Accept-Encoding": "identity"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in identity.headers
+        # Equivalent, not byte-identical: one weak validator for both
+        assert gzipped.headers["etag"] == identity.headers["etag"]
+        assert gzipped.headers["etag"].startswith('W/"')
+        response = client.get("/api/weeks", headers={"If-None-Match": gzipped.headers["etag"].removeprefix("W/")})
+        assert response.status_code == 304
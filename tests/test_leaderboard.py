@@ -0,0 +1,91 @@
+"""
+Tests for leaderboards over rank thresholds and date windows.
+Run with: pytest tests/test_leaderboard.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, services
+from src.leaderboard import check_leaderboard, rank_players
+
+client = TestClient(main.app)
+
+WEEKS = {
+    "1995-01-02": [("1", "Andre Agassi", "4,000"), ("2", "Pete Sampras", "3,900"), ("6", "Thomas Muster", "2,100")],
+    "1995-01-09": [("1", "Pete Sampras", "4,100"), ("T2", "Andre Agassi", "3,800"), ("T2", "Thomas Muster", "3,800")],
+    "1996-02-12": [("1", "Thomas Muster", "4,200"), ("3", "Pete Sampras", "4,000"), ("N/A", "Andre Agassi", "N/A")],
+    "2001-01-01": [("1", "Pete Sampras", "-"), ("4", "Andre Agassi", "2,000")],
+}
+
+
+@pytest.fixture
+def weeks():
+    return WEEKS
+
+
+class TestRankPlayers:
+    """Test ordering of per-player aggregates."""
+
+    AGGREGATES = [
+        ("A", 3, 9, 100, "2000-01-03"),
+        ("B", 3, 3, 300, "2001-01-01"),
+        ("C", 1, 1, 500, "1999-01-04"),
+    ]
+
+    def test_metrics(self):
+        assert [e["player"] for e in rank_players(self.AGGREGATES, "weeks", 10)] == ["B", "A", "C"]
+        assert [e["player"] for e in rank_players(self.AGGREGATES, "points", 10)] == ["C", "B", "A"]
+        assert [e["player"] for e in rank_players(self.AGGREGATES, "avg_rank", 2)] == ["B", "C"]
+
+    def test_entry(self):
+        assert rank_players(self.AGGREGATES, "weeks", 1) == [
+            {"player": "B", "weeks": 3, "points": 300, "avg_rank": 1.0}
+        ]
+
+    @pytest.mark.parametrize("max_rank, metric, limit", [(0, "weeks", 10), (5, "titles", 10), (5, "weeks", 0)])
+    def test_invalid_parameters(self, max_rank, metric, limit):
+        with pytest.raises(ValueError):
+            check_leaderboard(max_rank, metric, limit)
+
+
+class TestLeaderboard:
+    """Test the leaderboard service on both engines."""
+
+    def test_weeks_in_top_5_in_the_1990s(self, db_path):
+        leaderboard = services.get_leaderboard(5, "1990-01-01", "1999-12-31")
+        assert [(e["player"], e["weeks"]) for e in leaderboard] == [
+            ("Pete Sampras", 3), ("Thomas Muster", 2), ("Andre Agassi", 2)
+        ]
+
+    def test_ties_count_inside_threshold(self, db_path):
+        leaderboard = services.get_leaderboard(1)
+        assert leaderboard[0] == {"player": "Pete Sampras", "weeks": 2, "points": 4100, "avg_rank": 1.0}
+
+    @pytest.mark.parametrize("metric", ["weeks", "points", "avg_rank"])
+    @pytest.mark.parametrize("max_rank, start, end", [(1, None, None), (3, "1995-01-05", None), (100, None, "1995-12-31")])
+    def test_engine_matches_sqlite(self, db_path, monkeypatch, metric, max_rank, start, end):
+        pytest.importorskip("numpy")
+        expected = services.get_leaderboard(max_rank, start, end, metric)
+        monkeypatch.setattr(services, "ENGINE", "numpy")
+        # Results are cached per database version, not per engine
+        services.reset_caches()
+        assert services.get_leaderboard(max_rank, start, end, metric) == expected
+
+    def test_result_is_cached(self, db_path):
+        leaderboard = services.get_leaderboard(5, "1990-01-01", "1999-12-31")
+        assert services.get_leaderboard(5, "1990-01-01", end="1999-12-31") is leaderboard
+
+    def test_endpoint(self, db_path):
+        response = client.get("/api/leaderboard", params={"max_rank": 1, "from": "1996-01-01", "metric": "points"})
+        assert [e["player"] for e in response.json()] == ["Thomas Muster", "Pete Sampras"]
+        assert client.get("/api/leaderboard", params={"metric": "titles"}).status_code == 400
+
+    def test_mcp_tool(self, db_path):
+        response = client.post("/mcp/tools/get_leaderboard", json={"max_rank": 1, "to": "1995-01-02"})
+        assert response.json()["result"][0]["player"] == "Andre Agassi"
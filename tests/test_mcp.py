@@ -205,5 +205,52 @@ class TestMCPWeekRankings:
         assert data["ok"] is False
 
 
+
+class TestMCPBatch:
+    """Test running several tool calls in one batch request."""
+    
+    def test_batch_results_in_order(self):
+        """Test that results come back in request order with their ids."""
+        response = client.post(
+            "/mcp/batch",
+            json=[
+                {"id": 1, "method": "search_players", "params": {"query": "nadal", "limit": 1}},
+                {"id": 2, "method": "get_player_factfile", "params": {"player": "Rafael Nadal"}},
+                {"id": 3, "method": "get_all_weeks"}
+            ]
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ok"] is True
+        results = data["result"]
+        assert [r["id"] for r in results] == [1, 2, 3]
+        assert all(r["ok"] for r in results)
+        assert results[1]["result"]["player"] == "Rafael Nadal"
+        assert results[2]["result"]["total"] > 2000
+    
+    def test_batch_per_call_errors(self):
+        """Test that a failing call does not fail the others."""
+        response = client.post(
+            "/mcp/batch",
+            json=[
+                {"id": "a", "method": "get_player_factfile", "params": {"player": "Nonexistent Player XYZ"}},
+                {"id": "b", "method": "get_week_rankings", "params": {}},
+                {"id": "c", "method": "no_such_tool"},
+                {"id": "d", "method": "get_weeks_at_no1", "params": {"top_n": 1}}
+            ]
+        )
+        assert response.status_code == 200
+        results = response.json()["result"]
+        assert [(r["ok"], r["status"]) for r in results] == [(False, 404), (False, 422), (False, 404), (True, 200)]
+        assert len(results[3]["result"]) == 1
+    
+    def test_batch_too_large(self):
+        """Test that oversized batches are rejected."""
+        calls = [{"method": "get_all_weeks"}] * 51
+        response = client.post("/mcp/batch", json=calls)
+        assert response.status_code == 400
+        assert response.json()["ok"] is False
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+"""
+Tests for fetching several players' factfiles and careers at once.
+Run with: pytest tests/test_players_batch.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, services
+
+client = TestClient(main.app)
+
+WEEKS = {
+    "2008-08-11": [("1", "Roger Federer", "6,600"), ("2", "Rafael Nadal", "6,555"), ("3", "Novak Djokovic", "5,155")],
+    "2008-08-18": [("1", "Rafael Nadal", "6,700"), ("2", "Roger Federer", "5,690"), ("3", "Novak Djokovic", "5,205")],
+    "1975-06-09": [("1", "Jimmy Connors", "-"), ("2", "Guillermo Vilas", "-"), ("N/A", "Roger Federer", "N/A")],
+}
+PLAYERS = ["Roger Federer", "Rafael Nadal", "Novak Djokovic", "Jimmy Connors", "Guillermo Vilas"]
+
+
+@pytest.fixture
+def weeks():
+    return WEEKS
+
+
+class TestPlayersBatch:
+    """The batch must match the per-player service calls."""
+
+    @pytest.mark.parametrize("engine", ["sqlite", "numpy"])
+    def test_matches_single_player_calls(self, db_path, monkeypatch, engine):
+        expected = [
+            {"player": p, "factfile": services.get_player_factfile(p), "career": services.get_player_career(p)}
+            for p in PLAYERS
+        ]
+        if engine == "numpy":
+            pytest.importorskip("numpy")
+            monkeypatch.setattr(services, "ENGINE", "numpy")
+        assert services.get_players_batch(PLAYERS) == {"players": expected, "not_found": []}
+
+    def test_order_duplicates_and_unknown_players(self, db_path):
+        batch = services.get_players_batch(["Rafael Nadal", "Nobody", "Roger Federer", "Rafael Nadal"])
+        assert [entry["player"] for entry in batch["players"]] == ["Rafael Nadal", "Roger Federer"]
+        assert batch["not_found"] == ["Nobody"]
+
+    def test_empty_and_oversized_batches(self, db_path):
+        assert services.get_players_batch([]) == {"players": [], "not_found": []}
+        with pytest.raises(ValueError):
+            services.get_players_batch([f"Player {i}" for i in range(services.MAX_BATCH_PLAYERS + 1)])
+
+
+class TestPlayersBatchEndpoints:
+    """Test the REST endpoint and MCP tool."""
+
+    def test_rest_endpoint(self, db_path):
+        response = client.get("/api/players/batch", params={"players": ["Roger Federer", "Nobody"]})
+        assert response.status_code == 200
+        assert response.json()["players"][0]["factfile"]["career_high_rank"] == 1
+        assert response.json()["not_found"] == ["Nobody"]
+
+    def test_mcp_tool(self, db_path):
+        response = client.post("/mcp/tools/get_players_batch", json={"players": ["Rafael Nadal"]})
+        assert response.status_code == 200
+        assert response.json()["result"]["players"][0]["career"]["rankings"] == [1, 2]
+
+    def test_mcp_tool_rejects_oversized_batch(self, db_path):
+        players = [f"Player {i}" for i in range(services.MAX_BATCH_PLAYERS + 1)]
+        response = client.post("/mcp/tools/get_players_batch", json={"players": players})
+        assert response.status_code == 400
+        assert response.json()["ok"] is False
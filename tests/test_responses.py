@@ -0,0 +1,71 @@
+"""
+Tests for JSON serialization, the pre-serialized response cache and compression.
+Run with: pytest tests/test_responses.py -v
+"""
+import sys
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main
+from src.responses import SerializedCache, dumps, response_cache
+
+client = TestClient(main.app)
+
+
+class TestSerialization:
+    """Test the JSON encoder and serialized cache."""
+
+    def test_dumps_matches_default_encoding(self):
+        content = {"player": "Björn Borg", "rankings": [1, 2, 3], "max_points": "-"}
+        assert dumps(content) == JSONResponse(content).body
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = SerializedCache(max_bytes=10)
+        cache.put("a", b"aaaa")
+        cache.put("b", b"bbbb")
+        assert cache.get("a") == b"aaaa"
+        cache.put("c", b"cccc")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.stats()["bytes"] == 8
+
+    def test_cache_skips_oversized_bodies(self):
+        cache = SerializedCache(max_bytes=4)
+        cache.put("a", b"too large")
+        assert cache.get("a") is None
+
+
+class TestCachedResponses:
+    """Test that hot responses are served from pre-serialized bytes."""
+
+    def test_repeated_requests_reuse_bytes(self, monkeypatch):
+        calls = []
+
+        def factfile(player, start=None, end=None):
+            calls.append(player)
+            return {"player": player}
+
+        monkeypatch.setattr(main, "service_get_player_factfile", factfile)
+        response_cache.clear()
+        first = client.get("/api/player/factfile", params={"player": "Cached Player"})
+        second = client.get("/api/player/factfile", params={"player": "Cached Player"})
+        assert first.json() == second.json() == {"player": "Cached Player"}
+        assert calls == ["Cached Player"]
+
+    def test_large_responses_are_gzipped(self, monkeypatch):
+        monkeypatch.setattr(main, "service_get_player_career", lambda player, start=None, end=None: {"player": player, "rankings": [1] * 5000})
+        response_cache.clear()
+        response = client.get("/api/player/career", params={"player": "Long Career"}, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["rankings"]) == 5000
+
+    def test_small_responses_are_not_gzipped(self, monkeypatch):
+        monkeypatch.setattr(main, "service_get_player_factfile", lambda player, start=None, end=None: {"player": player})
+        response_cache.clear()
+        response = client.get("/api/player/factfile", params={"player": "Short"}, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
@@ -0,0 +1,215 @@
+"""
+Tests for the concurrent rankings scraper, against a local stub server.
+Run with: pytest tests/test_scraper.py -v
+"""
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.archive import PageArchive
+from src.scraper import PARSERS, TokenBucket, fetch, get_parser, make_session, parse_week, parse_weeks, scrape_weeks
+from src.storage import FACT_TABLE, replace_weeks
+
+
+def ranking_page(rows):
+    """A rankings page with the markup the scraper reads."""
+    cells = "".join(
+        f'<tr><td class="rank bold heavy tiny-cell">{rank}</td><td class="name center"><a>{name}</a></td>'
+        f'<td class="points center bold extrabold small-cell">{points}</td></tr>'
+        for rank, name, points in rows
+    )
+    return (
+        '<html><select id="dateWeek-filter"><option value="Current Week">2023.01.16</option>'
+        '<option value="2023-01-09">2023.01.09</option><option value="2023-01-02">2023.01.02</option></select>'
+        f"<table>{cells}</table></html>"
+    ).encode()
+
+
+PAGES = {
+    "2023-01-16": ranking_page([("1", "Novak Djokovic", "7,070"), ("2", "Carlos Alcaraz", "6,780")]),
+    "2023-01-09": ranking_page([("1", "Carlos Alcaraz", "6,780"), ("T2", "Casper Ruud", "5,820")]),
+    "2023-01-02": ranking_page([("1", "Carlos Alcaraz", "6,820"), ("2", "Rafael Nadal", "6,020")]),
+}
+
+
+@pytest.fixture
+def server():
+    """
+    Serve PAGES by dateWeek with an ETag, answering 304 to a matching
+    If-None-Match; weeks listed in ``flaky`` answer 503 once first.
+    """
+    requests_seen = []
+    flaky = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            week = parse_qs(urlparse(self.path).query).get("dateWeek", [None])[0]
+            requests_seen.append(week)
+            if week in flaky:
+                flaky.discard(week)
+                status, body = 503, b""
+            elif week in PAGES and self.headers.get("If-None-Match") == f'"{week}"':
+                status, body = 304, b""
+            elif week in PAGES:
+                status, body = 200, PAGES[week]
+            else:
+                status, body = 404, b""
+            self.send_response(status)
+            if week in PAGES:
+                self.send_header("ETag", f'"{week}"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_port}/rankings"
+    httpd.requests_seen = requests_seen
+    httpd.flaky = flaky
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestParsing:
+    """Test parsing of recorded pages."""
+
+    def test_parse_week(self):
+        assert parse_week(PAGES["2023-01-09"]) == [("1", "Carlos Alcaraz", "6,780"), ("T2", "Casper Ruud", "5,820")]
+
+    @pytest.mark.parametrize("parser", sorted(PARSERS))
+    def test_parsers_agree(self, parser):
+        page = (
+            b'<html><body><table><tr><td class="rank bold heavy tiny-cell"> T3 </td>'
+            b'<td class="name  center"><a> Stan <!-- x --><b>O&#39;Brien</b></a></td>'
+            b'<td class="points center bold extrabold small-cell">1,000</td></tr></table></body></html>'
+        )
+        assert PARSERS[parser](page) == PARSERS["html.parser"](page)
+        assert PARSERS[parser](page)[0] == ("T3", "StanO'Brien", "1,000")
+        assert PARSERS[parser](b"<html></html>") == [("N/A", "N/A", "N/A")]
+
+    def test_unknown_parser(self):
+        with pytest.raises(ValueError):
+            get_parser("html5lib")
+
+    def test_parse_weeks(self):
+        assert parse_weeks(PAGES["2023-01-16"]) == ["2023-01-16", "2023-01-09", "2023-01-02"]
+
+
+class TestTokenBucket:
+    """Test the rate limiter with a fake clock."""
+
+    def test_waits_for_tokens(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0], sleep=sleep)
+        for _ in range(5):
+            bucket.acquire()
+        assert now[0] == pytest.approx(2.0)
+
+
+class TestScrapeWeeks:
+    """Test the fetch pipeline against the stub server."""
+
+    def test_scrapes_and_writes_every_week(self, server):
+        conn = sqlite3.connect(":memory:")
+        batches = []
+
+        def write(batch):
+            batches.append(len(batch))
+            replace_weeks(conn, batch)
+
+        failures = scrape_weeks(PAGES, write, workers=3, rate=100, batch_size=2, base_url=server.base_url)
+        assert failures == {}
+        weeks = [row[0] for row in conn.execute(f"SELECT DISTINCT week FROM {FACT_TABLE} ORDER BY week")]
+        assert weeks == ["2023-01-02", "2023-01-09", "2023-01-16"]
+        assert batches == [2, 1]
+        conn.close()
+
+    def test_reports_progress(self, server):
+        statuses = []
+        scrape_weeks(
+            ["2023-01-02", "1999-01-04"], lambda batch: None, rate=100, backoff=0,
+            base_url=server.base_url, on_status=lambda week, status: statuses.append((week, status)),
+        )
+        assert statuses == [("2023-01-02", "fetched"), ("2023-01-02", "parsed")]
+
+    def test_retries_server_errors(self, server):
+        server.flaky.add("2023-01-09")
+        written = {}
+        failures = scrape_weeks(
+            ["2023-01-09"], written.update, rate=100, backoff=0, base_url=server.base_url
+        )
+        assert failures == {}
+        assert server.requests_seen == ["2023-01-09", "2023-01-09"]
+        assert written["2023-01-09"][0] == ("1", "Carlos Alcaraz", "6,780")
+
+    def test_failed_week_does_not_stop_others(self, server):
+        written = {}
+        failures = scrape_weeks(
+            ["1999-01-04", "2023-01-02"], written.update, rate=100, backoff=0, base_url=server.base_url
+        )
+        assert list(failures) == ["1999-01-04"]
+        assert list(written) == ["2023-01-02"]
+
+    def test_failed_batch_reports_its_weeks(self, server):
+        def write(batch):
+            raise sqlite3.OperationalError("database is locked")
+
+        failures = scrape_weeks(["2023-01-02", "2023-01-09"], write, rate=100, base_url=server.base_url)
+        assert sorted(failures) == ["2023-01-02", "2023-01-09"]
+
+    def test_gives_up_after_retries(self, server):
+        server.flaky.add("2023-01-02")
+        with pytest.raises(Exception):
+            fetch(make_session(), f"{server.base_url}?dateWeek=2023-01-02", retries=0)
+
+
+class TestArchive:
+    """Test conditional refetch and offline replay through the page archive."""
+
+    def test_revalidates_archived_pages(self, server, tmp_path):
+        archive = PageArchive(str(tmp_path))
+        url = f"{server.base_url}?dateWeek=2023-01-02"
+        first = fetch(make_session(), url, archive=archive)
+        assert archive.conditional_headers(url) == {"If-None-Match": '"2023-01-02"'}
+        # The second request is answered with 304 and served from the archive
+        assert fetch(make_session(), url, archive=archive) == first == PAGES["2023-01-02"]
+        assert server.requests_seen == ["2023-01-02", "2023-01-02"]
+
+    def test_replay_rebuilds_without_network(self, server, tmp_path):
+        archive = PageArchive(str(tmp_path))
+        online = sqlite3.connect(":memory:")
+        failures = scrape_weeks(
+            PAGES, lambda batch: replace_weeks(online, batch), rate=100, base_url=server.base_url, archive=archive
+        )
+        assert failures == {}
+        server.shutdown()
+
+        # A fresh archive object reads the saved index; no request reaches the server
+        seen = len(server.requests_seen)
+        offline = sqlite3.connect(":memory:")
+        failures = scrape_weeks(
+            list(PAGES) + ["1999-01-04"], lambda batch: replace_weeks(offline, batch),
+            base_url=server.base_url, archive=PageArchive(str(tmp_path)), replay=True,
+        )
+        assert list(failures) == ["1999-01-04"]
+        assert isinstance(failures["1999-01-04"], KeyError)
+        assert len(server.requests_seen) == seen
+        query = f"SELECT week, rank, player, points FROM {FACT_TABLE} ORDER BY week, rank"
+        assert offline.execute(query).fetchall() == online.execute(query).fetchall()
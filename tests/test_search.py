@@ -0,0 +1,70 @@
+"""
+Tests for the in-memory player search index.
+Run with: pytest tests/test_search.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.search import PlayerSearchIndex, normalize
+
+PLAYERS = [
+    ("Björn Borg", 1, "1983-01-03"),
+    ("Roger Federer", 1, "2022-09-19"),
+    ("Juan Martín del Potro", 3, "2020-01-13"),
+    ("Jiří Veselý", 35, "2022-01-10"),
+    ("Brian O'Connell", 50, "1999-06-07"),
+    ("Bernard Borgnini", 80, "2023-05-01"),
+]
+
+
+@pytest.fixture
+def index():
+    return PlayerSearchIndex(PLAYERS)
+
+
+class TestNormalize:
+    """Test name folding."""
+
+    def test_accents_and_case(self):
+        assert normalize("Björn") == "bjorn"
+        assert normalize("Jiří Veselý") == "jiri vesely"
+        assert normalize("Søderling") == "soderling"
+
+
+class TestPlayerSearchIndex:
+    """Test matching and ranking of search results."""
+
+    def test_accent_insensitive(self, index):
+        assert index.search("bjorn") == ["Björn Borg"]
+        assert index.search("VESELY") == ["Jiří Veselý"]
+
+    def test_substring(self, index):
+        assert index.search("artín del") == ["Juan Martín del Potro"]
+        assert index.search("o'c") == ["Brian O'Connell"]
+
+    def test_short_query(self, index):
+        assert index.search("ro") == ["Roger Federer", "Juan Martín del Potro"]
+
+    def test_prefix_matches_first(self, index):
+        # "Bernard Borgnini" starts with "b" but "Björn Borg" has the better peak rank
+        assert index.search("borg") == ["Björn Borg", "Bernard Borgnini"]
+        assert index.search("bor", sort="recent") == ["Bernard Borgnini", "Björn Borg"]
+
+    def test_sort_orders(self, index):
+        # No name or word starts with "e", so only the sort order applies
+        assert index.search("e", limit=3) == ["Roger Federer", "Juan Martín del Potro", "Jiří Veselý"]
+        assert index.search("e", limit=3, sort="recent") == ["Bernard Borgnini", "Roger Federer", "Jiří Veselý"]
+        assert index.search("e", limit=2, sort="name") == ["Bernard Borgnini", "Brian O'Connell"]
+
+    def test_limit_and_no_results(self, index):
+        assert len(index.search("e", limit=2)) == 2
+        assert index.search("zzzz") == []
+
+    def test_unknown_sort(self, index):
+        with pytest.raises(ValueError):
+            index.search("borg", sort="points")
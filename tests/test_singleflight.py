@@ -0,0 +1,119 @@
+"""
+Tests for request coalescing and the service result cache.
+Run with: pytest tests/test_singleflight.py -v
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import services
+from src.singleflight import CoalescingCache
+
+CALLERS = 8
+DELAY = 0.2
+
+
+class TestCoalescingCache:
+    """Test single-flight calls and the result LRU."""
+
+    def test_concurrent_calls_run_once(self):
+        cache = CoalescingCache(max_entries=4)
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(DELAY)
+            return {"value": 1}
+
+        async def fire():
+            return await asyncio.gather(*(cache.call_async("key", slow) for _ in range(CALLERS)))
+
+        results = asyncio.run(fire())
+        assert calls == [1]
+        assert all(result is results[0] for result in results)
+        assert cache.stats() == {"entries": 1, "hits": 0, "misses": 1, "coalesced": CALLERS - 1}
+        assert cache.call("key", lambda: None) is results[0]
+        assert cache.stats()["hits"] == 1
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        cache = CoalescingCache(max_entries=4)
+
+        async def fail():
+            await asyncio.sleep(DELAY)
+            raise ValueError("Player not found")
+
+        async def fire():
+            return await asyncio.gather(*(cache.call_async("key", fail) for _ in range(2)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in asyncio.run(fire()))
+        assert cache.stats()["entries"] == 0
+        assert cache.call("key", lambda: "ok") == "ok"
+
+    def test_evicts_least_recently_used(self):
+        cache = CoalescingCache(max_entries=2)
+        cache.call("a", lambda: 1)
+        cache.call("b", lambda: 2)
+        cache.call("a", lambda: 0)
+        cache.call("c", lambda: 3)
+        assert cache.call("b", lambda: 4) == 4
+        assert cache.call("c", lambda: 0) == 3
+
+    def test_zero_size_caches_nothing(self):
+        cache = CoalescingCache(max_entries=0)
+        assert cache.call("a", lambda: 1) == 1
+        assert cache.call("a", lambda: 2) == 2
+        assert cache.stats()["entries"] == 0
+
+
+class TestServiceResults:
+    """Test the coalesced player service calls."""
+
+    def test_default_arguments_share_entry(self, db_path):
+        factfile = services.get_player_factfile("Carlos Alcaraz")
+        assert services.get_player_factfile("Carlos Alcaraz", None, end=None) is factfile
+        assert services.get_result_cache_stats()["hits"] == 1
+
+    def test_new_dataset_version_recomputes(self, db_path):
+        career = services.get_player_career("Carlos Alcaraz")
+        services.bump_dataset_version()
+        assert services.get_result_cache_stats()["entries"] == 0
+        assert services.get_player_career("Carlos Alcaraz") == career
+        assert services.get_result_cache_stats()["misses"] == 2
+
+    def test_unknown_player_raises(self, db_path):
+        with pytest.raises(ValueError):
+            services.get_player_career("Nobody")
+        assert services.get_result_cache_stats()["entries"] == 0
+
+    def test_waiting_callers_hold_no_service_thread(self, db_path, monkeypatch):
+        monkeypatch.setattr(services, "_executor", ThreadPoolExecutor(max_workers=2))
+        calls = []
+
+        def slow_career(player, start=None, end=None):
+            calls.append(player)
+            time.sleep(DELAY)
+            return {"player": player}
+
+        career = services.coalesced(slow_career)
+
+        async def fire():
+            burst = asyncio.gather(*(services.run_service(career, "Carlos Alcaraz") for _ in range(CALLERS)))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            # An unrelated call still finds a free thread while the burst is in flight
+            await services.run_service(time.sleep, DELAY)
+            unrelated = time.perf_counter() - start
+            return await burst, unrelated
+
+        results, unrelated = asyncio.run(fire())
+        assert calls == ["Carlos Alcaraz"]
+        assert all(result is results[0] for result in results)
+        assert unrelated < DELAY * 1.5
+        assert services.get_result_cache_stats()["coalesced"] == CALLERS - 1
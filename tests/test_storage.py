@@ -0,0 +1,264 @@
+"""
+Tests for the rankings fact table helpers.
+Run with: pytest tests/test_storage.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import (
+    FACT_TABLE,
+    NO1_TABLE,
+    STATS_TABLE,
+    apply_delta,
+    bulk_load,
+    check_player_stats,
+    compact_weeks,
+    expand_weeks,
+    journal_statuses,
+    list_week_tables,
+    list_weeks,
+    load_week,
+    mark_weeks,
+    parse_points,
+    parse_rank,
+    plan_weeks,
+    read_week,
+    rebuild_fact_table,
+    replace_weeks,
+    sync_fact_table,
+    week_delta,
+)
+
+
+def make_week(conn, week, rows):
+    conn.execute(f'CREATE TABLE "{week}"(rank, name, points)')
+    conn.executemany(f'INSERT INTO "{week}" VALUES (?, ?, ?)', rows)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    make_week(conn, "2023-01-02", [("1", "Carlos Alcaraz", "6,820"), ("T2", "Rafael Nadal", "6,020")])
+    make_week(conn, "2023-01-09", [("1", "Carlos Alcaraz", "6,780"), ("N/A", "N/A", "N/A")])
+    yield conn
+    conn.close()
+
+
+class TestParsing:
+    """Test conversion of raw scraped strings."""
+
+    def test_parse_rank(self):
+        assert parse_rank("7") == (7, 0)
+        assert parse_rank("T7") == (7, 1)
+        assert parse_rank("N/A") == (None, 0)
+
+    def test_parse_points(self):
+        assert parse_points("12,415") == 12415
+        assert parse_points("-") == 0
+        assert parse_points("N/A") is None
+
+
+class TestFactTable:
+    """Test building and syncing the fact table."""
+
+    def test_week_tables_exclude_fact_table(self, conn):
+        rebuild_fact_table(conn)
+        assert list_week_tables(conn) == ["2023-01-09", "2023-01-02"]
+
+    def test_rebuild(self, conn):
+        assert rebuild_fact_table(conn) == 2
+        rows = conn.execute(
+            f"SELECT week, rank, tied, player, points FROM {FACT_TABLE} ORDER BY week, rowid"
+        ).fetchall()
+        assert rows[1] == ("2023-01-02", 2, 1, "Rafael Nadal", 6020)
+        assert rows[3] == ("2023-01-09", None, 0, "N/A", None)
+
+    def test_sync_adds_and_removes_weeks(self, conn):
+        rebuild_fact_table(conn)
+        make_week(conn, "2023-01-16", [("1", "Carlos Alcaraz", "6,730")])
+        conn.execute('DROP TABLE "2023-01-02"')
+        assert sync_fact_table(conn) == (1, 1)
+        weeks = [row[0] for row in conn.execute(f"SELECT DISTINCT week FROM {FACT_TABLE} ORDER BY week")]
+        assert weeks == ["2023-01-09", "2023-01-16"]
+
+
+class TestPlayerStats:
+    """Test the materialized player aggregates."""
+
+    def test_rebuild_builds_aggregates(self, conn):
+        rebuild_fact_table(conn)
+        row = conn.execute(
+            f"SELECT career_high_rank, career_high_date, max_points, weeks_at_1 FROM {STATS_TABLE} WHERE player = ?",
+            ("Carlos Alcaraz",),
+        ).fetchone()
+        assert row == (1, "2023-01-09", 6820, 2)
+        assert conn.execute(f"SELECT weeks, latest_week FROM {NO1_TABLE}").fetchall() == [(2, "2023-01-09")]
+        assert check_player_stats(conn) == []
+
+    def test_load_week_updates_aggregates(self, conn):
+        rebuild_fact_table(conn)
+        make_week(conn, "2023-01-16", [("1", "Rafael Nadal", "7,000"), ("2", "Carlos Alcaraz", "6,730")])
+        load_week(conn, "2023-01-16")
+        assert check_player_stats(conn) == []
+        row = conn.execute(
+            f"SELECT career_high_rank, max_points, weeks_at_1 FROM {STATS_TABLE} WHERE player = ?",
+            ("Rafael Nadal",),
+        ).fetchone()
+        assert row == (1, 7000, 1)
+
+    def test_sync_updates_aggregates_for_dropped_weeks(self, conn):
+        rebuild_fact_table(conn)
+        conn.execute('DROP TABLE "2023-01-02"')
+        sync_fact_table(conn)
+        assert check_player_stats(conn) == []
+        assert conn.execute(f"SELECT 1 FROM {STATS_TABLE} WHERE player = ?", ("Rafael Nadal",)).fetchone() is None
+
+    def test_check_reports_stale_aggregates(self, conn):
+        rebuild_fact_table(conn)
+        conn.execute(f"UPDATE {STATS_TABLE} SET weeks_top_10 = 99")
+        assert len(check_player_stats(conn)) == 2
+
+
+class TestReplaceWeeks:
+    """Test the transactional bulk writer."""
+
+    def test_rerun_replaces_week(self, conn):
+        rebuild_fact_table(conn)
+        week = [("1", "Carlos Alcaraz", "6,730"), ("2", "Stan O'Brien", "10")]
+        replace_weeks(conn, [("2023-01-16", week)])
+        replace_weeks(conn, [("2023-01-16", week)])
+        assert conn.execute('SELECT COUNT(*) FROM "2023-01-16"').fetchone()[0] == 2
+        assert conn.execute(f"SELECT COUNT(*) FROM {FACT_TABLE} WHERE week = '2023-01-16'").fetchone()[0] == 2
+        assert check_player_stats(conn) == []
+
+    def test_failed_batch_leaves_no_partial_weeks(self, conn):
+        rebuild_fact_table(conn)
+        batch = [("2023-01-16", [("1", "Carlos Alcaraz", "6,730")]), ("2023-01-09", [("1", "Carlos Alcaraz")])]
+        with pytest.raises(sqlite3.ProgrammingError):
+            replace_weeks(conn, batch)
+        assert list_week_tables(conn) == ["2023-01-09", "2023-01-02"]
+        assert conn.execute('SELECT COUNT(*) FROM "2023-01-09"').fetchone()[0] == 2
+        assert check_player_stats(conn) == []
+
+    def test_bulk_load_restores_journal_mode(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / "rankings.db")
+        with bulk_load(conn):
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            replace_weeks(conn, [("2023-01-02", [("1", "Carlos Alcaraz", "6,820")])])
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert list_week_tables(conn) == ["2023-01-02"]
+        conn.close()
+
+
+class TestJournal:
+    """Test the ingestion journal and planner."""
+
+    def test_plan_adopts_existing_tables(self, conn):
+        expected = ["2023-01-02", "2023-01-09", "2023-01-16", "2023-01-23"]
+        assert plan_weeks(conn, reversed(expected)) == ["2023-01-16", "2023-01-23"]
+        assert journal_statuses(conn) == {"2023-01-02": "written", "2023-01-09": "written"}
+
+    def test_unfinished_weeks_are_planned_again(self, conn):
+        rebuild_fact_table(conn)
+        replace_weeks(conn, [("2023-01-16", [("1", "Carlos Alcaraz", "6,730")])])
+        mark_weeks(conn, ["2023-01-23"], "parsed")
+        mark_weeks(conn, ["2023-01-30"], "failed", "503 Server Error")
+        mark_weeks(conn, ["2020-03-23"], "frozen")
+        mark_weeks(conn, ["2023-01-09"], "filler")
+        conn.commit()
+        expected = ["2020-03-23", "2023-01-09", "2023-01-16", "2023-01-23", "2023-01-30"]
+        assert plan_weeks(conn, expected) == ["2023-01-23", "2023-01-30"]
+        assert plan_weeks(conn, expected, done=("written",)) == ["2020-03-23", "2023-01-09", "2023-01-23", "2023-01-30"]
+        # A filler week the site now lists is scraped for real; a written week is not
+        assert plan_weeks(conn, expected, listed={"2023-01-09", "2023-01-16"}) == [
+            "2023-01-09", "2023-01-23", "2023-01-30"
+        ]
+
+    def test_failed_batch_is_not_journaled(self, conn):
+        rebuild_fact_table(conn)
+        with pytest.raises(sqlite3.ProgrammingError):
+            replace_weeks(conn, [("2023-01-16", [("1", "Carlos Alcaraz")])])
+        assert "2023-01-16" not in journal_statuses(conn)
+
+    def test_copied_week_is_journaled_as_filler(self, conn):
+        rebuild_fact_table(conn)
+        replace_weeks(conn, [("2023-01-16", read_week(conn, "2023-01-09"))], status="filler")
+        assert journal_statuses(conn)["2023-01-16"] == "filler"
+        # The journal entry is part of the week's transaction
+        with pytest.raises(ValueError):
+            replace_weeks(conn, [("2023-01-23", read_week(conn, "2023-01-09"))], status="copied")
+        assert "2023-01-23" not in list_weeks(conn)
+
+    def test_unknown_status(self, conn):
+        with pytest.raises(ValueError):
+            mark_weeks(conn, ["2023-01-16"], "done")
+
+
+class TestCompactStore:
+    """Test the delta-encoded week store."""
+
+    @pytest.fixture
+    def weeks(self, conn):
+        # Filler copies, a one-row change, a shorter and a longer week
+        base = [(str(i), f"Player {i}", f"{1000 - i}") for i in range(1, 11)]
+        changed = base[:4] + [("5", "Casper Ruud", "995")] + base[5:]
+        contents = {
+            "2023-01-16": base, "2023-01-23": base, "2023-01-30": base, "2023-02-06": changed,
+            "2023-02-13": changed[:6], "2023-02-20": changed + [("11", "Rafael Nadal", "1")],
+            "2023-02-27": [(row[0], row[1], "0") for row in base],
+        }
+        conn.commit()
+        replace_weeks(conn, sorted(contents.items()))
+        contents["2023-01-02"] = read_week(conn, "2023-01-02")
+        contents["2023-01-09"] = read_week(conn, "2023-01-09")
+        return contents
+
+    def test_round_trip(self, conn, weeks):
+        rebuild_fact_table(conn)
+        counts = compact_weeks(conn, keyframe_interval=2)
+        assert counts == {"key": 5, "delta": 2, "alias": 2}
+        assert list_week_tables(conn) == []
+        assert list_weeks(conn) == sorted(weeks, reverse=True)
+        for week, rows in weeks.items():
+            assert read_week(conn, week) == [tuple(row) for row in rows]
+        # Fact rows still match the stored weeks
+        assert sync_fact_table(conn) == (0, 0)
+        assert check_player_stats(conn) == []
+
+    def test_rank_shift_is_carried(self, conn):
+        base = [(str(i), f"Player {i}", f"{1000 - i}") for i in range(1, 11)]
+        # Player 5 jumps to #1: players 1-4 move down a rank with the same points
+        jumped = [("1", "Player 5", "2000")] + [(str(i + 1), *row[1:]) for i, row in enumerate(base[:4], 1)] + base[5:]
+        assert week_delta(base, jumped) == ([(0, ("1", "Player 5", "2000"))], [4])
+        assert apply_delta(base, len(jumped), *week_delta(base, jumped)) == jumped
+        conn.commit()
+        replace_weeks(conn, [("2023-01-16", base), ("2023-01-23", jumped)])
+        assert compact_weeks(conn) == {"key": 3, "delta": 1, "alias": 0}
+        assert read_week(conn, "2023-01-23") == jumped
+        assert compact_weeks(conn, keyframe_interval=1) == {"key": 4, "delta": 0, "alias": 0}
+        assert read_week(conn, "2023-01-23") == jumped
+
+    def test_new_weeks_fold_in(self, conn, weeks):
+        compact_weeks(conn)
+        replace_weeks(conn, [("2023-01-23", [("1", "Carlos Alcaraz", "6,730")])])
+        assert read_week(conn, "2023-01-23") == [("1", "Carlos Alcaraz", "6,730")]
+        compact_weeks(conn)
+        assert list_week_tables(conn) == []
+        assert read_week(conn, "2023-01-23") == [("1", "Carlos Alcaraz", "6,730")]
+        assert read_week(conn, "2023-01-30") == weeks["2023-01-30"]
+
+    def test_expand(self, conn, weeks):
+        compact_weeks(conn)
+        assert expand_weeks(conn) == len(weeks)
+        assert list_week_tables(conn) == sorted(weeks, reverse=True)
+        assert read_week(conn, "2023-02-20") == weeks["2023-02-20"]
+
+    def test_missing_week(self, conn):
+        with pytest.raises(ValueError):
+            read_week(conn, "1999-01-04")
@@ -0,0 +1,344 @@
+"""
+Tests for the incremental update, the database swap and the health probes.
+Run with: pytest tests/test_updater.py -v
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, services, storage, updater
+from src.archive import PageArchive
+from src.storage import journal_statuses, list_weeks, read_week
+
+BASE_URL = "https://rankings.test/singles"
+
+PAGES = {
+    BASE_URL: (
+        b'<select id="dateWeek-filter"><option value="Current Week">2023.01.16</option>'
+        b'<option value="2023-01-02">2023.01.02</option></select>'
+    ),
+    f"{BASE_URL}?dateWeek=2023-01-16&rankRange=0-100": (
+        b'<table><tr><td class="rank bold heavy tiny-cell">1</td><td class="name center">Novak Djokovic</td>'
+        b'<td class="points center bold extrabold small-cell">7,070</td></tr></table>'
+    ),
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"{self.status_code}")
+
+
+class FakeSession:
+    """Serves PAGES and records the URLs requested."""
+
+    def __init__(self):
+        self.requested = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.requested.append(url)
+        return FakeResponse(200, PAGES[url]) if url in PAGES else FakeResponse(404)
+
+
+def run_update(conn, session, **kwargs):
+    return updater.update_database(
+        conn, session=session, start=date(2023, 1, 2), today=date(2023, 1, 23), rate=100, base_url=BASE_URL,
+        log=lambda message: None, **kwargs
+    )
+
+
+class TestUpdateDatabase:
+    """Test the incremental update against a fake site."""
+
+    def test_scrapes_fills_and_resumes(self, db_path):
+        conn = sqlite3.connect(db_path)
+        session = FakeSession()
+        summary = run_update(conn, session)
+        assert summary == {"scraped": 1, "failed": 0, "filled": 2, "frozen": 22, "added": 0, "removed": 0}
+        assert list_weeks(conn) == ["2023-01-23", "2023-01-16", "2023-01-09", "2023-01-02"]
+        # Filler weeks copy the latest week before them, including one scraped in the same run
+        assert read_week(conn, "2023-01-09") == read_week(conn, "2023-01-02")
+        assert read_week(conn, "2023-01-23") == [("1", "Novak Djokovic", "7,070")]
+        statuses = journal_statuses(conn)
+        assert statuses["2023-01-16"] == "written" and statuses["2023-01-23"] == "filler"
+        assert statuses["2020-03-23"] == "frozen"
+
+        # Nothing left to do: only the landing page is requested again
+        session.requested.clear()
+        summary = run_update(conn, session)
+        assert summary == {"scraped": 0, "failed": 0, "filled": 0, "frozen": 0, "added": 0, "removed": 0}
+        assert session.requested == [BASE_URL]
+        conn.close()
+
+    def test_rescrapes_filler_week_once_listed(self, db_path, monkeypatch):
+        conn = sqlite3.connect(db_path)
+        run_update(conn, FakeSession())
+        assert journal_statuses(conn)["2023-01-23"] == "filler"
+
+        # The week was published after the update copied the week before it
+        pages = dict(PAGES)
+        pages[BASE_URL] = PAGES[BASE_URL].replace(
+            b'<option value="Current Week">2023.01.16</option>',
+            b'<option value="Current Week">2023.01.23</option><option value="2023-01-16">2023.01.16</option>',
+        )
+        pages[f"{BASE_URL}?dateWeek=2023-01-23&rankRange=0-100"] = PAGES[
+            f"{BASE_URL}?dateWeek=2023-01-16&rankRange=0-100"
+        ].replace(b"7,070", b"7,160")
+        monkeypatch.setattr(sys.modules[__name__], "PAGES", pages)
+        summary = run_update(conn, FakeSession())
+        assert summary["scraped"] == 1 and summary["filled"] == 0
+        assert read_week(conn, "2023-01-23") == [("1", "Novak Djokovic", "7,160")]
+        assert journal_statuses(conn)["2023-01-23"] == "written"
+        conn.close()
+
+    def test_filler_week_journaled_with_copy(self, db_path, monkeypatch):
+        conn = sqlite3.connect(db_path)
+        mark_weeks = storage.mark_weeks
+
+        def crash_on_filler(conn, weeks, status, error=None):
+            if status == "filler":
+                raise KeyboardInterrupt
+            mark_weeks(conn, weeks, status, error)
+
+        # Killed while journaling the first filler week
+        with monkeypatch.context() as patch, pytest.raises(KeyboardInterrupt):
+            patch.setattr(storage, "mark_weeks", crash_on_filler)
+            patch.setattr(updater, "mark_weeks", crash_on_filler)
+            run_update(conn, FakeSession())
+        # The copy is rolled back with it, not left journaled as a scraped week
+        assert "2023-01-09" not in list_weeks(conn)
+        assert "2023-01-09" not in journal_statuses(conn)
+        run_update(conn, FakeSession())
+        assert journal_statuses(conn)["2023-01-09"] == "filler"
+        conn.close()
+
+    def test_offline_replay_matches_online_update(self, db_path, tmp_path):
+        offline_path = tmp_path / "offline.db"
+        shutil.copyfile(db_path, offline_path)
+        archive = PageArchive(str(tmp_path / "archive"))
+        online = sqlite3.connect(db_path)
+        run_update(online, FakeSession(), archive=archive)
+
+        class NoNetwork:
+            def get(self, url, timeout=None, headers=None):
+                raise AssertionError(f"replay requested {url}")
+
+        offline = sqlite3.connect(offline_path)
+        summary = run_update(offline, NoNetwork(), archive=PageArchive(str(tmp_path / "archive")), replay=True)
+        assert summary == {"scraped": 1, "failed": 0, "filled": 2, "frozen": 22, "added": 0, "removed": 0}
+        # Same weeks, filler weeks included, same rows and journal
+        assert list_weeks(offline) == list_weeks(online)
+        for week in list_weeks(online):
+            assert read_week(offline, week) == read_week(online, week)
+        fact = "SELECT week, rank, player, points FROM rankings ORDER BY week, rowid"
+        assert offline.execute(fact).fetchall() == online.execute(fact).fetchall()
+        assert journal_statuses(offline) == journal_statuses(online)
+        online.close()
+        offline.close()
+
+    def test_stop_cancels_between_batches(self, db_path):
+        conn = sqlite3.connect(db_path)
+        stop = threading.Event()
+        stop.set()
+        session = FakeSession()
+        with pytest.raises(updater.UpdateCancelled):
+            run_update(conn, session, stop=stop)
+        # Only the week list was fetched, and no filler week was written
+        assert session.requested == [BASE_URL]
+        assert list_weeks(conn) == ["2023-01-02"]
+        conn.close()
+
+    def test_replay_needs_archived_week_list(self, db_path, tmp_path):
+        conn = sqlite3.connect(db_path)
+        with pytest.raises(KeyError):
+            run_update(conn, None, archive=PageArchive(str(tmp_path / "archive")), replay=True)
+        conn.close()
+
+
+class TestSwapUpdate:
+    """Test updating a copy of the database and swapping it in."""
+
+    def test_swaps_in_updated_copy(self, db_path):
+        inode = os.stat(db_path).st_ino
+        summary = updater.swap_update(str(db_path), update=lambda conn, archive: run_update(conn, FakeSession()))
+        assert summary["scraped"] == 1
+        assert os.stat(db_path).st_ino != inode
+        assert services.get_all_weeks()[0] == "2023-01-23"
+        assert os.listdir(db_path.parent) == ["rankings.db"]
+
+    def test_external_swap_rebuilds_search_index(self, db_path):
+        assert services.search_players("Djokovic") == []
+        # As done by another worker or scripts/filler.py: no bump_dataset_version in this process
+        updater.swap_update(str(db_path), update=lambda conn, archive: run_update(conn, FakeSession()))
+        assert services.search_players("Djokovic") == ["Novak Djokovic"]
+
+    def test_failed_update_leaves_database(self, db_path):
+        before = db_path.read_bytes()
+
+        def fail(conn, archive):
+            conn.execute('CREATE TABLE "2023-01-09"(rank, name, points)')
+            raise RuntimeError("site down")
+
+        updater.run_background_update(str(db_path), update=fail)
+        assert updater.status.as_dict()["state"] == "failed"
+        assert db_path.read_bytes() == before
+        assert sorted(os.listdir(db_path.parent)) == ["rankings.db", "rankings.db.update.lock"]
+
+    def test_invalid_staging_database_is_not_swapped(self, db_path):
+        before = db_path.read_bytes()
+
+        def lose_week(conn, archive):
+            conn.execute('DROP TABLE "2023-01-02"')
+            conn.commit()
+            return {}
+
+        assert not updater.run_background_update(str(db_path), update=lose_week)
+        state = updater.status.as_dict()
+        assert state["state"] == "failed"
+        assert "1 weeks lost: 2023-01-02" in state["error"]
+        assert db_path.read_bytes() == before
+        assert sorted(os.listdir(db_path.parent)) == ["rankings.db", "rankings.db.update.lock"]
+
+    def test_cancelled_update_removes_staging_copy(self, db_path):
+        before = db_path.read_bytes()
+        stop = threading.Event()
+        stop.set()
+        assert not updater.run_background_update(
+            str(db_path), update=lambda conn, archive: run_update(conn, FakeSession(), stop=stop)
+        )
+        assert updater.status.as_dict()["state"] == "cancelled"
+        assert db_path.read_bytes() == before
+        assert sorted(os.listdir(db_path.parent)) == ["rankings.db", "rankings.db.update.lock"]
+
+    def test_removes_stale_staging_files(self, db_path):
+        stale = [db_path.parent / ".rankings-staging-abc.db", db_path.parent / ".rankings-staging-abc.db-journal"]
+        for path in stale:
+            path.write_bytes(b"")
+        assert updater.remove_stale_staging(str(db_path)) == sorted(str(path) for path in stale)
+        assert sorted(os.listdir(db_path.parent)) == ["rankings.db", "rankings.db.update.lock"]
+
+    @pytest.mark.skipif(updater.fcntl is None, reason="needs fcntl")
+    def test_keeps_staging_files_of_running_update(self, db_path):
+        staging = db_path.parent / ".rankings-staging-abc.db"
+        staging.write_bytes(b"")
+        with open(updater.lock_path(str(db_path)), "a") as f:
+            updater.fcntl.flock(f, updater.fcntl.LOCK_EX | updater.fcntl.LOCK_NB)
+            assert updater.remove_stale_staging(str(db_path)) == []
+        assert staging.exists()
+
+    @pytest.mark.skipif(updater.fcntl is None, reason="needs fcntl")
+    def test_skips_while_another_process_updates(self, db_path):
+        before = db_path.read_bytes()
+        # A lock held through another open file behaves like one held by another worker
+        with open(updater.lock_path(str(db_path)), "a") as f:
+            updater.fcntl.flock(f, updater.fcntl.LOCK_EX | updater.fcntl.LOCK_NB)
+            assert not updater.run_background_update(
+                str(db_path), update=lambda conn, archive: run_update(conn, FakeSession())
+            )
+        assert db_path.read_bytes() == before
+        assert updater.run_background_update(str(db_path), update=lambda conn, archive: run_update(conn, FakeSession()))
+
+    def test_swap_bumps_dataset_version(self, db_path):
+        version = services.get_dataset_version()
+        services.get_search_index()
+        assert updater.run_background_update(
+            str(db_path), on_swapped=services.bump_dataset_version,
+            update=lambda conn, archive: run_update(conn, FakeSession()),
+        )
+        assert services._search_index is None
+        assert services.get_dataset_version() != version
+        assert services.get_dataset_version().startswith("2023-01-23")
+
+
+class TestValidateDatabase:
+    """Test the checks run on a staging database."""
+
+    def test_valid(self, db_path):
+        conn = sqlite3.connect(db_path)
+        assert updater.validate_database(conn, {"2023-01-02", "2020-03-23"}) == []
+        conn.close()
+
+    def test_fact_table_out_of_sync(self, db_path):
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE "2023-01-09"(rank, name, points)')
+        problems = updater.validate_database(conn, {"2023-01-02", "2022-12-26"})
+        assert "1 weeks lost: 2022-12-26" in problems
+        assert "fact table out of sync: 1 weeks missing, 0 extra" in problems
+        conn.close()
+
+
+class TestSchedule:
+    """Test parsing update schedules and computing the next run."""
+
+    def test_next_run(self):
+        schedule = updater.Schedule("mon 06:00, daily 18:30")
+        # Monday 2023-01-16 at 05:00 UTC
+        now = datetime(2023, 1, 16, 5, 0, tzinfo=timezone.utc)
+        assert schedule.next_run(now) == datetime(2023, 1, 16, 6, 0, tzinfo=timezone.utc)
+        assert schedule.next_run(schedule.next_run(now)) == datetime(2023, 1, 16, 18, 30, tzinfo=timezone.utc)
+
+    def test_weekly_wraps_to_next_week(self):
+        now = datetime(2023, 1, 16, 6, 0, tzinfo=timezone.utc)
+        assert updater.Schedule("Monday 06:00").next_run(now) == datetime(2023, 1, 23, 6, 0, tzinfo=timezone.utc)
+
+    @pytest.mark.parametrize("spec", ["", "mon", "funday 06:00", "mon 25:00", "mon 6"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            updater.Schedule(spec)
+
+
+class TestHealth:
+    """Test the liveness and readiness probes."""
+
+    def test_liveness(self):
+        assert TestClient(main.app).get("/health/live").json() == {"status": "ok"}
+
+    def test_ready_after_warm_up(self, db_path):
+        with TestClient(main.app) as client:
+            response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["weeks"] == 1
+
+    def test_migrates_baseline_database_at_startup(self, tmp_path, monkeypatch):
+        # Week tables only, as before the fact table and aggregates existed
+        path = tmp_path / "rankings.db"
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE "2023-01-02"(rank, name, points)')
+        conn.execute('INSERT INTO "2023-01-02" VALUES ("1", "Carlos Alcaraz", "6,820")')
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(services, "DB_PATH", str(path))
+        services.reset_caches()
+        with TestClient(main.app) as client:
+            assert client.get("/health/ready").status_code == 200
+            factfile = client.get("/api/player/factfile", params={"player": "Carlos Alcaraz"})
+            assert factfile.status_code == 200
+            assert factfile.json()["weeks_at_1"] == 1
+            assert client.get("/api/weeks-at-no1").json() == [{"player": "Carlos Alcaraz", "weeks": 1}]
+        assert updater.schema_current(str(path))
+        assert not updater.migrate_schema(str(path))
+        services.reset_caches()
+
+    def test_not_ready_without_database(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(services, "DB_PATH", str(tmp_path / "missing.db"))
+        services.reset_caches()
+        with TestClient(main.app) as client:
+            response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
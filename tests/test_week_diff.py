@@ -0,0 +1,75 @@
+"""
+Tests for week-to-week ranking diffs.
+Run with: pytest tests/test_week_diff.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, services
+
+client = TestClient(main.app)
+
+WEEKS = {
+    "2023-01-02": [("1", "Carlos Alcaraz", "6,820"), ("2", "Rafael Nadal", "6,020"), ("3", "Casper Ruud", "5,820")],
+    "2023-01-09": [("1", "Carlos Alcaraz", "6,780"), ("2", "Casper Ruud", "5,820"), ("3", "Novak Djokovic", "4,820")],
+    "2023-01-16": [("1", "Novak Djokovic", "7,070"), ("2", "Carlos Alcaraz", "6,780"), ("N/A", "Casper Ruud", "N/A")],
+}
+
+
+@pytest.fixture
+def weeks():
+    return WEEKS
+
+
+class TestWeekDiff:
+    """Test the diff service."""
+
+    def test_movers_entries_and_exits(self, db_path):
+        diff = services.get_week_diff("2023-01-02", "2023-01-09")
+        assert diff["movers"][1] == {
+            "player": "Casper Ruud",
+            "from_rank": 3,
+            "to_rank": 2,
+            "rank_change": 1,
+            "from_points": 5820,
+            "to_points": 5820,
+            "points_change": 0
+        }
+        assert diff["entries"] == [{"player": "Novak Djokovic", "rank": 3, "points": 4820}]
+        assert diff["exits"] == [{"player": "Rafael Nadal", "rank": 2, "points": 6020}]
+
+    def test_unranked_player_exits(self, db_path):
+        diff = services.get_week_diff("2023-01-09", "2023-01-16")
+        assert [e["player"] for e in diff["exits"]] == ["Casper Ruud"]
+        assert [m["rank_change"] for m in diff["movers"]] == [2, -1]
+
+    def test_consecutive_weeks_are_cached(self, db_path):
+        first = services.get_week_diff("2023-01-02", "2023-01-09")
+        assert services.get_week_diff("2023-01-02", "2023-01-09") is first
+        assert services._consecutive_diff.cache_info().hits == 1
+        services.get_week_diff("2023-01-02", "2023-01-16")
+        assert services._consecutive_diff.cache_info().currsize == 1
+
+    def test_unknown_week(self, db_path):
+        with pytest.raises(ValueError):
+            services.get_week_diff("2023-01-02", "2099-01-01")
+
+
+class TestWeekDiffEndpoints:
+    """Test the REST and MCP entry points."""
+
+    def test_endpoint(self, db_path):
+        response = client.get("/api/diff", params={"from": "2023-01-02", "to": "2023-01-16"})
+        assert response.status_code == 200
+        assert [e["player"] for e in response.json()["entries"]] == ["Novak Djokovic"]
+        assert client.get("/api/diff", params={"from": "2023-01-02", "to": "2099-01-01"}).status_code == 404
+
+    def test_mcp_tool(self, db_path):
+        response = client.post("/mcp/tools/get_week_diff", json={"from": "2023-01-02", "to": "2023-01-09"})
+        assert response.json()["result"]["exits"][0]["player"] == "Rafael Nadal"
@@ -0,0 +1,119 @@
+"""
+Tests for from/to date-window queries.
+Run with: pytest tests/test_windows.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main, services
+from src.storage import PREFIX_TABLE, check_player_stats, load_week
+
+client = TestClient(main.app)
+
+WEEKS = {
+    "2008-08-11": [("1", "Roger Federer", "6,600"), ("2", "Rafael Nadal", "6,555"), ("3", "Novak Djokovic", "5,155")],
+    "2008-08-18": [("1", "Rafael Nadal", "6,700"), ("2", "Roger Federer", "5,690"), ("3", "Novak Djokovic", "5,205")],
+    "2008-08-25": [("1", "Rafael Nadal", "6,700"), ("T2", "Roger Federer", "5,690"), ("T2", "Novak Djokovic", "5,690")],
+    "2008-09-01": [("1", "Roger Federer", "6,800"), ("2", "Rafael Nadal", "6,600"), ("3", "Novak Djokovic", "5,500")],
+}
+
+
+@pytest.fixture
+def weeks():
+    return WEEKS
+
+
+class TestPrefixTable:
+    """Test the materialized running counts."""
+
+    def test_running_counts(self, db_path):
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(
+            f"SELECT week, weeks_top_100, weeks_top_10, weeks_at_1, weeks_no1 FROM {PREFIX_TABLE} "
+            f"WHERE player = ? ORDER BY week",
+            ("Roger Federer",),
+        ).fetchall()
+        conn.close()
+        assert rows == [
+            ("2008-08-11", 1, 1, 1, 1),
+            ("2008-08-18", 2, 2, 1, 1),
+            ("2008-08-25", 3, 3, 1, 1),
+            ("2008-09-01", 4, 4, 2, 2),
+        ]
+
+    def test_load_week_extends_counts(self, db_path):
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE "2008-09-08"(rank, name, points)')
+        conn.execute('INSERT INTO "2008-09-08" VALUES (?, ?, ?)', ("1", "Novak Djokovic", "7,000"))
+        load_week(conn, "2008-09-08")
+        assert check_player_stats(conn) == []
+        conn.close()
+
+
+class TestWindowedServices:
+    """Test window aggregates on the SQLite path."""
+
+    def test_factfile_window(self, db_path):
+        factfile = services.get_player_factfile("Roger Federer", "2008-08-15", "2008-08-31")
+        assert factfile["career_high_rank"] == 2
+        assert factfile["career_high_date"] == "2008-08-25"
+        assert (factfile["weeks_top_100"], factfile["weeks_at_1"]) == (2, 0)
+
+    def test_unbounded_window_matches_whole_career(self, db_path):
+        factfile = services.get_player_factfile("Rafael Nadal")
+        assert services.get_player_factfile("Rafael Nadal", "1900-01-01", "2100-01-01") == factfile
+
+    def test_career_window(self, db_path):
+        career = services.get_player_career("Novak Djokovic", "2008-08-18", "2008-08-25")
+        assert career["ranking_dates"] == ["2008-08-25", "2008-08-18"]
+
+    def test_not_ranked_in_window(self, db_path):
+        with pytest.raises(ValueError, match="between"):
+            services.get_player_factfile("Rafael Nadal", "2020-01-01", None)
+
+    def test_weeks_at_no1_window(self, db_path):
+        assert services.get_weeks_at_no1("2008-08-18", None) == [
+            {"player": "Rafael Nadal", "weeks": 2},
+            {"player": "Roger Federer", "weeks": 1},
+        ]
+        assert services.get_weeks_at_no1(None, "2008-08-11") == [{"player": "Roger Federer", "weeks": 1}]
+
+    def test_check_window(self):
+        services.check_window("2008-01-01", "2008-12-31")
+        with pytest.raises(ValueError):
+            services.check_window("2008-13-01", None)
+        with pytest.raises(ValueError):
+            services.check_window("2009-01-01", "2008-01-01")
+
+
+class TestWindowEndpoints:
+    """Test the from/to query parameters."""
+
+    def test_weeks_at_no1_endpoint(self, db_path):
+        response = client.get("/api/weeks-at-no1", params={"from": "2008-08-18", "to": "2008-08-25"})
+        assert response.json() == [{"player": "Rafael Nadal", "weeks": 2}]
+
+    def test_factfile_endpoint(self, db_path):
+        response = client.get(
+            "/api/player/factfile", params={"player": "Roger Federer", "from": "2008-09-01"}
+        )
+        assert response.json()["weeks_at_1"] == 1
+
+    def test_invalid_window_rejected(self, db_path):
+        response = client.get("/api/player/career", params={"player": "Roger Federer", "from": "yesterday"})
+        assert response.status_code == 400
+
+    def test_mcp_window(self, db_path):
+        response = client.post("/mcp/tools/get_weeks_at_no1", json={"from": "2008-09-01"})
+        assert response.json()["result"] == [{"player": "Roger Federer", "weeks": 1}]
+        response = client.post(
+            "/mcp/tools/get_player_factfile", json={"player": "Roger Federer", "from": "2008-09-01", "to": "2008-08-01"}
+        )
+        assert response.status_code == 400